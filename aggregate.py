@@ -0,0 +1,263 @@
+# aggregate.py - Agrégations vectorisées (NumPy) : codes entiers, group-by par bincount, histogrammes temporels
+
+from array import array
+
+import numpy as np
+
+from mmap_scan import KEYWORDS, PRIORITY, WINDOW_SIZE
+from parse_cache import NO_TIMESTAMP
+
+CATEGORIES = ("error", "warning", "info")                                       # Code → catégorie (ordre des clés de user_stats)
+CATEGORY_CODES = {category: code for code, category in enumerate(CATEGORIES)}
+BUCKET_MS = 60 * 1000                                                           # Histogrammes : une case par minute
+BATCH_LINES = 1 << 20                                                           # Lignes converties d'un bloc (catégories, horodatages)
+DENSE_KEYS = 1 << 24                                                            # Au-delà de cette étendue de clés : np.unique plutôt que bincount
+
+
+def encode(values):
+    """(codes entiers, valeurs distinctes) : les codes suivent l'ordre de première apparition"""
+    codes = {}
+    encoded = np.fromiter((codes.setdefault(value, len(codes)) for value in values), dtype=np.int32)
+    return encoded, list(codes)
+
+
+def count_table(rows, n_rows, cols, n_cols):
+    """Tableau n_rows × n_cols des effectifs de chaque couple (ligne, colonne), en un bincount"""
+    flat = rows.astype(np.int64) * n_cols + cols
+    return np.bincount(flat, minlength=n_rows * n_cols).reshape(n_rows, n_cols)
+
+
+def group_count(keys):
+    """(clés distinctes triées, effectifs) : bincount si les clés sont denses, sinon np.unique"""
+    if not len(keys):
+        return keys[:0], np.zeros(0, dtype=np.int64)
+    low = keys.min()
+    if keys.max() - low < DENSE_KEYS:
+        counts = np.bincount(keys - low)
+        present = np.flatnonzero(counts)
+        return present + low, counts[present]
+    return np.unique(keys, return_counts=True)
+
+
+def add_counts(stats, pairs, labels, total='total'):
+    """Ajoute à `stats` ({ligne: {total, colonne: n}}) les effectifs de couples encodés.
+
+    `pairs` et `labels` viennent de encode() sur des couples (ligne, colonne) :
+    les codes suivent l'ordre de première apparition, les clés sont donc
+    insérées comme par une boucle d'incréments et `stats` peut cumuler des
+    lots successifs en produisant le même JSON.
+    """
+    counts = np.bincount(pairs, minlength=len(labels)).tolist()
+    totals = {}
+    for (row, _), count in zip(labels, counts):
+        totals[row] = totals.get(row, 0) + count
+    for (row, col), count in zip(labels, counts):
+        entry = stats[row]
+        if row in totals:
+            entry[total] += totals.pop(row)                                     # Premier couple de la ligne dans ce lot
+        entry[col] += count
+    return stats
+
+
+def time_histogram(rows, timestamps, bucket_ms=BUCKET_MS):
+    """Effectifs non nuls par (ligne, case de temps) : (lignes, début de case en ms epoch, effectifs)"""
+    dated = timestamps != NO_TIMESTAMP                                          # Lignes orphelines : hors histogramme
+    rows, buckets = rows[dated].astype(np.int64), timestamps[dated] // bucket_ms
+    if not len(buckets):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    first = buckets.min()
+    span = int(buckets.max() - first) + 1
+    keys, counts = group_count(rows * span + (buckets - first))
+    return keys // span, (keys % span + first) * bucket_ms, counts
+
+
+def parse_timestamps(timestamps):
+    """Horodatages Odoo ("AAAA-MM-JJ HH:MM:SS,mmm" ou None) → epoch en ms (UTC), NO_TIMESTAMP si absent.
+
+    Conversion NumPy en bloc : tronquées à 19 caractères, les chaînes sont
+    lues comme datetime64 (None → NaT, dont la valeur entière est
+    NO_TIMESTAMP) ; les millisecondes sont les caractères 20 à 22,
+    complétés à droite par des zéros comme dans parse_cache.timestamp_ms.
+    """
+    text = np.array([stamp or '' for stamp in timestamps], dtype='U23')
+    seconds = text.astype('U19').astype('datetime64[s]').astype(np.int64)
+    digits = text.view(np.uint32).reshape(-1, 23)[:, 20:23].astype(np.int64)
+    millis = (np.where(digits == 0, 0, digits - ord('0')) * [100, 10, 1]).sum(axis=1)
+    return np.where(seconds == NO_TIMESTAMP, NO_TIMESTAMP, seconds * 1000 + millis)
+
+
+def line_ends(blob):
+    """Position suivant chaque \n du blob, calculée par fenêtres (pas de masque de la taille du blob)"""
+    ends = [np.zeros(0, dtype=np.int64)]
+    for start in range(0, len(blob), WINDOW_SIZE):
+        window = np.frombuffer(blob[start:start + WINDOW_SIZE], dtype=np.uint8)
+        ends.append(np.flatnonzero(window == 10) + start + 1)
+    return np.concatenate(ends)
+
+
+def line_categories(lines):
+    """Code de catégorie de chaque ligne (sans \n) : keyword_categories sur les lignes jointes"""
+    blob = ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+    return keyword_categories(blob, np.append(0, line_ends(blob)))
+
+
+def keyword_categories(blob, offsets):
+    """Code de catégorie (categorize_log) de chaque segment blob[offsets[i]:offsets[i + 1]].
+
+    Le blob est parcouru par fenêtres alignées sur les segments : passage en
+    minuscules puis une recherche C par mot-clé, chaque correspondance étant
+    rattachée à son segment par searchsorted. Celles à cheval sur deux
+    segments (concaténés sans séparateur) sont écartées.
+    """
+    offsets = np.asarray(offsets)
+    n = len(offsets) - 1
+    best = np.full(n, -1, dtype=np.int8)                                        # PRIORITY du mot-clé le plus fort (-1 : aucun)
+    first = 0
+    while first < n:
+        last = int(np.searchsorted(offsets, offsets[first] + WINDOW_SIZE, side='right')) - 1
+        last = min(max(last, first + 1), n)
+        base = int(offsets[first])
+        low = blob[base:int(offsets[last])].lower()                             # Minuscules ASCII, comme mmap_scan
+        bounds = offsets[first:last + 1] - base
+        for regex, category in KEYWORDS:                                        # Priorité croissante : le dernier trouvé l'emporte
+            spans = np.array([m.span() for m in regex.finditer(low)], dtype=np.int64).reshape(-1, 2)
+            segments = np.searchsorted(bounds, spans[:, 0], side='right') - 1
+            inside = spans[:, 1] <= bounds[segments + 1]
+            best[first + segments[inside]] = PRIORITY[category]
+        first = last
+    lookup = np.full(len(PRIORITY) + 1, CATEGORY_CODES["info"], dtype=np.int8)
+    for category, priority in PRIORITY.items():
+        lookup[priority + 1] = CATEGORY_CODES[category]
+    return lookup[best + 1]
+
+
+class LineTable:
+    """Une entrée par ligne physique : code utilisateur, code de catégorie et horodatage (ms epoch).
+
+    Les statistiques par utilisateur et les histogrammes temporels sont
+    ensuite de simples group-by NumPy sur ces colonnes.
+    """
+
+    def __init__(self, users, user, category, timestamp):
+        self.users = users                                                      # Code → utilisateur (ordre de première apparition)
+        self.user = user
+        self.category = category
+        self.timestamp = timestamp                                              # NO_TIMESTAMP pour une ligne orpheline
+
+    def __len__(self):
+        return len(self.user)
+
+    @classmethod
+    def from_records(cls, records, extract_user, tracked_levels):
+        """Un passage sur les enregistrements (parseur partagé).
+
+        L'utilisateur d'un en-tête de niveau suivi est celui du parseur (en
+        minuscules) ; les autres lignes passent par `extract_user`. Catégories
+        et horodatages sont convertis par lots de BATCH_LINES lignes.
+        """
+        codes = {}
+        header_codes = {}                                                       # Utilisateur tel que parsé → code
+        user = array('i')
+        categories, timestamps = [], []
+        lines, stamps, counts = [], [], []
+
+        def flush():
+            categories.append(line_categories(lines))
+            timestamps.append(np.repeat(parse_timestamps(stamps), counts))
+            del lines[:], stamps[:], counts[:]
+
+        for record in records:
+            if record.level in tracked_levels:
+                code = header_codes.get(record.user)
+                if code is None:
+                    code = header_codes[record.user] = codes.setdefault(record.user.lower(), len(codes))
+            else:
+                code = codes.setdefault(extract_user(record.raw), len(codes))
+            user.append(code)
+            lines.append(record.raw)
+            stamps.append(record.timestamp)
+            if record.continuation:
+                continuation = record.message.split('\n')[1:]
+                lines.extend(continuation)
+                user.extend([codes.setdefault(extract_user(line), len(codes)) for line in continuation])
+                counts.append(1 + len(continuation))
+            else:
+                counts.append(1)
+            if len(lines) >= BATCH_LINES:
+                flush()
+        flush()
+        return cls(list(codes), np.array(user, dtype=np.int32), np.concatenate(categories), np.concatenate(timestamps))
+
+    @classmethod
+    def from_parsed(cls, parsed, extract_user, tracked_levels):
+        """Construction sur le cache colonnaire (parse_cache.ParsedLog), sans re-parsing.
+
+        En-têtes : utilisateur repris des codes du cache. Catégories : mots-clés
+        cherchés sur les blobs des en-têtes et des continuations. Seules les
+        lignes de continuation, orphelines ou d'un niveau non suivi repassent
+        par `extract_user`.
+        """
+        codes = {}
+        remap = np.array([codes.setdefault(name.lower(), len(codes)) for name in parsed.users] + [-1], dtype=np.int32)
+        tracked = np.array([level in tracked_levels for level in parsed.levels] + [False])[parsed.level]  # Code -1 : orphelin
+        header_user = np.where(tracked, remap[parsed.user], -1)
+        raw_offsets, raw_blob = parsed.raw_offsets, parsed.raw_blob
+        for i in np.flatnonzero(~tracked).tolist():
+            line = raw_blob[raw_offsets[i]:raw_offsets[i + 1]].decode("utf-8")
+            header_user[i] = codes.setdefault(extract_user(line), len(codes))
+
+        # Continuations : texte de chaque enregistrement, lignes jointes par \n, enregistrements bout à bout
+        continuation_counts = np.diff(parsed.continuation_offsets)
+        text_offsets, text_blob = np.asarray(parsed.continuation_text_offsets), parsed.continuation_blob
+        starts = np.sort(np.concatenate([text_offsets[:-1][continuation_counts > 0], line_ends(text_blob)]))
+        continuation_category = keyword_categories(text_blob, np.append(starts, len(text_blob)))
+        continuation_user = array('i')
+        for i in np.flatnonzero(continuation_counts).tolist():
+            for line in text_blob[text_offsets[i]:text_offsets[i + 1]].decode("utf-8").split('\n'):
+                continuation_user.append(codes.setdefault(extract_user(line), len(codes)))
+
+        lines = np.concatenate([parsed.line, parsed.continuation_lines])
+        user = np.concatenate([header_user, np.array(continuation_user, dtype=np.int32)])
+        category = np.concatenate([keyword_categories(raw_blob, raw_offsets), continuation_category])
+        timestamp = np.concatenate([parsed.timestamp, np.repeat(parsed.timestamp, continuation_counts)])
+
+        # Utilisateurs recodés dans l'ordre de leur première ligne (les codes jamais utilisés disparaissent)
+        unused = np.iinfo(np.int64).max
+        first_line = np.full(len(codes), unused, dtype=np.int64)
+        np.minimum.at(first_line, user, lines)
+        order = np.argsort(first_line, kind='stable')[:np.count_nonzero(first_line != unused)]
+        recode = np.empty(len(codes), dtype=np.int32)
+        recode[order] = np.arange(len(order), dtype=np.int32)
+        labels = list(codes)
+        return cls([labels[k] for k in order.tolist()], recode[user], category, timestamp)
+
+    @classmethod
+    def concat(cls, tables):
+        """Tables successives d'un même fichier (plages traitées par les workers) → une seule table"""
+        codes = {}
+        users, categories, timestamps = [], [], []
+        for table in tables:
+            remap = np.array([codes.setdefault(name, len(codes)) for name in table.users], dtype=np.int32)
+            users.append(remap[table.user])
+            categories.append(table.category)
+            timestamps.append(table.timestamp)
+        if not users:
+            return cls([], np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int64))
+        return cls(list(codes), np.concatenate(users), np.concatenate(categories), np.concatenate(timestamps))
+
+    def user_stats(self):
+        """{utilisateur: {"error", "warning", "info"}} : un seul bincount sur (utilisateur, catégorie)"""
+        table = count_table(self.user, len(self.users), self.category, len(CATEGORIES))
+        return {name: dict(zip(CATEGORIES, counts)) for name, counts in zip(self.users, table.tolist())}
+
+    def timeseries(self, category="error", bucket_ms=BUCKET_MS):
+        """{utilisateur: {début de case: effectif}} des lignes de `category`, cases vides omises"""
+        selected = self.category == CATEGORY_CODES[category]
+        rows, starts, counts = time_histogram(self.user[selected], self.timestamp[selected], bucket_ms)
+        unit = 'm' if bucket_ms % 60000 == 0 else 's' if bucket_ms % 1000 == 0 else 'ms'
+        labels = np.datetime_as_string(starts.astype('datetime64[ms]'), unit=unit)
+        series = {}
+        for row, label, count in zip(rows.tolist(), labels.tolist(), counts.tolist()):
+            series.setdefault(self.users[row], {})[label.replace('T', ' ')] = count
+        return series
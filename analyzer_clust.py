@@ -1,8 +1,17 @@
 # analyzer_hierarchical.py - Version améliorée
 
-import matplotlib.pyplot as plt
+import argparse
+import json
 import re
-from collections import defaultdict
+from collections import Counter, defaultdict
+from matplotlib.collections import LineCollection
+from odoo_log_parser import iter_file_records
+from parallel_parse import parse_file_parallel
+from parse_cache import load_or_parse
+import instrument
+from log_index import add_query_arguments, query_from_args, select_records
+from report_render import new_figure, save_figure, use_headless
+from template_miner import TemplateMiner
 
 # Constantes améliorées
 LINE_SPACING = 3.0
@@ -11,6 +20,12 @@ LEVEL_SPACING = 5.0
 MARGIN = 15
 MAX_MSG_LEN = 80
 BLOCK_PADDING = 2.0  # Ajout de cette nouvelle constante
+NUMBER_PATTERN = re.compile(r"\b\d+\b")
+# Vue agrégée (--summary / --html)
+TOP_K = 10  # Enfants affichés par nœud, le reste est regroupé dans « N autres »
+SUMMARY_DPI = 150
+ROW_HEIGHT = 0.3  # Pouces par ligne de la vue agrégée
+MAX_FIG_HEIGHT = 400  # Pouces (limite de taille d'image de matplotlib)
 
 COLORS = {
     'user': '#4b8bbe',
@@ -20,42 +35,108 @@ COLORS = {
     'message': '#f7f7f7'
 }
 
-def parse_logs(filepath):
-    """Version plus robuste du parsing"""
-    pattern = re.compile(
-        r"(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) "
-        r"(?P<pid>\d+) "
-        r"(?P<level>[A-Z]+) "
-        r"(?P<user>\w+) "
-        r"(?P<module>[\w\.]+): "
-        r"(?P<message>.+)"
-    )
-
-    logs = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+@instrument.traced()
+def parse_logs(filepath, workers=1, templates=False, cache=False, summary=False, query=None):
+    """Version plus robuste du parsing (avec `summary`, effectifs par message plutôt que listes ;
+    avec `query`, seulement la sélection indexée)"""
+    logs = defaultdict(lambda: defaultdict(Counter if summary else lambda: defaultdict(list)))
     
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            for line in f:
-                if match := pattern.match(line):
-                    data = match.groupdict()
-                    msg = re.sub(r"\b\d+\b", "#", data["message"])  # Meilleure normalisation
-                    logs[data["user"]][data["level"]][msg].append(data["message"])
+        if query:
+            records = select_records(filepath, query, workers)
+        elif cache:
+            records = load_or_parse(filepath, workers).records()
+        else:
+            records = parse_file_parallel(filepath, workers) if workers > 1 else iter_file_records(filepath)
+        miner = TemplateMiner() if templates else None
+        if summary:
+            logs = build_summary(records, miner)
+        else:
+            build_hierarchy(records, logs, miner)
     except Exception as e:
         print(f"Erreur de lecture: {str(e)}")
     
     return logs
 
+def build_hierarchy(records, logs=None, miner=None):
+    """Regroupe les enregistrements du parseur partagé : utilisateur → niveau → message normalisé
+    
+    Avec un `miner` (TemplateMiner), les messages sont regroupés par gabarit
+    plutôt que par simple remplacement des nombres.
+    """
+    if logs is None:
+        logs = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+    
+    for record in records:
+        if record.is_orphan:
+            continue
+        message = record.first_message
+        if miner is not None:
+            msg = miner.add(message)  # Gabarit (son texte s'affine jusqu'à la fin du passage)
+        else:
+            msg = NUMBER_PATTERN.sub("#", message)  # Meilleure normalisation
+        logs[record.user][record.level][msg].append(message)
+    
+    if miner is not None:
+        # Libellés définitifs : texte final de chaque gabarit
+        for levels in logs.values():
+            for level, groups in levels.items():
+                labelled = defaultdict(list)
+                for template, messages in groups.items():
+                    labelled[template.template].extend(messages)
+                levels[level] = labelled
+    
+    return logs
+
+def build_summary(records, miner=None):
+    """utilisateur → niveau → {message normalisé: nombre d'occurrences}
+    
+    Même regroupement que build_hierarchy, sans garder chaque occurrence :
+    la mémoire dépend du nombre de messages distincts, pas du nombre de lignes.
+    """
+    summary = defaultdict(lambda: defaultdict(Counter))
+    
+    for record in records:
+        if record.is_orphan:
+            continue
+        message = record.first_message
+        key = miner.add(message) if miner is not None else NUMBER_PATTERN.sub("#", message)
+        summary[record.user][record.level][key] += 1
+    
+    if miner is not None:
+        for levels in summary.values():
+            for level, groups in levels.items():
+                labelled = Counter()
+                for template, count in groups.items():
+                    labelled[template.template] += count
+                levels[level] = labelled
+    
+    return summary
+
+def block_heights(data, heights=None):
+    """Hauteur de chaque sous-arbre (clé : id du dict), calculée en un seul parcours"""
+    if heights is None:
+        heights = {}
+    height = 0
+    for v in data.values():
+        if isinstance(v, list):
+            height += len(v)
+        elif isinstance(v, dict):
+            block_heights(v, heights)
+            height += max(heights[id(v)], 1)
+        else:
+            height += 1
+    heights[id(data)] = max(height, 2)
+    return heights
+
 def get_block_height(data):
-    """Version optimisée"""
-    height = sum(
-        len(v) if isinstance(v, list) else 
-        max(get_block_height(v), 1) if isinstance(v, dict) else 
-        1 for v in data.values()
-    )
-    return max(height, 2)
-
-def draw_bracket(ax, data, x=0, y=0, depth=0):
-    """Version améliorée avec gestion de profondeur"""
+    """Hauteur d'un bloc (en lignes)"""
+    return block_heights(data)[id(data)]
+
+def draw_bracket(ax, data, x=0, y=0, depth=0, heights=None):
+    """Version améliorée avec gestion de profondeur (`heights` : block_heights, calculé une fois)"""
+    if heights is None:
+        heights = block_heights(data)
     y_cursor = y
     
     for key, val in data.items():
@@ -84,8 +165,8 @@ def draw_bracket(ax, data, x=0, y=0, depth=0):
         # Traitement des enfants
         if isinstance(val, dict):
             child_x = x + LEVEL_SPACING
-            block_height = get_block_height(val) * LINE_SPACING
-            draw_bracket(ax, val, child_x, y_cursor, depth + 1)
+            block_height = heights[id(val)] * LINE_SPACING
+            draw_bracket(ax, val, child_x, y_cursor, depth + 1, heights)
             y_cursor -= block_height + BLOCK_PADDING
             
         elif isinstance(val, list):
@@ -107,17 +188,18 @@ def draw_bracket(ax, data, x=0, y=0, depth=0):
             
             y_cursor -= len(val) * LINE_SPACING
 
-if __name__ == "__main__":
-    # Chargement des données
-    logs = parse_logs("odoo.log.txt")
-    
-    # Calcul des dimensions
-    total_lines = sum(get_block_height(c) + PADDING_BETWEEN_USERS for c in logs.values())
+@instrument.traced(items=lambda result, logs, *args, **kwargs: len(logs))
+def render_hierarchy(logs, output_file="odoo_logs_hierarchy.png", show=True):
+    """Dessine l'arbre complet et le sauvegarde en PNG (affiché seulement si `show`)"""
+    # Calcul des dimensions (hauteurs de tous les blocs en un seul parcours)
+    heights = block_heights(logs)
+    total_lines = sum(heights[id(c)] + PADDING_BETWEEN_USERS for c in logs.values())
     total_height = total_lines * LINE_SPACING + MARGIN
     
     # Création de la figure
     fig_height = max(10, min(30, total_height / 4))
-    fig, ax = plt.subplots(figsize=(28, fig_height))
+    fig = new_figure((28, fig_height), show)
+    ax = fig.subplots()
     ax.set_xlim(0, 30)  # Espace horizontal augmenté
     ax.set_ylim(-total_height, 10)
     ax.axis('off')
@@ -125,16 +207,201 @@ if __name__ == "__main__":
     # Dessin
     current_y = 0
     for user, content in logs.items():
-        draw_bracket(ax, {user: content}, y=current_y)
-        current_y -= (get_block_height(content) + PADDING_BETWEEN_USERS) * LINE_SPACING
+        draw_bracket(ax, {user: content}, y=current_y, heights=heights)
+        current_y -= (heights[id(content)] + PADDING_BETWEEN_USERS) * LINE_SPACING
     
     # Finalisation
-    plt.title("Analyse Hiérarchique des Logs Odoo\nPar Utilisateur → Niveau → Message", 
-              pad=20, fontsize=16, fontweight='bold')
-    plt.tight_layout()
+    ax.set_title("Analyse Hiérarchique des Logs Odoo\nPar Utilisateur → Niveau → Message", 
+                 pad=20, fontsize=16, fontweight='bold')
+    fig.tight_layout()
     
     # Sauvegarde
-    output_file = "odoo_logs_hierarchy.png"
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
     print(f"Visualisation sauvegardée dans '{output_file}'")
-    plt.show()
\ No newline at end of file
+    save_figure(fig, output_file, show, dpi=300, bbox_inches='tight')
+
+@instrument.traced(items=lambda tree, summary: len(summary))
+def summary_tree(summary):
+    """Arbre générique {n: nom, c: effectif, k: type, ch: enfants} trié par effectif décroissant
+    
+    Les effectifs sont calculés une fois, des feuilles vers la racine ; les
+    messages héritent du type (niveau) de leur parent.
+    """
+    users = []
+    for user, levels in summary.items():
+        level_nodes = []
+        for level, groups in levels.items():
+            messages = [{'n': msg, 'c': count} for msg, count in groups.most_common()]
+            level_nodes.append({'n': level, 'c': sum(groups.values()), 'k': level.lower(), 'ch': messages})
+        level_nodes.sort(key=lambda node: -node['c'])
+        users.append({'n': user, 'c': sum(node['c'] for node in level_nodes), 'k': 'user', 'ch': level_nodes})
+    users.sort(key=lambda node: -node['c'])
+    return users
+
+def rollup_label(hidden):
+    """Libellé du regroupement des enfants non affichés"""
+    return f"… {len(hidden)} autres ({sum(node['c'] for node in hidden)})"
+
+def layout_rows(nodes, top=TOP_K, depth=0, parent=None, kind='user', rows=None):
+    """Lignes (profondeur, parent, libellé, type) de l'arbre indenté : top-K enfants puis « N autres »"""
+    if rows is None:
+        rows = []
+    for node in nodes[:top]:
+        node_kind = node.get('k', kind)
+        index = len(rows)
+        label = f"{node['n']} ({node['c']})"
+        if depth == 2 and len(label) > MAX_MSG_LEN:
+            label = label[:MAX_MSG_LEN // 2] + "..." + label[-MAX_MSG_LEN // 2:]
+        rows.append((depth, parent, label, node_kind))
+        if 'ch' in node:
+            layout_rows(node['ch'], top, depth + 1, index, node_kind, rows)
+    if len(nodes) > top:
+        rows.append((depth, parent, rollup_label(nodes[top:]), 'more'))
+    return rows
+
+@instrument.traced()
+def render_summary(tree, output_file="odoo_logs_hierarchy.png", top=TOP_K):
+    """Vue agrégée en PNG : une ligne par message distinct (top-K par nœud), connecteurs en un seul artiste"""
+    rows = layout_rows(tree, top)
+    fig_height = min(max(6, len(rows) * ROW_HEIGHT), MAX_FIG_HEIGHT)
+    fig = new_figure((20, fig_height))
+    ax = fig.subplots()
+    ax.set_xlim(0, 30)
+    ax.set_ylim(-len(rows) * LINE_SPACING, LINE_SPACING)
+    ax.axis('off')
+    
+    segments = []
+    for i, (depth, parent, label, kind) in enumerate(rows):
+        x, y = depth * LEVEL_SPACING, -i * LINE_SPACING
+        ax.text(x, y, label, ha="left", va="center", fontsize=10 - depth,
+                bbox=dict(boxstyle="round", facecolor=COLORS.get(kind, COLORS['message']),
+                          edgecolor="black" if depth < 2 else "#ddd", alpha=0.8))
+        if parent is not None:
+            parent_x, parent_y = (depth - 1) * LEVEL_SPACING + 1, -parent * LINE_SPACING
+            segments.append([(parent_x, parent_y), (parent_x, y), (x - 0.3, y)])
+    ax.add_collection(LineCollection(segments, linestyles=':', colors='#999', linewidths=0.8))
+    
+    ax.set_title("Analyse Hiérarchique des Logs Odoo (vue agrégée)\nPar Utilisateur → Niveau → Message",
+                 pad=20, fontsize=16, fontweight='bold')
+    save_figure(fig, output_file, dpi=SUMMARY_DPI, bbox_inches='tight')
+    print(f"Visualisation agrégée sauvegardée dans '{output_file}' ({len(rows)} lignes)")
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>Analyse Hiérarchique des Logs Odoo</title>
+<style>
+body { font-family: sans-serif; margin: 2em; }
+ul { list-style: none; padding-left: 1.5em; border-left: 1px dotted #999; }
+#tree > ul { border-left: none; padding-left: 0; }
+li { margin: 0.2em 0; }
+li.closed > ul { display: none; }
+.node { padding: 0.1em 0.5em; border-radius: 0.6em; border: 1px solid #ddd; background: #f7f7f7; }
+.branch > .node { cursor: pointer; border-color: black; }
+.branch > .node::before { content: "\\25BE  "; }
+.branch.closed > .node::before { content: "\\25B8  "; }
+.count { color: #666; font-size: 0.9em; }
+.more { color: #4b8bbe; cursor: pointer; font-style: italic; }
+__COLORS__
+</style>
+</head>
+<body>
+<h1>Analyse Hiérarchique des Logs Odoo</h1>
+<p>__STATS__ — cliquer sur un nœud pour le déplier.</p>
+<div id="tree"></div>
+<script>
+const TOP = __TOP__;
+const DATA = __DATA__;
+
+function node(d, kind) {
+  const li = document.createElement("li");
+  const k = d.k || kind;
+  const label = document.createElement("span");
+  const count = document.createElement("span");
+  label.className = "node " + k;
+  label.textContent = d.n;
+  count.className = "count";
+  count.textContent = d.c;
+  li.append(label, " ", count);
+  if (d.ch) {
+    let built = false;
+    li.className = "branch closed";
+    label.onclick = () => {
+      if (!built) li.append(list(d.ch, k));  // Enfants créés au premier dépliage
+      built = true;
+      li.classList.toggle("closed");
+    };
+  }
+  return li;
+}
+
+function list(children, kind) {
+  const ul = document.createElement("ul");
+  const rest = document.createElement("li");
+  let shown = 0;
+  rest.className = "more";
+  rest.onclick = () => {
+    children.slice(shown, shown + TOP).forEach(child => ul.insertBefore(node(child, kind), rest));
+    shown = Math.min(shown + TOP, children.length);
+    const hidden = children.slice(shown);
+    if (hidden.length) rest.textContent = "… " + hidden.length + " autres (" + hidden.reduce((sum, c) => sum + c.c, 0) + ")";
+    else rest.remove();
+  };
+  ul.append(rest);
+  rest.onclick();
+  return ul;
+}
+
+document.getElementById("tree").append(list(DATA, "user"));
+</script>
+</body>
+</html>
+"""
+
+@instrument.traced()
+def render_html(tree, output_file="odoo_logs_hierarchy.html", top=TOP_K):
+    """Arbre HTML repliable : données agrégées en JSON, nœuds créés à la demande (top-K puis « N autres »)"""
+    data = json.dumps(tree, ensure_ascii=False, separators=(',', ':')).replace("</", "<\\/")
+    colors = "\n".join(f".node.{kind} {{ background: {color}; }}" for kind, color in COLORS.items())
+    messages = sum(len(level['ch']) for user in tree for level in user['ch'])
+    stats = f"{len(tree)} utilisateurs, {messages} messages distincts, {sum(user['c'] for user in tree)} logs"
+    html = (HTML_TEMPLATE.replace("__COLORS__", colors).replace("__STATS__", stats)
+            .replace("__TOP__", str(top)).replace("__DATA__", data))
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(html)
+    print(f"Arbre HTML sauvegardé dans '{output_file}' ({len(html) // 1024} Ko)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vue hiérarchique des logs Odoo")
+    parser.add_argument("log_file", nargs="?", default="odoo.log.txt", help="Fichier de log à analyser")
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de processus de parsing")
+    parser.add_argument("--templates", action="store_true", help="Regrouper les messages par gabarit (TemplateMiner)")
+    parser.add_argument("--cache", action="store_true", help="Réutiliser le cache colonnaire du parsing (cache/)")
+    parser.add_argument("--summary", action="store_true",
+                        help="PNG agrégé : effectif par message normalisé au lieu de chaque occurrence")
+    parser.add_argument("--html", nargs="?", const="odoo_logs_hierarchy.html",
+                        help="Arbre HTML repliable (défaut : odoo_logs_hierarchy.html)")
+    parser.add_argument("--top", type=int, default=TOP_K, help="Enfants affichés par nœud en vue agrégée")
+    parser.add_argument("--headless", action="store_true", help="Backend Agg : PNG sauvegardé sans fenêtre (cron)")
+    add_query_arguments(parser)
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+    query = query_from_args(parser, args)
+    instrument.start_from_args("clust", args)
+    if args.headless:
+        use_headless()
+
+    if args.summary or args.html:
+        # Vue agrégée : taille et temps de rendu proportionnels au nombre de messages distincts
+        tree = summary_tree(parse_logs(args.log_file, args.workers, args.templates, args.cache, summary=True, query=query))
+        if args.html:
+            render_html(tree, args.html, args.top)
+        if args.summary:
+            render_summary(tree, top=args.top)
+    else:
+        # Chargement des données
+        logs = parse_logs(args.log_file, args.workers, args.templates, args.cache, query=query)
+        
+        render_hierarchy(logs, show=not args.headless)
+    
+    instrument.finish()
@@ -1,23 +1,39 @@
 # analyzer_clust.py
-import re
+import argparse
 import os
-import matplotlib.pyplot as plt
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
+import random
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.decomposition import PCA, TruncatedSVD
 from collections import defaultdict
 import json
 from datetime import datetime
+from aggregate import add_counts, encode
+import instrument
+from log_index import add_query_arguments, query_from_args, select_records
+from model_store import (DRIFT_THRESHOLD, MAX_AGE_DAYS, add_model_arguments, align_clusters, model_options_from_args,
+                         normalize_message, relabel, retrain_reason, seed_centers)
+from odoo_log_parser import iter_file_records
+from parallel_parse import parse_file_parallel
+from parse_cache import load_or_parse
+from report_render import new_figure, save_figure, use_headless
+from template_miner import TemplateMiner
 
 # Configuration
 LOG_FILE = "odoo.log.txt"
 OUTPUT_DIR = "results"
+# Mode grands volumes (--large)
+BATCH_SIZE = 10000          # Logs vectorisés par lot (partial_fit / predict)
+PLOT_SAMPLE_SIZE = 5000     # Points au plus sur le nuage (échantillon réservoir)
+HASH_FEATURES = 2 ** 18     # Dimension du HashingVectorizer (sans vocabulaire en mémoire)
+MAX_ERROR_PATTERNS = 50     # Motifs d'erreur conservés par cluster
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-def setup_logging():
+def setup_logging(log_file=LOG_FILE):
     """Configure le chemin des fichiers"""
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    chemin_log = os.path.join(base_dir, LOG_FILE)
+    chemin_log = os.path.join(base_dir, log_file)
     
     print(f"[CONFIG] Dossier de travail : {base_dir}")
     print(f"[CONFIG] Fichier de log : {chemin_log}")
@@ -28,132 +44,215 @@ def setup_logging():
         
     return chemin_log
 
-def parse_logs(file_path):
-    """Parse les logs Odoo avec gestion des erreurs améliorée"""
-    pattern = re.compile(
-        r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d+)\s+(\d+)\s+(\w+)\s+(\w+)\s+([\w\.]+):\s+(.*)'
-    )
-    
+@instrument.traced(items=lambda logs, *args, **kwargs: len(logs))
+def parse_logs(file_path, workers=1, cache=False, query=None):
+    """Parse les logs Odoo avec gestion des erreurs améliorée (avec `query`, seulement la sélection indexée)"""
+    if query:
+        return collect_logs(select_records(file_path, query, workers))
+    if cache:
+        return collect_logs(load_or_parse(file_path, workers).records())
+    if workers > 1:
+        return collect_logs(parse_file_parallel(file_path, workers))
+    return collect_logs(iter_file_records(file_path))
+
+def collect_logs(records):
+    """Garde les enregistrements valides issus du parseur partagé"""
     logs = []
-    current_log = None
-    
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line_num, line in enumerate(f, 1):
-            line = line.strip()
-            if not line:
-                continue
-                
-            match = pattern.match(line)
-            if match:
-                if current_log:
-                    logs.append(current_log)
-                
-                timestamp, pid, level, user, module, message = match.groups()
-                current_log = {
-                    'line': line_num,
-                    'timestamp': timestamp,
-                    'level': level,
-                    'user': user,
-                    'module': module,
-                    'message': message
-                }
-            elif current_log:
-                current_log['message'] += '\n' + line
-            else:
-                print(f"[WARN] Ligne {line_num} ignorée (format non reconnu)")
-    
-    if current_log:
-        logs.append(current_log)
+    for record in records:
+        if record.is_orphan:
+            print(f"[WARN] Ligne {record.line} ignorée (format non reconnu)")
+            continue
+        logs.append(record)
         
     print(f"[SUCCÈS] {len(logs)} logs parsés")
     return logs
 
-def cluster_logs(logs, n_clusters=5):
-    """Clusterisation des logs avec paramètres optimisés"""
-    vectorizer = TfidfVectorizer(
+def make_vectorizer():
+    """Vectoriseur TF-IDF (non ajusté) commun au mode par défaut et au modèle persistant"""
+    return TfidfVectorizer(
         max_features=1000,
         stop_words='english',
         ngram_range=(1, 2)  # <-- Parenthèse fermée ici
     )  # <-- Et ici pour fermer l'appel à TfidfVectorizer
-    
-    X = vectorizer.fit_transform([log['message'] for log in logs])
-    
-    kmeans = KMeans(
+
+@instrument.traced(items=lambda result, logs: len(logs))
+def vectorize_logs(logs):
+    """Matrice TF-IDF des messages et vectoriseur ajusté"""
+    vectorizer = make_vectorizer()
+    return vectorizer.fit_transform([log.message for log in logs]), vectorizer
+
+@instrument.traced(items=lambda kmeans, X, *args, **kwargs: X.shape[0])
+def fit_kmeans(X, n_clusters=5, init=None):
+    """KMeans ajusté sur la matrice TF-IDF (`init` : centroïdes de départ, sinon k-means++)"""
+    return KMeans(
         n_clusters=n_clusters,
-        init='k-means++',
+        init='k-means++' if init is None else init,
         max_iter=300,
         random_state=42
     ).fit(X)  # <-- Parenthèse fermée ici
+
+def cluster_logs(logs, n_clusters=5):
+    """Clusterisation des logs avec paramètres optimisés"""
+    X, vectorizer = vectorize_logs(logs)
+    kmeans = fit_kmeans(X, n_clusters)
     
     for i, log in enumerate(logs):
-        log['cluster'] = int(kmeans.labels_[i])
+        log.cluster = int(kmeans.labels_[i])
     
     return logs, X, vectorizer
 
-def analyze_clusters(logs):
-    """Analyse approfondie des clusters"""
-    analysis = {
-        'cluster_stats': defaultdict(lambda: defaultdict(int)),
-        'error_patterns': defaultdict(set)
+@instrument.traced(items=lambda result, logs, *args, **kwargs: len(logs))
+def cluster_with_model(logs, store, n_clusters=5, max_age_days=MAX_AGE_DAYS, drift_threshold=DRIFT_THRESHOLD,
+                       retrain=False, source=None):
+    """Clusterisation par le modèle enregistré (ModelStore) : transform / predict seuls
+    
+    Le modèle est réentraîné s'il est absent, plus vieux que `max_age_days`,
+    si `retrain` ou si la distance moyenne des logs à leur centroïde dépasse
+    `drift_threshold` fois celle de l'entraînement. Les clusters d'un modèle
+    réentraîné sont renumérotés sur ceux du précédent : un même cluster garde
+    son identifiant d'un rapport à l'autre. Les messages sont normalisés
+    (chiffres → 0) et chaque message distinct n'est vectorisé qu'une fois.
+    """
+    messages = [normalize_message(log.message) for log in logs]
+    current = store.load()
+    reason = "réentraînement demandé" if retrain else retrain_reason(current, max_age_days, n_clusters)
+    drift = previous_labels = None
+    model = current
+    if reason is None:
+        X = current.transform(messages)
+        labels, distances = current.assign(X)
+        previous_labels = labels  # Réutilisées si la dérive impose un réentraînement
+        drift = current.drift(distances)
+        if drift > drift_threshold:
+            reason = f"dérive {drift:.2f} > {drift_threshold:g}"
+    
+    if reason is not None:
+        print(f"[MODÈLE] Entraînement d'une nouvelle version ({reason})")
+        vectorizer = make_vectorizer()
+        X = vectorizer.fit_transform(messages)
+        aligned_to = None
+        if current is not None and current.meta['n_clusters'] == n_clusters:
+            # Départ depuis l'ancien partitionnement, puis appariement hongrois si des clusters ont permuté
+            if previous_labels is None:  # Âge ou réentraînement demandé : pas encore vectorisés
+                previous_labels = current.assign(current.transform(messages))[0]
+            kmeans = fit_kmeans(X, n_clusters, seed_centers(X, previous_labels, n_clusters))
+            relabel(kmeans, align_clusters(previous_labels, kmeans.labels_, n_clusters))
+            aligned_to = current.version
+        else:
+            kmeans = fit_kmeans(X, n_clusters)
+        labels = kmeans.labels_
+        distances = kmeans.transform(X)[np.arange(len(labels)), labels]
+        model = store.save(vectorizer, kmeans, float(np.mean(distances)), reason=reason, records=len(logs),
+                           source=source, aligned_to=aligned_to, previous_drift=drift)
+        first = {}
+        for i, message in enumerate(messages):
+            first.setdefault(message, i)
+        model.cache.add(list(first), X[list(first.values())])  # Vecteurs déjà calculés pour les prochaines exécutions
+    else:
+        print(f"[MODÈLE] Version {model.version} du {model.meta['trained_at']} : inférence seule, dérive {drift:.2f}, "
+              f"{model.cache.hits} messages distincts lus en cache, {model.cache.misses} vectorisés")
+    model.cache.save()
+    
+    for log, label in zip(logs, labels):
+        log.cluster = int(label)
+    info = {
+        'version': model.version,
+        'trained_at': model.meta['trained_at'],
+        'retrained': reason,
+        'drift': drift,
+        'path': model.path,
     }
+    return logs, X, info
+
+def analyze_clusters(logs, analysis=None, max_patterns=None):
+    """Analyse approfondie des clusters (cumulable lot par lot via `analysis`)"""
+    if analysis is None:
+        analysis = {
+            'cluster_stats': defaultdict(lambda: defaultdict(int)),
+            'error_patterns': defaultdict(set)
+        }
     
-    for log in logs:
-        cluster = log['cluster']
-        analysis['cluster_stats'][cluster]['total'] += 1
-        analysis['cluster_stats'][cluster][log['level']] += 1
-        
-        if log['level'] == 'ERROR':
-            analysis['error_patterns'][cluster].add(
-                ' '.join(log['message'].split()[:5]))
+    # Effectifs par (cluster, niveau) : un code entier par couple puis un bincount
+    pairs, labels = encode((log.cluster, log.level) for log in logs)
+    add_counts(analysis['cluster_stats'], pairs, labels)
+    
+    errors = [code for code, (_, level) in enumerate(labels) if level == 'ERROR']
+    if errors:
+        for i in np.flatnonzero(np.isin(pairs, errors)).tolist():
+            log = logs[i]
+            patterns = analysis['error_patterns'][log.cluster]
+            if max_patterns is None or len(patterns) < max_patterns:
+                patterns.add(' '.join(log.message.split()[:5]))
     
     return analysis
 
-def visualize_results(logs, X):
+@instrument.traced(items=lambda points, X: X.shape[0])
+def project_pca(X):
+    """Projection PCA 2D de la matrice TF-IDF"""
+    return PCA(n_components=2).fit_transform(X.toarray())
+
+@instrument.traced(items=lambda result, logs, *args, **kwargs: len(logs))
+def visualize_results(logs, X, show=True):
     """Visualisation améliorée des clusters"""
-    pca = PCA(n_components=2).fit_transform(X.toarray())
-    
-    plt.figure(figsize=(12, 8))
-    for cluster in set(log['cluster'] for log in logs):
-        indices = [i for i, log in enumerate(logs) if log['cluster'] == cluster]
-        plt.scatter(
-            pca[indices, 0], pca[indices, 1],
-            label=f'Cluster {cluster}',
-            alpha=0.6)
-    
-    plt.title("Clustering des Logs Odoo\nAnalyse PCA", pad=20)
-    plt.xlabel("Composante Principale 1")
-    plt.ylabel("Composante Principale 2")
-    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.grid(alpha=0.2)
-    plt.tight_layout()
+    clusters = np.fromiter((log.cluster for log in logs), dtype=np.int64, count=len(logs))
+    plot_projection(project_pca(X), clusters, "Analyse PCA",
+                    "Composante Principale", show=show)
+
+def plot_projection(points, clusters, subtitle, axis_label, show=True):
+    """Nuage de points 2D coloré par cluster, sauvegardé dans results/
+    
+    Les points sont regroupés par cluster en un seul tri (pas de masque par
+    cluster), puis chaque groupe est tracé d'une couleur unie : Agg garde
+    alors son chemin rapide, bien plus court qu'un tableau de couleurs par point.
+    """
+    clusters = np.asarray(clusters)
+    order = np.argsort(clusters, kind='stable')
+    ids, starts = np.unique(clusters[order], return_index=True)
+    
+    fig = new_figure((12, 8), show)
+    ax = fig.subplots()
+    for cluster, group in zip(ids.tolist(), np.split(order, starts[1:])):
+        ax.scatter(points[group, 0], points[group, 1], label=f'Cluster {cluster}', alpha=0.6)
+    
+    ax.set_title(f"Clustering des Logs Odoo\n{subtitle}", pad=20)
+    ax.set_xlabel(f"{axis_label} 1")
+    ax.set_ylabel(f"{axis_label} 2")
+    ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    ax.grid(alpha=0.2)
+    fig.tight_layout()
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_file = os.path.join(OUTPUT_DIR, f"clusters_{timestamp}.png")
-    plt.savefig(output_file, dpi=120, bbox_inches='tight')
-    plt.show()
+    save_figure(fig, output_file, show, dpi=120, bbox_inches='tight')
     print(f"[VISUALISATION] Graphique sauvegardé dans {output_file}")
 
-def export_results(logs, analysis):
-    """Export des résultats en JSON"""
+@instrument.traced()
+def export_results(logs, analysis, total_logs=None, miner=None, model=None):
+    """Export des résultats en JSON (avec `miner`, chaque cluster est un gabarit ; `model` : version du modèle persistant)"""
     output = {
         'metadata': {
             'timestamp': datetime.now().isoformat(),
-            'total_logs': len(logs),
+            'total_logs': len(logs) if total_logs is None else total_logs,
             'clusters_count': len(analysis['cluster_stats'])
         },
         'clusters': analysis['cluster_stats'],
         'error_patterns': {k: list(v) for k, v in analysis['error_patterns'].items()},
         'sample_logs': []
     }
+    if miner is not None:
+        output['metadata']['method'] = 'templates'
+        output['templates'] = {t.id: t.template for t in miner.templates}
+    if model is not None:
+        output['metadata']['model'] = model
     
     # Ajout d'exemples de logs pour chaque cluster
     for cluster in output['clusters']:
-        sample = next(log for log in logs if log['cluster'] == cluster)
+        sample = next(log for log in logs if log.cluster == cluster)
         output['sample_logs'].append({
             'cluster': cluster,
-            'line': sample['line'],
-            'level': sample['level'],
-            'message': sample['message'][:200]
+            'line': sample.line,
+            'level': sample.level,
+            'message': sample.message[:200]
         })
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -164,30 +263,198 @@ def export_results(logs, analysis):
     
     print(f"[EXPORT] Résultats exportés dans {output_file}")
 
+def iter_batches(records, batch_size=BATCH_SIZE):
+    """Lots de logs valides (les lignes orphelines sont ignorées)"""
+    batch = []
+    for record in records:
+        if record.is_orphan:
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def make_hashing_vectorizer():
+    """Vectoriseur sans état : aucun vocabulaire à apprendre ni à garder en mémoire"""
+    return HashingVectorizer(
+        n_features=HASH_FEATURES,
+        stop_words='english',
+        ngram_range=(1, 2),
+        alternate_sign=False,
+        norm='l2'
+    )
+
+@instrument.traced()
+def fit_streaming(file_path, vectorizer, n_clusters=5, batch_size=BATCH_SIZE, query=None):
+    """Passe 1 : MiniBatchKMeans.partial_fit sur les lots successifs du fichier"""
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3)
+    pending = []
+    for batch in iter_batches(select_records(file_path, query), batch_size):
+        pending.extend(log.message for log in batch)
+        if len(pending) < n_clusters:  # Le premier lot doit contenir au moins k logs
+            continue
+        kmeans.partial_fit(vectorizer.transform(pending))
+        pending = []
+    if pending:
+        if not hasattr(kmeans, 'cluster_centers_'):
+            raise ValueError(f"Au moins {n_clusters} logs valides sont nécessaires")
+        kmeans.partial_fit(vectorizer.transform(pending))
+    if not hasattr(kmeans, 'cluster_centers_'):
+        raise ValueError("Aucun log valide à analyser")
+    return kmeans
+
+@instrument.traced(items=lambda result, *args, **kwargs: result[3])
+def predict_streaming(file_path, vectorizer, kmeans, batch_size=BATCH_SIZE, sample_size=PLOT_SAMPLE_SIZE, query=None):
+    """Passe 2 : attribution des clusters lot par lot, statistiques cumulées et échantillon réservoir.
+
+    Seuls restent en mémoire les statistiques, le premier log de chaque
+    cluster (pour l'export) et au plus `sample_size` messages tirés
+    uniformément pour le nuage de points.
+    """
+    analysis = None
+    first_logs = {}
+    sample = []  # (message, cluster)
+    rng = random.Random(42)
+    total = 0
+    
+    for batch in iter_batches(select_records(file_path, query), batch_size):
+        labels = kmeans.predict(vectorizer.transform([log.message for log in batch]))
+        for log, label in zip(batch, labels):
+            log.cluster = int(label)
+            first_logs.setdefault(log.cluster, log)
+            
+            # Algorithme R : chaque log a une probabilité sample_size / total d'être retenu
+            if total < sample_size:
+                sample.append((log.message, log.cluster))
+            else:
+                j = rng.randrange(total + 1)
+                if j < sample_size:
+                    sample[j] = (log.message, log.cluster)
+            total += 1
+        analysis = analyze_clusters(batch, analysis, MAX_ERROR_PATTERNS)
+    
+    print(f"[SUCCÈS] {total} logs clusterisés par lots de {batch_size}")
+    return analysis, list(first_logs.values()), sample, total
+
+@instrument.traced(items=lambda result, sample, *args, **kwargs: len(sample))
+def visualize_sample(sample, vectorizer, total, show=True):
+    """Nuage de l'échantillon réservoir : TruncatedSVD sur la matrice creuse (pas de toarray)"""
+    X = vectorizer.transform([message for message, _ in sample])
+    points = TruncatedSVD(n_components=2, random_state=42).fit_transform(X)
+    plot_projection(points, [cluster for _, cluster in sample],
+                    f"TruncatedSVD · échantillon de {len(sample)} logs sur {total}",
+                    "Composante SVD", show=show)
+
+def run_large(log_file, n_clusters=5, batch_size=BATCH_SIZE, sample_size=PLOT_SAMPLE_SIZE, show=True, query=None):
+    """Mode grands volumes : deux passes en flux, mémoire bornée quel que soit le fichier"""
+    vectorizer = make_hashing_vectorizer()
+    kmeans = fit_streaming(log_file, vectorizer, n_clusters, batch_size, query)
+    analysis, first_logs, sample, total = predict_streaming(log_file, vectorizer, kmeans, batch_size, sample_size, query)
+    visualize_sample(sample, vectorizer, total, show)
+    export_results(first_logs, analysis, total)
+    return analysis, total
+
+@instrument.traced(items=lambda result, *args, **kwargs: result[3])
+def mine_templates(file_path, miner=None, batch_size=BATCH_SIZE, query=None):
+    """Regroupement par gabarits en un seul passage, sans nombre de clusters fixé à l'avance
+    
+    Le cluster d'un log est l'identifiant de son gabarit (message de
+    l'en-tête, sans les lignes de traceback).
+    """
+    miner = miner or TemplateMiner()
+    analysis = None
+    first_logs = {}
+    total = 0
+    
+    for batch in iter_batches(select_records(file_path, query), batch_size):
+        for log in batch:
+            log.cluster = miner.add(log.first_message).id
+            first_logs.setdefault(log.cluster, log)
+        analysis = analyze_clusters(batch, analysis, MAX_ERROR_PATTERNS)
+        total += len(batch)
+    
+    if not total:
+        raise ValueError("Aucun log valide à analyser")
+    print(f"[SUCCÈS] {total} logs regroupés en {len(miner)} gabarits")
+    return miner, analysis, list(first_logs.values()), total
+
+def run_templates(log_file, batch_size=BATCH_SIZE, query=None):
+    """Mode gabarits : un passage en flux puis export results/analysis_*.json"""
+    miner, analysis, first_logs, total = mine_templates(log_file, batch_size=batch_size, query=query)
+    export_results(first_logs, analysis, total, miner)
+    return miner, analysis
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clusterisation KMeans des logs Odoo")
+    parser.add_argument("log_file", nargs="?", default=LOG_FILE, help="Fichier de log à analyser")
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de processus de parsing")
+    parser.add_argument("--cache", action="store_true", help="Réutiliser le cache colonnaire du parsing (cache/)")
+    parser.add_argument("--large", action="store_true",
+                        help="Grands volumes : HashingVectorizer, MiniBatchKMeans en flux, TruncatedSVD")
+    parser.add_argument("--templates", action="store_true",
+                        help="Regroupement par gabarits (TemplateMiner) au lieu de TF-IDF + KMeans")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Taille des lots en mode --large / --templates")
+    parser.add_argument("--sample-size", type=int, default=PLOT_SAMPLE_SIZE,
+                        help="Points affichés au plus en mode --large")
+    parser.add_argument("--headless", action="store_true",
+                        help="Backend Agg : graphique sauvegardé sans fenêtre (cron)")
+    add_query_arguments(parser)
+    add_model_arguments(parser)
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+    query = query_from_args(parser, args)  # None : fichier entier
+    model_options = model_options_from_args(args)  # None : vectoriseur et KMeans réajustés à chaque exécution
+    if model_options and (args.large or args.templates):
+        parser.error("--model / --retrain s'appliquent au mode TF-IDF + KMeans par défaut")
+    if (args.workers > 1 or args.cache) and (args.large or args.templates):
+        parser.error("--workers / --cache s'appliquent au mode TF-IDF + KMeans par défaut (--large / --templates lisent le log en flux)")
+
     try:
         # 1. Configuration
-        log_file = setup_logging()
+        instrument.start_from_args("kmeans", args)
+        log_file = setup_logging(args.log_file)
+        if args.headless:
+            use_headless()
+        
+        if args.templates:
+            run_templates(log_file, args.batch_size, query)
+            print("\n[TERMINÉ] Analyse complétée avec succès!")
+            exit(0)
+        
+        if args.large:
+            run_large(log_file, batch_size=args.batch_size, sample_size=args.sample_size,
+                      show=not args.headless, query=query)
+            print("\n[TERMINÉ] Analyse complétée avec succès!")
+            exit(0)
         
         # 2. Parsing des logs
-        logs = parse_logs(log_file)
+        logs = parse_logs(log_file, args.workers, args.cache, query)
         if not logs:
             raise ValueError("Aucun log valide à analyser")
         
-        # 3. Clusterisation
-        logs, X, vectorizer = cluster_logs(logs)
+        # 3. Clusterisation (modèle enregistré : inférence seule, sauf réentraînement)
+        model_info = None
+        if model_options:
+            logs, X, model_info = cluster_with_model(logs, source=os.path.abspath(log_file), **model_options)
+        else:
+            logs, X, vectorizer = cluster_logs(logs)
         
         # 4. Analyse
-        analysis = analyze_clusters(logs)
+        with instrument.stage("analyze_clusters", len(logs)):
+            analysis = analyze_clusters(logs)
         
         # 5. Visualisation
-        visualize_results(logs, X)
+        visualize_results(logs, X, show=not args.headless)
         
         # 6. Export
-        export_results(logs, analysis)
+        export_results(logs, analysis, model=model_info)
         
         print("\n[TERMINÉ] Analyse complétée avec succès!")
         
     except Exception as e:
         print(f"\n[ERREUR] {str(e)}")
         exit(1)
+    finally:
+        instrument.finish()  # Trace écrite dans results/ avec --trace / --profile / --trace-malloc
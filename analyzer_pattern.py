@@ -1,76 +1,267 @@
 #analyzer_pattern
+import argparse                                                                 # Importation du module argparse pour les options en ligne de commande
 import json                                                                     # Importation du module json pour lire les fichiers JSON
-import re                                                                       # Importation du module re pour utiliser les expressions régulières
+import hashlib                                                                  # Empreinte des listes de motifs (validité du checkpoint)
+import os                                                                       # Présence du rapport en mode incrémental
+from pattern_engine import PatternSet                                           # Moteur de motifs compilés (une seule regex par liste)
+from log_source import STDIN, open_log                                          # Ouverture paresseuse des logs (fichier, .gz/.bz2, stdin)
+from parallel_parse import is_splittable, map_chunks                            # Analyse multi-cœur par plages d'octets
+from checkpoint import Checkpoint, is_resumable                                 # Reprise incrémentale (octets ajoutés uniquement)
+from parse_cache import load_or_parse                                           # Cache colonnaire du parsing (cache/)
+from log_index import add_query_arguments, load_or_build, query_from_args       # Sélection indexée (--from/--to/--level/--user/--module)
+import instrument                                                               # Mesures par étape (--trace / --profile / --trace-malloc)
+
+LOG_FILE = "odoo.log.txt"                                                       # Fichier de log analysé par défaut
+REPORT_FILE = "anomalies_report.txt"                                            # Rapport des anomalies
+WRITE_BUFFER = 1 << 20                                                          # Taille du tampon d'écriture du rapport (1 Mo)
+STATE_FORMAT = 2                                                                # État du checkpoint : effectifs par motif (plus de liste d'anomalies)
+COST_TABLE_ROWS = 10                                                            # Motifs affichés dans la table coût / correspondances
+_worker_pattern_sets = None                                                     # Motifs compilés une fois par worker
+
 
 # ----------------Charger les patterns connus----------------
-try:
-    with open("known_anomalies.json", "r") as f:                                # Ouvrir le fichier des anomalies connues en lecture
-        known_patterns = json.load(f)                                           # Charger les motifs d'erreurs à partir du fichier JSON
-except FileNotFoundError:                                                       # Si le fichier n'existe pas
-    print("Erreur : Le fichier 'known_anomalies.json' est introuvable.")        # Message d'erreur
-    exit(1)                                                                     # Arrêt du programme
+def load_pattern_sets():
+    try:
+        with open("known_anomalies.json", "r") as f:                            # Ouvrir le fichier des anomalies connues en lecture
+            known_patterns = json.load(f)                                       # Charger les motifs d'erreurs à partir du fichier JSON
+    except FileNotFoundError:                                                   # Si le fichier n'existe pas
+        print("Erreur : Le fichier 'known_anomalies.json' est introuvable.")    # Message d'erreur
+        exit(1)                                                                 # Arrêt du programme
 
+    # ----------------Charger les faux positifs----------------
+    try:
+        with open("false_positives.json", "r") as f:                            # Ouvrir le fichier des faux positifs en lecture
+            false_positives = json.load(f)                                      # Charger les faux positifs depuis le fichier JSON
+    except FileNotFoundError:                                                   # Si le fichier n'existe pas
+        false_positives = []                                                    # Initialiser une liste vide de faux positifs
 
+    # ----------------Compiler les motifs une seule fois----------------
+    return PatternSet(false_positives), PatternSet(known_patterns)              # Alternances uniques (faux positifs, anomalies connues)
 
-# ----------------Charger les faux positifs----------------
-try:
-    with open("false_positives.json", "r") as f:                                # Ouvrir le fichier des faux positifs en lecture
-        false_positives = json.load(f)                                          # Charger les faux positifs depuis le fichier JSON
-except FileNotFoundError:                                                       # Si le fichier n'existe pas
-    false_positives = []                                                        # Initialiser une liste vide de faux positifs
 
+# ----------------Analyse d'une ligne----------------
+def match_line(line, false_positive_set, known_pattern_set):
+    # Extraire la vraie partie message : tout ce qui est après le dernier ":"
+    if ':' not in line:                                                         # Si la ligne est mal formée (pas de ":"), on l’ignore
+        return None
+    message = line.rsplit(':', 1)[-1].strip()                                   # Prendre la dernière partie après les ":"
 
+    # ----------------Vérifier les faux positifs----------------
+    if false_positive_set.matches_any(message):                                 # Vérifie si un faux positif est présent dans le message
+        return None                                                             # Si oui, ignorer cette ligne
 
+    # Chercher les anomalies dans le message uniquement (premier motif de la liste qui correspond)
+    return known_pattern_set.first_match(message)                               # Une seule recherche pour tous les motifs connus
 
-# ----------------Charger le fichier log----------------
-try:
-    with open("odoo.log.txt", "r", encoding="utf-8") as f:                      # Ouvrir le fichier de log
-        log_lines = f.readlines()                                               # Lire toutes les lignes du fichier de log
-except FileNotFoundError:                                                       # Si le fichier n'existe pas
-    print("Erreur : Le fichier 'odoo.log.txt' est introuvable.")                # Message d'erreur
-    exit(1)                                                                     # Arrêt du programme
 
+# ----------------Parcourir chaque ligne du fichier log avec son numéro---------
+def iter_anomalies(lines, false_positive_set, known_pattern_set, start=1):
+    for i, line in enumerate(lines, start=start):                               # Lecture paresseuse : une ligne à la fois
+        line = line.strip()                                                     # Supprimer les espaces blancs en début et fin de ligne
+        pattern = match_line(line, false_positive_set, known_pattern_set)       # Motif détecté (ou None)
+        if pattern is not None:
+            yield {                                                             # Anomalie détectée
+                "line_number": i,                                               # Numéro de ligne
+                "log": line,                                                    # Contenu de la ligne
+                "pattern": pattern                                              # Motif détecté
+            }
 
 
-# ----------------Analyse----------------
-anomalies = []                                                                  # Liste pour stocker les anomalies détectées
+def iter_record_anomalies(records, false_positive_set, known_pattern_set):
+    for record in records:                                                      # Enregistrements issus du parseur partagé
+        for i, line in record.physical_lines():                                 # Chaque ligne physique avec son numéro d'origine
+            pattern = match_line(line, false_positive_set, known_pattern_set)   # Motif détecté (ou None)
+            if pattern is not None:
+                yield {"line_number": i, "log": line, "pattern": pattern}       # Anomalie détectée
 
-print("Analyse des logs...\n")                                                  # Message de début d'analyse
 
-# ----------------Parcourir chaque ligne du fichier log avec son numéro---------
-for i, line in enumerate(log_lines, start=1):
-    line = line.strip()                                                         # Supprimer les espaces blancs en début et fin de ligne
+# ----------------Analyse parallèle----------------
+def anomalies_chunk(lines):
+    global _worker_pattern_sets
+    if _worker_pattern_sets is None:                                            # Compilation unique dans chaque processus
+        _worker_pattern_sets = load_pattern_sets()
+    return list(iter_anomalies(lines, *_worker_pattern_sets))                   # Numéros de ligne locaux à la plage
 
-    # Extraire la vraie partie message : tout ce qui est après le dernier ":"
-    if ':' in line:                                                             # Vérifie si la ligne contient un caractère ":"
-        message = line.split(':')[-1].strip()                                   # Prendre la dernière partie après les ":"
-    else:
-        continue                                                                # Si la ligne est mal formée (pas de ":"), on l’ignore
 
-    # ----------------Vérifier les faux positifs----------------
-    if any(re.search(fp, message, re.IGNORECASE) for fp in false_positives):    # Vérifie si un faux positif est présent dans le message
-        continue                                                                # Si oui, ignorer cette ligne
-
-    # Chercher les anomalies dans le message uniquement
-    for pattern in known_patterns:                                              # Pour chaque motif d'erreur connu
-        if re.search(pattern, message, re.IGNORECASE):                          # Si le motif est trouvé dans le message
-            print(f"Ligne {i} | Pattern: {pattern} | Log: {line}")              # Afficher l’anomalie trouvée
-            anomalies.append({                                                  # Ajouter l’anomalie à la liste
-                "line_number": i,                                               # Numéro de ligne
-                "log": line,                                                    # Contenu de la ligne
-                "pattern": pattern                                              # Motif détecté
-            })
-            break                                                               # Une seule détection par ligne est suffisante
+def iter_parallel_anomalies(log_file, workers):
+    for offset, chunk in map_chunks(log_file, anomalies_chunk, workers):        # Plages traitées en parallèle, restituées dans l'ordre
+        for a in chunk:
+            a["line_number"] += offset                                          # Recaler sur la numérotation du fichier
+            yield a
+
+
+# ----------------Mode incrémental (checkpoint)----------------
+def pattern_signature(false_positive_set, known_pattern_set):
+    patterns = json.dumps([STATE_FORMAT, false_positive_set.patterns, known_pattern_set.patterns]) # Motifs dans l'ordre
+    return hashlib.sha1(patterns.encode("utf-8")).hexdigest()                   # Modifier un motif (ou l'état) repart de zéro
+
+
+def incremental_anomalies(log_file, false_positive_set, known_pattern_set, output_file=REPORT_FILE,
+                          checkpoint_file=None):
+    signature = pattern_signature(false_positive_set, known_pattern_set)        # Configuration associée au checkpoint
+    checkpoint = Checkpoint(log_file, "pattern", checkpoint_file, signature).resume() # Rotation / troncature → repart de l'octet 0
+    if checkpoint.restarted is None and not os.path.exists(output_file):
+        checkpoint.restart("rapport absent")                                    # Rapport supprimé : reconstruit depuis le début
+    if checkpoint.restarted:
+        print(f"Analyse depuis le début du fichier ({checkpoint.restarted}).")  # Premier passage, rotation ou troncature
+        open(output_file, "w", encoding="utf-8").close()                        # Rapport remis à zéro, puis complété en flux
+    state = checkpoint.state or {"total": 0, "counts": {}}                      # Effectifs seulement : taille fixe, quel que soit le log
+    counts = state["counts"]
+
+    def counted(anomalies):
+        for a in anomalies:
+            counts[a["pattern"]] = counts.get(a["pattern"], 0) + 1              # Effectif cumulé par motif
+            yield a
+
+    new = write_report(counted(iter_anomalies(checkpoint.iter_new_lines(),      # Seules les lignes ajoutées sont lues
+                                              false_positive_set, known_pattern_set,
+                                              start=checkpoint.line_count + 1)),
+                       output_file, append=True)                                # Nouvelles anomalies ajoutées au rapport
+    state["total"] += new
+    checkpoint.save(state)                                                      # Nouvelle position + effectifs cumulés
+    return checkpoint, new
+
+
+def format_anomaly(a):
+    return f"Ligne {a['line_number']} | Pattern: {a['pattern']} | Log: {a['log']}"  # Une anomalie sur une seule ligne
 
-# Résumé
-if not anomalies:                                                               # Si aucune anomalie détectée
-    print("Aucune anomalie détectée.")                                          # Message d’absence d’erreurs
-else:
-    print(f"Nombre total d'anomalies détectées : {len(anomalies)}")             # Afficher le total détecté
 
-    # Export du rapport
-    with open("anomalies_report.txt", "w", encoding="utf-8") as report:         # Créer/écraser le fichier rapport
-        for a in anomalies:                                                     # Parcourir les anomalies
-            report.write(f"Ligne {a['line_number']} | Pattern: {a['pattern']} | Log: {a['log']}\n")  # Écrire chaque anomalie sur une seule ligne
+def main():
+    parser = argparse.ArgumentParser(description="Détection d'anomalies dans les logs Odoo")
+    parser.add_argument("log_file", nargs="?", default=LOG_FILE,
+                        help="Fichier de log (.gz/.bz2 acceptés, '-' pour stdin)")
+    parser.add_argument("-o", "--output", default=REPORT_FILE, help="Fichier rapport")
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de processus d'analyse")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reprise au dernier checkpoint : seules les lignes ajoutées sont analysées")
+    parser.add_argument("--checkpoint", help="Fichier checkpoint (défaut : checkpoints/<log>.<hash>.pattern.json)")
+    parser.add_argument("--cache", action="store_true", help="Réutiliser le cache colonnaire du parsing (cache/)")
+    add_query_arguments(parser)
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+    query = query_from_args(parser, args)                                       # None : fichier entier
+    if query is not None and args.incremental:
+        parser.error("--incremental ne se combine pas avec une sélection indexée")
+
+    trace = instrument.start_from_args("pattern", args)                         # None sans --trace / --profile / --trace-malloc
+    with instrument.stage("load_pattern_sets"):
+        false_positive_set, known_pattern_set = load_pattern_sets()
+    in_workers = args.workers > 1 and not args.cache and query is None          # Les workers ont leurs propres motifs
+    if trace is not None and not in_workers:
+        false_positive_set.enable_stats()                                       # Essais, correspondances et coût par motif
+        known_pattern_set.enable_stats()
+
+    if args.incremental:
+        with instrument.stage("incremental"):
+            run_incremental(args, false_positive_set, known_pattern_set)
+        finish_trace(false_positive_set, known_pattern_set)
+        return
+
+    try:
+        index = load_or_build(args.log_file, args.workers) if query else None   # Index (construit si absent ou obsolète)
+    except (FileNotFoundError, ValueError) as e:                                # Fichier absent, compressé ou stdin
+        print(f"Erreur : {e}")
+        exit(1)
+
+    try:
+        log = open_log(args.log_file)                                           # Ouvrir le fichier de log (lecture paresseuse)
+    except FileNotFoundError:                                                   # Si le fichier n'existe pas
+        print(f"Erreur : Le fichier '{args.log_file}' est introuvable.")        # Message d'erreur
+        exit(1)                                                                 # Arrêt du programme
+
+    print("Analyse des logs...\n")                                              # Message de début d'analyse
+
+    try:
+        if args.cache and query is None:
+            with instrument.stage("load_or_parse"):
+                parsed = load_or_parse(args.log_file, args.workers)             # Cache colonnaire (construit si absent)
+        with instrument.stage("pattern_loop") as span:                          # Lecture, motifs et écriture du rapport (en flux)
+            if query is not None:
+                records = instrument.counted(index.select(query), span)         # Seules les plages retenues sont lues
+                anomalies = iter_record_anomalies(records, false_positive_set, known_pattern_set)
+            elif args.cache:
+                records = instrument.counted(parsed.records(), span)            # Lignes physiques relues depuis le cache
+                anomalies = iter_record_anomalies(records, false_positive_set, known_pattern_set)
+            elif args.workers > 1 and is_splittable(args.log_file):
+                anomalies = iter_parallel_anomalies(args.log_file, args.workers) # Plages d'octets réparties sur les workers
+            else:
+                anomalies = iter_anomalies(instrument.counted(log, span), false_positive_set, known_pattern_set)
+            count = write_report(anomalies, args.output, line_buffered=args.log_file == STDIN)
+            span['anomalies'] = count
+    finally:
+        log.close()
+
+    print_summary(count, args.output)
+    finish_trace(false_positive_set, known_pattern_set)
+
+
+def finish_trace(false_positive_set, known_pattern_set):
+    """Écrit la trace (si active) avec la table coût / correspondances de chaque liste de motifs"""
+    if instrument.active() is not None:
+        instrument.finish(pattern_stats=pattern_cost_tables(false_positive_set, known_pattern_set))
+
+
+def pattern_cost_tables(false_positive_set, known_pattern_set):
+    """Tables coût / correspondances des deux listes, affichées ; {} sans enable_stats (workers)"""
+    if not hasattr(known_pattern_set, "tries"):
+        return {}
+    tables = {"false_positives": false_positive_set.stats_table(), "known_anomalies": known_pattern_set.stats_table()}
+    for name, table in tables.items():
+        print_pattern_costs(name, table)
+    return tables
+
+
+def print_pattern_costs(name, table, rows=COST_TABLE_ROWS):
+    print(f"\n[TRACE] Motifs {name} : {table['searches']} recherches, préfiltre {table['prefilter_seconds']:.3f} s")
+    print(f"{'motif':<40} {'essais':>9} {'corresp.':>9} {'temps (s)':>10} {'µs/essai':>9}")
+    for row in table['patterns'][:rows]:
+        cost = f"{row['us_per_try']:.2f}" if row['us_per_try'] is not None else "-"
+        print(f"{row['pattern'][:40]:<40} {row['tries']:>9} {row['hits']:>9} {row['seconds']:>10.3f} {cost:>9}")
+
+
+def run_incremental(args, false_positive_set, known_pattern_set):
+    if not is_resumable(args.log_file):
+        print("Erreur : --incremental exige un fichier non compressé.")         # Pas de reprise par octet sur .gz/.bz2/stdin
+        exit(1)
+
+    print("Analyse des logs...\n")                                              # Message de début d'analyse
+    try:
+        checkpoint, new = incremental_anomalies(args.log_file, false_positive_set,
+                                                known_pattern_set, args.output, args.checkpoint)
+    except FileNotFoundError:                                                   # Si le fichier n'existe pas
+        print(f"Erreur : Le fichier '{args.log_file}' est introuvable.")        # Message d'erreur
+        exit(1)                                                                 # Arrêt du programme
+
+    print(f"\nLignes jusqu'à {checkpoint.line_count} analysées : {new} nouvelle(s) anomalie(s).")
+    print_summary(checkpoint.state["total"], args.output)                       # Total cumulé depuis le début du fichier
+
+
+# ----------------Écriture incrémentale du rapport----------------
+def write_report(anomalies, output_file=REPORT_FILE, line_buffered=False, append=False):
+    count = 0                                                                   # Nombre d'anomalies (aucune liste gardée en mémoire)
+    report = None                                                               # Rapport ouvert à la première anomalie seulement
+    try:
+        for a in anomalies:
+            print(format_anomaly(a))                                            # Afficher l’anomalie trouvée
+            if report is None:                                                  # Créer/écraser le fichier rapport
+                # En flux (stdin), chaque anomalie est écrite immédiatement
+                report = open(output_file, "a" if append else "w", encoding="utf-8",
+                              buffering=1 if line_buffered else WRITE_BUFFER)
+            report.write(format_anomaly(a) + "\n")                              # Écriture incrémentale, tamponnée
+            count += 1
+    finally:
+        if report is not None:
+            report.close()
+    return count
+
+
+# Résumé
+def print_summary(count, output_file=REPORT_FILE):
+    if not count:                                                               # Si aucune anomalie détectée
+        print("Aucune anomalie détectée.")                                      # Message d’absence d’erreurs
+    else:
+        print(f"Nombre total d'anomalies détectées : {count}")                  # Afficher le total détecté
+        print(f"Rapport sauvegardé dans {output_file}")                         # Confirmation de sauvegarde
 
-    print("Rapport sauvegardé dans anomalies_report.txt")                       # Confirmation de sauvegarde
+if __name__ == "__main__":
+    main()
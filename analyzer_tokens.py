@@ -1,14 +1,25 @@
 # analyzer_tokens.py - Script d'analyse des logs Odoo par utilisateur et type
 
+import argparse                                                                                                      # Importation du module argparse pour les options en ligne de commande
 import re                                                                                                            # Importation du module re pour les expressions régulières
 from collections import defaultdict                                                                                  # Importation de defaultdict pour créer des dictionnaires avec valeurs par défaut
-import matplotlib.pyplot as plt                                                                                      # Importation de pyplot pour la génération de graphiques
 import sys                                                                                                           # Importation du module sys pour la gestion des sorties du programme
 import json                                                                                                          # Importation du module json pour la manipulation de fichiers JSON
+from odoo_log_parser import iter_file_records, iter_records                                                          # Parseur partagé des logs Odoo
+from mmap_scan import scan_user_stats                                                                                # Comptage sur octets (fichier projeté en mémoire)
+from parallel_parse import is_splittable, map_chunks                                                                 # Parsing multi-cœur par plages d'octets
+from checkpoint import Checkpoint, is_resumable                                                                      # Reprise incrémentale (octets ajoutés uniquement)
+from parse_cache import load_or_parse                                                                                # Cache colonnaire du parsing (cache/)
+from aggregate import LineTable                                                                                      # Agrégation vectorisée (bincount sur codes entiers)
+from report_render import new_figure, save_figure, use_headless                                                      # Rendu orienté objet, backend Agg sans affichage
+from log_index import add_query_arguments, load_or_build, query_from_args                                            # Sélection indexée (--from/--to/--level/--user/--module)
+import instrument                                                                                                    # Mesures par étape (--trace / --profile / --trace-malloc)
 
 ERROR_KEYWORDS = re.compile(r"error|exception|failed")                                                               # Regex pour les erreurs
 WARNING_KEYWORDS = re.compile(r"warning")                                                                            # Regex pour les warnings
 USER_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d+\s+\d+\s+(INFO|ERROR|WARNING)\s+(\w+)")           # Regex pour extraire l'utilisateur
+TRACKED_LEVELS = ("INFO", "ERROR", "WARNING")                                                                        # Niveaux reconnus par USER_PATTERN
+LOG_FILE = "odoo.log.txt"                                                                                            # Fichier de log par défaut
 
 def categorize_log(line):                                                                                            # Fonction de catégorisation des lignes de log
     line_lower = line.lower()                                                                                        # Conversion en minuscules
@@ -22,41 +33,130 @@ def extract_user(line):
     match = USER_PATTERN.search(line)                                                                                # Application de la regex
     return match.group(2).lower() if match else "unknown"                                                            # Retourne l'utilisateur ou "unknown"
 
-def main():                                                                                                          # Fonction principale
-    try:
-        with open("odoo.log.txt", "r", encoding="utf-8") as f: lines = [line.strip() for line in f if line.strip()]  # Lecture et nettoyage du log
-        if not lines: print("Aucun log à analyser : le fichier est vide."); sys.exit(0)                              # Fichier vide
-    except FileNotFoundError: print("Erreur : fichier odoo.log.txt introuvable."); sys.exit(1)                       # Fichier introuvable
-    except UnicodeDecodeError: print("Erreur : problème d'encodage (utilisez UTF-8)."); sys.exit(1)                  # Problème d'encodage
+def record_user(record, number, line):                                                                               # Utilisateur d'une ligne physique d'un enregistrement
+    if number == record.line and record.level in TRACKED_LEVELS: return record.user.lower()                          # En-tête déjà parsé → pas de nouvelle regex
+    return extract_user(line)                                                                                        # Continuation / orphelin / niveau non suivi
+
+@instrument.traced(items=lambda table, records: len(table))                                                          # Étape mesurée : lignes physiques codées
+def compute_line_table(records):                                                                                     # Une entrée par ligne physique : seulement pour --timeseries (horodatage par ligne)
+    return LineTable.from_records(records, extract_user, TRACKED_LEVELS)                                             # Codes entiers dans des tableaux NumPy
+
+@instrument.traced(items=lambda table, parsed: len(table))                                                           # Idem depuis le cache
+def cached_line_table(parsed):                                                                                       # Même table depuis le cache colonnaire (parse_cache)
+    return LineTable.from_parsed(parsed, extract_user, TRACKED_LEVELS)                                               # Mots-clés cherchés sur le blob des en-têtes, sans boucle par ligne
 
+def compute_user_stats(records):                                                                                     # Comptage en flux par utilisateur et catégorie (mémoire : un compteur par utilisateur)
     user_stats = defaultdict(lambda: {"error": 0, "warning": 0, "info": 0})                                          # Stats par utilisateur
 
-    for line in lines:                                                                                               # Parcours des lignes
-        category = categorize_log(line)                                                                              # Déterminer la catégorie
-        user = extract_user(line)                                                                                    # Extraire l'utilisateur
-        user_stats[user][category] += 1                                                                              # Incrémenter le compteur
+    for record in records:                                                                                           # Parcours des enregistrements (parseur partagé)
+        for number, line in record.physical_lines():                                                                 # Une entrée par ligne physique non vide
+            category = categorize_log(line)                                                                          # Déterminer la catégorie
+            user = record_user(record, number, line)                                                                 # Extraire l'utilisateur
+            user_stats[user][category] += 1                                                                          # Incrémenter le compteur
+
+    return user_stats
+
+def user_stats_chunk(lines):                                                                                         # Tâche d'un worker : stats d'une plage du log
+    return {user: dict(counts) for user, counts in compute_user_stats(iter_records(lines)).items()}                  # Dict simple (sérialisable)
+
+def line_table_chunk(lines):                                                                                         # Tâche d'un worker (--timeseries) : table d'une plage du log
+    return compute_line_table(iter_records(lines))                                                                   # Tableaux NumPy (sérialisation compacte)
+
+def merge_user_stats(parts):                                                                                         # Fusion des stats partielles dans l'ordre du fichier
+    user_stats = defaultdict(lambda: {"error": 0, "warning": 0, "info": 0})                                          # Même ordre d'apparition des utilisateurs qu'en série
+    for part in parts:
+        for user, counts in part.items():
+            for category, value in counts.items(): user_stats[user][category] += value                              # Somme des compteurs
+    return user_stats
 
+@instrument.traced()                                                                                                 # Lecture des octets ajoutés et fusion
+def incremental_user_stats(log_file, checkpoint_file=None):                                                          # Mode incrémental : seules les lignes ajoutées sont lues
+    checkpoint = Checkpoint(log_file, "tokens", checkpoint_file).resume()                                            # Inode, position et compteurs du passage précédent
+    if checkpoint.restarted: print(f"Analyse depuis le début du fichier ({checkpoint.restarted}).")                  # Rotation, troncature ou premier passage
+    first_line = checkpoint.line_count + 1                                                                           # Première ligne non encore analysée
+    new_stats = compute_user_stats(iter_records(checkpoint.iter_new_lines(), first_line))                            # Comptage des nouvelles lignes
+    user_stats = merge_user_stats([checkpoint.state or {}, new_stats])                                               # Fusion dans l'état agrégé (ordre d'apparition conservé)
+    checkpoint.save(user_stats)                                                                                      # Nouvelle position + compteurs cumulés
+    print(f"Lignes {first_line} à {checkpoint.line_count} analysées (checkpoint : {checkpoint.checkpoint_file}).")   # Résumé du passage
+    return user_stats
+
+@instrument.traced(items=lambda result, user_stats, *args, **kwargs: len(user_stats))                                # Une barre par utilisateur et catégorie
+def plot_user_stats(user_stats, output_file="log_report.png", show=True):                                            # Graphique en barres groupées (show=False : headless)
     users = sorted(user_stats.keys())                                                                                # Tri des utilisateurs
     categories = ["error", "warning", "info"]                                                                        # Types à afficher
     colors = {"error": "#E74C3C", "warning": "#F1C40F", "info": "#3498DB"}                                           # Couleurs des barres
 
-    plt.figure(figsize=(14, 6))                                                                                      # Taille de la figure
+    fig = new_figure((14, 6), show)                                                                                  # Figure orientée objet (hors pyplot en headless)
+    ax = fig.subplots()                                                                                              # Axes uniques
 
     for i, cat in enumerate(categories):                                                                             # Pour chaque type
         values = [user_stats[user][cat] for user in users]                                                           # Récupère les valeurs
-        plt.bar([x + i * 0.2 for x in range(len(users))], values, width=0.2, label=cat.upper(), color=colors[cat])   # Barres empilées
+        ax.bar([x + i * 0.2 for x in range(len(users))], values, width=0.2, label=cat.upper(), color=colors[cat])    # Barres empilées
+
+    ax.set_xticks([x + 0.2 for x in range(len(users))], users, rotation=45)                                          # Noms utilisateurs
+    ax.set_ylabel("Nombre de logs")                                                                                  # Axe Y
+    ax.set_title("Logs Odoo par utilisateur et type", weight="bold")                                                 # Titre
+    ax.legend()                                                                                                      # Légende
+    ax.grid(axis="y", linestyle="--", alpha=0.3)                                                                     # Grille horizontale
+    fig.tight_layout()                                                                                               # Ajustement auto
+    save_figure(fig, output_file, show)                                                                              # Sauvegarde (affichage seulement si show)
+
+@instrument.traced()                                                                                                 # Écriture de user_stats.json
+def export_user_stats(user_stats, output_file="user_stats.json"):                                                    # Export JSON
+    with open(output_file, "w") as f: json.dump(user_stats, f, indent=4)                                             # Export JSON
+
+@instrument.traced()                                                                                                 # Écriture de user_timeseries.json
+def export_timeseries(table, output_file="user_timeseries.json", bucket=60, category="error"):                       # Histogramme par utilisateur et par case de temps
+    series = table.timeseries(category, bucket * 1000)                                                               # Group-by vectorisé (utilisateur, case)
+    output = {"bucket_seconds": bucket, "category": category, "series": series}                                      # Cases vides omises
+    with open(output_file, "w") as f: json.dump(output, f, indent=4)                                                 # Export JSON
 
-    plt.xticks([x + 0.2 for x in range(len(users))], users, rotation=45)                                             # Noms utilisateurs
-    plt.ylabel("Nombre de logs")                                                                                     #Axe Y
-    plt.title("Logs Odoo par utilisateur et type", weight="bold")                                                    # Titre
-    plt.legend()                                                                                                     # Légende
-    plt.grid(axis="y", linestyle="--", alpha=0.3)                                                                    # Grille horizontale
-    plt.tight_layout()                                                                                               # Ajustement auto
-    plt.savefig("log_report.png")                                                                                    # Sauvegarde du graphique
-    plt.show()                                                                                                       # Affichage
+def main():                                                                                                          # Fonction principale
+    parser = argparse.ArgumentParser(description="Statistiques des logs Odoo par utilisateur")                       # Options en ligne de commande
+    parser.add_argument("log_file", nargs="?", default=LOG_FILE, help="Fichier de log (.gz/.bz2, '-' pour stdin)")   # Fichier de log optionnel
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de processus de parsing")                    # Parsing parallèle par plages d'octets
+    parser.add_argument("--mmap", action="store_true", help="Comptage sur octets via mmap (fichiers non compressés)") # Mode sans allocation par ligne
+    parser.add_argument("--incremental", action="store_true", help="Reprise au dernier checkpoint (log qui grossit)") # Cron : seuls les octets ajoutés
+    parser.add_argument("--checkpoint", help="Fichier checkpoint (défaut : checkpoints/<log>.<hash>.tokens.json)")   # Emplacement du checkpoint
+    parser.add_argument("--cache", action="store_true", help="Réutiliser le cache colonnaire du parsing (cache/)")   # Pas de re-parsing si le log n'a pas changé
+    parser.add_argument("--timeseries", action="store_true", help="Histogramme des erreurs par utilisateur et par minute") # → user_timeseries.json
+    parser.add_argument("--bucket", type=int, default=60, help="Largeur des cases de --timeseries (secondes)")       # Une case par minute par défaut
+    parser.add_argument("--headless", action="store_true", help="Backend Agg, aucune fenêtre (cron)")                # Graphique sauvegardé sans plt.show()
+    add_query_arguments(parser)                                                                                      # Analyser seulement une sélection du log (index/)
+    instrument.add_arguments(parser)                                                                                 # --trace / --profile / --trace-malloc
+    args = parser.parse_args()
+    query = query_from_args(parser, args)                                                                            # None : fichier entier
+    per_line = args.incremental or not args.cache and (args.mmap and is_splittable(args.log_file) or not args.timeseries and args.workers <= 1) # Modes qui appellent les fonctions par ligne dans ce processus
+    if instrument.start_from_args("tokens", args) and per_line: instrument.hot_paths(globals(), "categorize_log", "extract_user") # Appels et temps cumulé (pas en --cache / --timeseries / workers)
+
+    table = None                                                                                                     # Table par ligne (absente en modes --incremental / --mmap)
+    try:
+        if args.incremental and not is_resumable(args.log_file): print("Erreur : --incremental exige un fichier non compressé."); sys.exit(1) # Reprise par octet impossible
+        if args.timeseries and (args.incremental or args.mmap): print("Erreur : --timeseries est incompatible avec --incremental et --mmap."); sys.exit(1) # Pas d'horodatage par ligne
+        if query and (args.incremental or args.mmap): print("Erreur : une sélection indexée est incompatible avec --incremental et --mmap."); sys.exit(1) # Lecture du fichier entier
+        with instrument.stage("user_stats"):                                                                         # Parsing et comptage, quel que soit le mode
+            if args.incremental: user_stats = incremental_user_stats(args.log_file, args.checkpoint)                 # Reprise au checkpoint
+            elif args.cache: table = cached_line_table(load_or_parse(args.log_file, args.workers))                   # Table construite depuis les colonnes du cache
+            elif args.mmap and is_splittable(args.log_file): user_stats = scan_user_stats(args.log_file, categorize_log, extract_user) # Mode mmap
+            elif args.timeseries:                                                                                    # Horodatage par ligne nécessaire : table en mémoire
+                if query: table = compute_line_table(load_or_build(args.log_file, args.workers).select(query))       # Seules les plages retenues sont lues
+                elif args.workers > 1: table = LineTable.concat(part for _, part in map_chunks(args.log_file, line_table_chunk, args.workers)) # Parallèle
+                else: table = compute_line_table(iter_file_records(args.log_file))                                   # Lecture paresseuse et codage
+            elif query: user_stats = compute_user_stats(load_or_build(args.log_file, args.workers).select(query))    # Seules les plages retenues sont lues
+            elif args.workers > 1: user_stats = merge_user_stats(part for _, part in map_chunks(args.log_file, user_stats_chunk, args.workers)) # Parallèle
+            else: user_stats = compute_user_stats(iter_file_records(args.log_file))                                  # Comptage en flux, sans table par ligne
+            if table is not None: user_stats = table.user_stats()                                                    # Comptage vectorisé (bincount)
+        if not user_stats: print("Aucun log à analyser : le fichier est vide."); sys.exit(0)                         # Fichier vide
+    except FileNotFoundError: print(f"Erreur : fichier {args.log_file} introuvable."); sys.exit(1)                   # Fichier introuvable
+    except UnicodeDecodeError: print("Erreur : problème d'encodage (utilisez UTF-8)."); sys.exit(1)                  # Problème d'encodage
+    except ValueError as e: print(f"Erreur : {e}"); sys.exit(1)                                                      # Sélection sur un fichier compressé ou stdin
 
-    with open("user_stats.json", "w") as f: json.dump(user_stats, f, indent=4)                                      # Export JSON
+    if args.headless: use_headless()                                                                                 # Aucune fenêtre : rien ne bloque
+    plot_user_stats(user_stats, show=not args.headless)                                                              # Graphique
+    export_user_stats(user_stats)                                                                                    # Export JSON
+    if args.timeseries: export_timeseries(table, bucket=args.bucket)                                                 # Série temporelle
 
-    print("Terminé ! Rapport sauvegardé dans log_report.png et user_stats.json")                                    # Confirmation
+    print("Terminé ! Rapport sauvegardé dans log_report.png et user_stats.json")                                     # Confirmation
+    instrument.finish()                                                                                              # Trace écrite dans results/ si --trace
 
-if __name__ == "__main__": main()                                                                                   # Point d'entrée
+if __name__ == "__main__": main()                                                                                    # Point d'entrée
@@ -0,0 +1,89 @@
+# bench_aggregate.py - Comptages par dictionnaires imbriqués contre group-by NumPy (analyzer_tokens, analyzer_kmeans)
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from analyzer_kmeans import analyze_clusters
+from analyzer_tokens import cached_line_table, categorize_log, compute_line_table, record_user
+from odoo_log_parser import iter_file_records
+from parse_cache import load_or_parse
+from synthetic_log import write_synthetic_log
+
+
+def dict_user_stats(records):
+    """Référence : un incrément de defaultdict par ligne physique (ancien compute_user_stats)"""
+    user_stats = defaultdict(lambda: {"error": 0, "warning": 0, "info": 0})
+    for record in records:
+        for number, line in record.physical_lines():
+            user_stats[record_user(record, number, line)][categorize_log(line)] += 1
+    return user_stats
+
+
+def dict_analyze_clusters(logs, max_patterns=50):
+    """Référence : ancien analyze_clusters (deux incréments de defaultdict par log)"""
+    stats, error_patterns = defaultdict(lambda: defaultdict(int)), defaultdict(set)
+    for log in logs:
+        stats[log.cluster]['total'] += 1
+        stats[log.cluster][log.level] += 1
+        if log.level == 'ERROR' and len(error_patterns[log.cluster]) < max_patterns:
+            error_patterns[log.cluster].add(' '.join(log.message.split()[:5]))
+    return stats
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agrégations par utilisateur / cluster : boucles Python contre NumPy")
+    parser.add_argument("--lines", type=int, default=2000000, help="Nombre de lignes du log synthétique")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = write_synthetic_log(os.path.join(tmp, "synthetic.log"), args.lines)
+        records = list(iter_file_records(log_file))
+        parsed = load_or_parse(log_file, directory=os.path.join(tmp, "cache"))
+
+        reference, dict_time = timed(lambda: dict_user_stats(records))
+        table, records_time = timed(lambda: compute_line_table(records))
+        stats, stats_time = timed(table.user_stats)
+        cached, cached_time = timed(lambda: cached_line_table(parsed))
+        series, series_time = timed(lambda: cached.timeseries("error"))
+        if not json.dumps(reference) == json.dumps(stats) == json.dumps(cached.user_stats()):
+            print("[ERREUR] Statistiques par utilisateur différentes")
+            sys.exit(1)
+
+        logs = [record for record in records if not record.is_orphan]
+        rng = random.Random(42)
+        for log in logs:
+            log.cluster = rng.randrange(8)
+        clusters, dict_cluster_time = timed(lambda: dict_analyze_clusters(logs))
+        analysis, numpy_cluster_time = timed(lambda: analyze_clusters(logs, max_patterns=50))
+        if json.dumps(clusters) != json.dumps(analysis['cluster_stats']):
+            print("[ERREUR] Statistiques de clusters différentes")
+            sys.exit(1)
+        del parsed, cached
+
+    print(f"[BENCH] {args.lines} lignes physiques, {len(records)} enregistrements")
+    print(f"  user_stats, defaultdict par ligne           : {dict_time:8.3f} s")
+    print(f"  LineTable depuis les enregistrements        : {records_time:8.3f} s  (+ bincount {stats_time * 1000:.1f} ms)")
+    print(f"  LineTable depuis le cache colonnaire        : {cached_time:8.3f} s")
+    print(f"  erreurs par utilisateur et par minute       : {series_time * 1000:8.1f} ms  ({len(series)} utilisateurs)")
+    print(f"  analyze_clusters, defaultdict par log       : {dict_cluster_time:8.3f} s")
+    print(f"  analyze_clusters (bincount + motifs ERROR)  : {numpy_cluster_time:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
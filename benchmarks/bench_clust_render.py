@@ -0,0 +1,53 @@
+# bench_clust_render.py - Vue hiérarchique : rendu par occurrence contre vue agrégée (PNG top-K, HTML repliable)
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from analyzer_clust import build_hierarchy, build_summary, render_hierarchy, render_html, render_summary, summary_tree
+from odoo_log_parser import iter_file_records
+from synthetic_log import write_synthetic_log
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de rendu et taille des sorties de analyzer_clust selon la taille du log")
+    parser.add_argument("--lines", type=int, nargs="+", default=[2000, 100000, 1000000],
+                        help="Tailles de logs synthétiques à comparer")
+    parser.add_argument("--legacy-max", type=int, default=2000,
+                        help="Taille maximale rendue avec l'ancienne vue (une ligne par occurrence)")
+    args = parser.parse_args()
+
+    print(f"{'lignes':>9} {'agrégation':>11} {'PNG agrégé':>11} {'HTML':>8} {'PNG (Ko)':>9} {'HTML (Ko)':>10} "
+          f"{'ancien PNG':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_lines in args.lines:
+            log_file = write_synthetic_log(os.path.join(tmp, f"synthetic_{n_lines}.log"), n_lines)
+            records = list(iter_file_records(log_file))
+            png, html = os.path.join(tmp, "summary.png"), os.path.join(tmp, "summary.html")
+
+            tree, summary_time = timed(lambda: summary_tree(build_summary(records)))
+            _, png_time = timed(lambda: render_summary(tree, png))
+            _, html_time = timed(lambda: render_html(tree, html))
+            legacy = "-"
+            if n_lines <= args.legacy_max:
+                legacy_png = os.path.join(tmp, "legacy.png")
+                _, legacy_time = timed(lambda: render_hierarchy(build_hierarchy(records), legacy_png, show=False))
+                legacy = f"{legacy_time:.2f} s"
+            print(f"{n_lines:>9} {summary_time:>9.2f} s {png_time:>9.2f} s {html_time:>6.2f} s "
+                  f"{os.path.getsize(png) // 1024:>9} {os.path.getsize(html) // 1024:>10} {legacy:>11}")
+
+
+if __name__ == "__main__":
+    main()
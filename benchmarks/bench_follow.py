@@ -0,0 +1,101 @@
+# bench_follow.py - Latence des alertes et débit du mode suivi (follow.py)
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from follow import AlertThrottle, Counters, follow
+
+ANOMALY = "2025-04-06 16:40:03,333 8201 ERROR walid odoo.sql_db: Deadlock detected in transaction {}\n"
+
+
+class TimingSink:
+    """Note l'instant de réception de chaque alerte (clé : identifiant en fin de message)"""
+
+    def __init__(self):
+        self.received = {}
+
+    async def emit(self, alert):
+        self.received[alert["log"].rsplit(" ", 1)[-1]] = time.time()
+
+    def close(self):
+        pass
+
+
+async def write_anomalies(path, count, interval, sent):
+    await asyncio.sleep(0.3)                                                    # Laisser le suivi démarrer en fin de fichier
+    with open(path, "a", encoding="utf-8", buffering=1) as f:
+        for i in range(count):
+            sent[str(i)] = time.time()
+            f.write(ANOMALY.format(i))
+            await asyncio.sleep(interval)
+
+
+def latency(count, interval):
+    """Latence écriture → alerte, une anomalie distincte toutes les ``interval`` secondes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "odoo.log")
+        open(path, "w").close()
+        sink, sent = TimingSink(), {}
+
+        async def run():
+            writer = asyncio.create_task(write_anomalies(path, count, interval, sent))
+            await follow([path], [sink], AlertThrottle(dedup_window=0, rate_limit=0), Counters(),
+                         stats_interval=0, duration=0.3 + count * interval + 1.0)
+            await writer
+
+        asyncio.run(run())
+        return [(sink.received[k] - t) * 1000 for k, t in sent.items() if k in sink.received]
+
+
+def throughput(repeat):
+    """Lignes/s lorsqu'un gros bloc est ajouté d'un coup (rattrapage d'un retard)"""
+    with open(os.path.join(BASE_DIR, "odoo.log.txt"), "r", encoding="utf-8") as f:
+        sample = f.read().rstrip("\n") + "\n"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "odoo.log")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(sample * repeat)
+        counters = Counters()
+        target = sum(1 for line in sample.splitlines() if line.strip()) * repeat
+
+        async def run():
+            task = asyncio.create_task(follow([path], [], AlertThrottle(), counters, from_start=True,
+                                              stats_interval=0))
+            start = time.perf_counter()
+            while counters.totals["lines"] < target:
+                await asyncio.sleep(0.01)
+            elapsed = time.perf_counter() - start
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return elapsed
+
+        elapsed = asyncio.run(run())
+        return target, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence et débit du suivi continu")
+    parser.add_argument("--alerts", type=int, default=50, help="Nombre d'anomalies écrites pour la latence")
+    parser.add_argument("--interval", type=float, default=0.05, help="Intervalle entre deux anomalies (s)")
+    parser.add_argument("--repeat", type=int, default=5000, help="Répétitions du log d'exemple pour le débit")
+    args = parser.parse_args()
+
+    os.chdir(BASE_DIR)                                                          # Fichiers de motifs relatifs
+    delays = sorted(latency(args.alerts, args.interval))
+    print(f"[BENCH] latence écriture → alerte sur {len(delays)}/{args.alerts} alertes : "
+          f"médiane {statistics.median(delays):.1f} ms · max {delays[-1]:.1f} ms")
+
+    lines, elapsed = throughput(args.repeat)
+    print(f"[BENCH] rattrapage : {lines} lignes en {elapsed:.2f} s ({lines / elapsed:,.0f} lignes/s)")
+
+
+if __name__ == "__main__":
+    main()
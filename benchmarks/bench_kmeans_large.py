@@ -0,0 +1,64 @@
+# bench_kmeans_large.py - Courbe temps / mémoire de analyzer_kmeans.py selon la taille du log
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from synthetic_log import write_synthetic_log
+
+# Exécuté dans un processus neuf par mesure : ru_maxrss est le pic de ce seul run
+CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+import analyzer_kmeans as k
+start = time.perf_counter()
+if {large!r}:
+    k.run_large({log!r}, show=False)
+else:
+    logs = k.parse_logs({log!r})
+    logs, X, _ = k.cluster_logs(logs)
+    k.visualize_results(logs, X, show=False)
+    k.export_results(logs, k.analyze_clusters(logs))
+print(json.dumps({{"seconds": time.perf_counter() - start,
+                  "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+
+def measure(log_file, large, workdir):
+    code = CHILD.format(root=os.path.dirname(BASE_DIR), log=log_file, large=large)
+    result = subprocess.run([sys.executable, "-c", code], cwd=workdir, check=True,
+                            capture_output=True, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Passage à l'échelle du mode --large de analyzer_kmeans.py")
+    parser.add_argument("--sizes", default="10000,100000,1000000,10000000", help="Nombres de lignes à tester")
+    parser.add_argument("--full-max", type=int, default=1000000,
+                        help="Taille maximale mesurée pour le mode complet (TF-IDF + KMeans + PCA dense)")
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10} {'mode':>8} {'temps (s)':>10} {'pic RSS (Mo)':>13} {'lignes/s':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sorted(int(s) for s in args.sizes.split(",")):
+            log_file = write_synthetic_log(os.path.join(workdir, "synthetic.log"), size)
+            modes = [True] + ([False] if size <= args.full_max else [])
+            for large in modes:
+                try:
+                    stats = measure(log_file, large, workdir)
+                except subprocess.CalledProcessError as e:
+                    print(f"{size:>10} {'complet':>8} {'échec':>10}  {e.stderr.strip().splitlines()[-1][:60]}")
+                    continue
+                print(f"{size:>10} {'--large' if large else 'complet':>8} {stats['seconds']:>10.2f} "
+                      f"{stats['peak_mb']:>13.0f} {size / stats['seconds']:>10,.0f}", flush=True)
+            os.remove(log_file)
+
+
+if __name__ == "__main__":
+    main()
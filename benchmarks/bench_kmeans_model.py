@@ -0,0 +1,73 @@
+# bench_kmeans_model.py - Exécutions quotidiennes : réajustement TF-IDF + KMeans complet contre inférence par le modèle enregistré
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+import numpy as np
+
+from analyzer_kmeans import cluster_with_model, fit_kmeans, vectorize_logs
+from model_store import ModelStore, normalize_message
+from odoo_log_parser import iter_file_records
+from synthetic_log import write_synthetic_log
+
+
+def day_logs(directory, day, n_lines):
+    path = write_synthetic_log(os.path.join(directory, f"day_{day}.log"), n_lines, seed=day,
+                               start=datetime(2025, 4, 6, 8) + timedelta(days=day))
+    return [record for record in iter_file_records(path) if not record.is_orphan]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def refit(logs):
+    X, vectorizer = vectorize_logs(logs)
+    return vectorizer, fit_kmeans(X)
+
+
+def agreement(labels, previous):
+    return "-" if previous is None else f"{np.mean(labels == previous):.1%}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coût et stabilité des clusters : réajustement contre modèle persistant")
+    parser.add_argument("--lines", type=int, default=200000, help="Lignes par journée de log synthétique")
+    parser.add_argument("--days", type=int, default=4, help="Journées simulées (la dernière force un réentraînement)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ModelStore(directory=os.path.join(tmp, "models"))
+        reference = day_logs(tmp, 0, args.lines)                                # Logs étiquetés chaque jour : identifiants comparables
+        messages = [log.message for log in reference]
+        normalized = [normalize_message(message) for message in messages]
+        print(f"{'jour':>4} {'réajustement (s)':>17} {'modèle (s)':>11} {'mode':<14} "
+              f"{'ids inchangés (réaj.)':>22} {'ids inchangés (modèle)':>22}")
+        previous_refit = previous_stored = None
+        for day in range(args.days):
+            logs = reference if day == 0 else day_logs(tmp, day, args.lines)
+            (vectorizer, kmeans), refit_time = timed(lambda: refit(logs))
+            retrain = day == args.days - 1 and day > 0
+            (_, _, info), model_time = timed(lambda: cluster_with_model(logs, store, retrain=retrain))
+
+            refit_labels = kmeans.predict(vectorizer.transform(messages))
+            model = store.load()
+            stored_labels = model.assign(model.transform(normalized))[0]
+            mode = f"v{info['version']} " + ("entraîné" if info['retrained'] else "inférence")
+            print(f"{day:>4} {refit_time:>17.2f} {model_time:>11.2f} {mode:<14} "
+                  f"{agreement(refit_labels, previous_refit):>22} {agreement(stored_labels, previous_stored):>22}")
+            previous_refit, previous_stored = refit_labels, stored_labels
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# bench_log_index.py - Requêtes par intervalle / champ : index sur disque contre parcours complet du log
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from log_index import LogQuery, build_index, index_path, load_index, parse_time
+from odoo_log_parser import iter_file_records
+from synthetic_log import write_synthetic_log
+
+QUERIES = {                                                                     # Nom → requête (log synthétique : début le 2025-04-06 08:00)
+    '5 min, 1 utilisateur': LogQuery(parse_time("2025-04-06 10:00"), parse_time("2025-04-06 10:04", end=True),
+                                     users=["admin"]),
+    '1 h, ERROR odoo.http': LogQuery(parse_time("2025-04-06 10"), parse_time("2025-04-06 10", end=True),
+                                     levels=["ERROR"], modules=["odoo.http"]),
+    '1 min, tout': LogQuery(parse_time("2025-04-06 10:00"), parse_time("2025-04-06 10:00", end=True)),
+}
+
+
+def timed(func, repeat=1):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence des requêtes indexées selon la taille de l'archive")
+    parser.add_argument("--lines", type=int, nargs="+", default=[100000, 1000000], help="Tailles de logs synthétiques")
+    parser.add_argument("--scan-max", type=int, default=1000000, help="Taille maximale du parcours complet de référence")
+    parser.add_argument("--repeat", type=int, default=5, help="Exécutions par requête (meilleur temps)")
+    args = parser.parse_args()
+
+    print(f"{'lignes':>9} {'requête':<22} {'résultats':>9} {'index (ms)':>11} {'parcours (s)':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_lines in args.lines:
+            log_file = write_synthetic_log(os.path.join(tmp, f"synthetic_{n_lines}.log"), n_lines)
+            index_dir = os.path.join(tmp, "index")
+            directory = index_path(log_file, index_dir)
+            meta, build_time = timed(lambda: build_index(log_file, directory))
+            size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+            print(f"[BUILD] {n_lines} lignes : {build_time:.1f} s, index {size / (1 << 20):.1f} Mo "
+                  f"pour {os.path.getsize(log_file) / (1 << 20):.0f} Mo de log ({meta['records']} enregistrements)")
+            for name, query in QUERIES.items():
+                # Latence côté index : chargement (projection mémoire) + sélection + parsing des seules plages lues
+                count, index_time = timed(lambda: sum(1 for _ in load_index(log_file, index_dir).select(query)),
+                                          args.repeat)
+                scan = "-"
+                if n_lines <= args.scan_max:
+                    seconds = {}
+                    expected, scan_time = timed(lambda: sum(1 for record in iter_file_records(log_file)
+                                                            if query.matches(record, seconds)))
+                    assert expected == count, (name, expected, count)
+                    scan = f"{scan_time:.2f}"
+                print(f"{n_lines:>9} {name:<22} {count:>9} {index_time * 1000:>11.1f} {scan:>13}")
+
+
+if __name__ == "__main__":
+    main()
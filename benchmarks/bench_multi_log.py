@@ -0,0 +1,63 @@
+# bench_multi_log.py - Plusieurs logs : partiels par fichier (série / processus) + fusion, contre un passage sur la concaténation
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from multi_log import build_partial, build_partials, merge_partials, write_merged
+from synthetic_log import write_synthetic_log
+
+EXACT_KEYS = ('records', 'lines', 'levels', 'modules', 'user_stats', 'first_timestamp', 'last_timestamp')
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coût des partiels fusionnables selon le nombre de logs")
+    parser.add_argument("--files", type=int, default=4, help="Nombre de logs (un par worker Odoo)")
+    parser.add_argument("--lines", type=int, default=100000, help="Lignes par log")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processus pour les partiels")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = [write_synthetic_log(os.path.join(tmp, f"worker_{i}.log"), args.lines, seed=i, users=20 + 10 * i,
+                                     start=datetime(2025, 4, 6, 8) + timedelta(seconds=i))
+                 for i in range(args.files)]
+        concatenated = os.path.join(tmp, "all.log")
+        with open(concatenated, "wb") as out:
+            for path in files:
+                with open(path, "rb") as f:
+                    out.write(f.read())
+
+        single, single_time = timed(lambda: build_partial(concatenated))
+        partials, serial_time = timed(lambda: build_partials(files, 1))
+        _, parallel_time = timed(lambda: build_partials(files, args.workers))
+        merged, merge_time = timed(lambda: merge_partials(partials))
+        _, ordered_time = timed(lambda: write_merged(files, os.path.join(tmp, "ordered.log")))
+        for key in EXACT_KEYS:
+            assert merged[key] == single[key], key
+        assert merged['anomalies']['counts'] == single['anomalies']['counts']
+
+        size = sum(len(json.dumps(partial)) for partial in partials) / len(partials)
+        print(f"{args.files} logs × {args.lines} lignes ({merged['records']} enregistrements)")
+        print(f"{'passage unique (concaténation)':<34} {single_time:>8.2f} s")
+        print(f"{'partiels en série':<34} {serial_time:>8.2f} s")
+        print(f"{f'partiels, {args.workers} processus':<34} {parallel_time:>8.2f} s")
+        print(f"{'fusion des partiels':<34} {merge_time * 1000:>8.1f} ms  ({size / 1024:.0f} Ko par partiel)")
+        print(f"{'fusion k-voies par horodatage':<34} {ordered_time:>8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# bench_parallel.py - Passage à l'échelle du parsing parallèle (--workers N)
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from analyzer_pattern import anomalies_chunk, iter_anomalies, load_pattern_sets
+from odoo_log_parser import parse_file
+from parallel_parse import map_chunks, parse_file_parallel
+
+
+def build_log(path, repeat):
+    with open(os.path.join(BASE_DIR, "odoo.log.txt"), "r", encoding="utf-8") as f:
+        sample = f.read().rstrip("\n") + "\n"
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(repeat):
+            f.write(sample)
+
+
+def parallel_anomalies(path, workers):
+    hits = []
+    for offset, chunk in map_chunks(path, anomalies_chunk, workers):
+        hits.extend((a["line_number"] + offset, a["pattern"]) for a in chunk)
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit du parsing et de la détection selon --workers")
+    parser.add_argument("--repeat", type=int, default=5000, help="Nombre de répétitions du log d'exemple")
+    parser.add_argument("--workers", default=f"1,2,4,{os.cpu_count()}", help="Valeurs de --workers à tester")
+    args = parser.parse_args()
+
+    os.chdir(BASE_DIR)                                                          # Fichiers de motifs relatifs
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "odoo.log.txt")
+        build_log(log_file, args.repeat)
+        lines = args.repeat * 60
+
+        with open(log_file, "r", encoding="utf-8") as f:
+            serial_hits = [(a["line_number"], a["pattern"]) for a in iter_anomalies(f, *load_pattern_sets())]
+        serial_records = [(r.line, r.level, r.message) for r in parse_file(log_file)]
+
+        print(f"[BENCH] {lines} lignes, {os.cpu_count()} cœurs")
+        print(f"{'workers':>8} {'parse (l/s)':>14} {'anomalies (l/s)':>16}")
+        for workers in sorted({int(w) for w in args.workers.split(",")}):
+            start = time.perf_counter()
+            records = parse_file_parallel(log_file, workers)
+            parse_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            hits = parallel_anomalies(log_file, workers)
+            pattern_time = time.perf_counter() - start
+
+            if [(r.line, r.level, r.message) for r in records] != serial_records or hits != serial_hits:
+                print(f"[ERREUR] Résultat différent de l'exécution série pour {workers} workers")
+                sys.exit(1)
+            print(f"{workers:>8} {lines / parse_time:>14.0f} {lines / pattern_time:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# bench_patterns.py - Benchmark du moteur de motifs contre la boucle re.search d'origine
+
+import argparse
+import os
+import re
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from pattern_engine import PatternSet, load_patterns
+
+
+def load_messages(log_file, repeat):
+    """Extrait les messages (après le dernier ':') comme le fait analyzer_pattern.py"""
+    with open(log_file, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    messages = [line.split(':')[-1].strip() for line in lines if ':' in line]
+    return messages * repeat
+
+
+def grow_patterns(base, count):
+    """Complète la liste de base avec des motifs synthétiques jusqu'à `count` motifs"""
+    extra = [rf"\bsynthetic failure code {i}\b" if i % 2 else f"Custom{i}Error" for i in range(max(0, count - len(base)))]
+    return (extra + list(base))[:max(count, len(base))]
+
+
+def naive_loop(messages, false_positives, known_patterns):
+    """Reproduction de la boucle d'origine : un re.search par motif et par ligne"""
+    hits = []
+    for message in messages:
+        if any(re.search(fp, message, re.IGNORECASE) for fp in false_positives):
+            continue
+        for pattern in known_patterns:
+            if re.search(pattern, message, re.IGNORECASE):
+                hits.append(pattern)
+                break
+    return hits
+
+
+def engine_loop(messages, false_positives, known_patterns):
+    """Même traitement avec les PatternSet compilés une seule fois"""
+    fp_set = PatternSet(false_positives)
+    known_set = PatternSet(known_patterns)
+    hits = []
+    for message in messages:
+        if fp_set.matches_any(message):
+            continue
+        pattern = known_set.first_match(message)
+        if pattern is not None:
+            hits.append(pattern)
+    return hits
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit (lignes/s) du moteur de motifs selon le nombre de motifs")
+    parser.add_argument("--log", default=os.path.join(BASE_DIR, "odoo.log.txt"))
+    parser.add_argument("--repeat", type=int, default=200, help="Nombre de répétitions du log d'exemple")
+    parser.add_argument("--counts", default="24,100,300,1000", help="Nombre de motifs connus à tester")
+    args = parser.parse_args()
+
+    messages = load_messages(args.log, args.repeat)
+    false_positives = load_patterns(os.path.join(BASE_DIR, "false_positives.json"), required=False)
+    known = load_patterns(os.path.join(BASE_DIR, "known_anomalies.json"))
+
+    print(f"[BENCH] {len(messages)} lignes, {len(false_positives)} faux positifs")
+    print(f"{'motifs':>8} {'boucle (l/s)':>14} {'moteur (l/s)':>14} {'gain':>7}")
+    for count in (int(c) for c in args.counts.split(",")):
+        patterns = grow_patterns(known, count)
+        naive_hits, naive_time = timed(naive_loop, messages, false_positives, patterns)
+        engine_hits, engine_time = timed(engine_loop, messages, false_positives, patterns)
+        if naive_hits != engine_hits:
+            print(f"[ERREUR] Résultats différents pour {count} motifs")
+            sys.exit(1)
+        print(f"{len(patterns):>8} {len(messages) / naive_time:>14.0f} "
+              f"{len(messages) / engine_time:>14.0f} {naive_time / engine_time:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
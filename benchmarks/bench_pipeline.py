@@ -0,0 +1,58 @@
+# bench_pipeline.py - Temps total du pipeline : quatre parsings séparés contre un parsing partagé
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = ["analyzer_pattern.py", "analyzer_tokens.py", "analyzer_clust.py", "analyzer_kmeans.py"]
+CONFIG_FILES = ["known_anomalies.json", "false_positives.json"]
+
+
+def build_log(path, repeat):
+    """Répète le log d'exemple pour obtenir une entrée de taille significative"""
+    with open(os.path.join(BASE_DIR, "odoo.log.txt"), "r", encoding="utf-8") as f:
+        sample = f.read().rstrip("\n") + "\n"
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(repeat):
+            f.write(sample)
+
+
+def run(args, workdir):
+    env = dict(os.environ, MPLBACKEND="Agg")                                    # plt.show() non bloquant
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=workdir, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare le pipeline avec et sans parseur partagé")
+    parser.add_argument("--repeat", type=int, default=200, help="Nombre de répétitions du log d'exemple")
+    parser.add_argument("--runs", type=int, default=3, help="Nombre de mesures (on garde la meilleure)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in CONFIG_FILES:
+            shutil.copy(os.path.join(BASE_DIR, name), workdir)
+        log_file = os.path.join(workdir, "odoo.log.txt")
+        build_log(log_file, args.repeat)
+
+        separate = min(
+            sum(run([os.path.join(BASE_DIR, script), log_file], workdir) for script in SCRIPTS)
+            for _ in range(args.runs)
+        )
+        shared = min(run([os.path.join(BASE_DIR, "pipeline.py"), log_file], workdir) for _ in range(args.runs))
+
+    print(f"[BENCH] {args.repeat * 60} lignes")
+    print(f"  4 scripts (4 parsings) : {separate:.2f} s")
+    print(f"  pipeline.py (1 parsing) : {shared:.2f} s")
+    print(f"  gain                   : {separate / shared:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
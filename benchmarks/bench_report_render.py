@@ -0,0 +1,95 @@
+# bench_report_render.py - Rendu des graphiques d'une exécution : pyplot séquentiel contre Agg orienté objet en parallèle
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from report_render import ReportRenderer, use_headless
+use_headless()
+
+import matplotlib.pyplot as plt
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+
+import analyzer_kmeans
+from analyzer_clust import build_summary, render_html, render_summary, summary_tree
+from analyzer_kmeans import make_hashing_vectorizer, plot_projection
+from analyzer_tokens import compute_line_table, plot_user_stats
+from odoo_log_parser import iter_file_records
+from synthetic_log import write_synthetic_log
+
+
+def pyplot_projection(points, clusters, output_file):
+    """Référence : ancien plot_projection (pyplot, un masque booléen par cluster, plt.show())"""
+    clusters = np.asarray(clusters)
+    plt.figure(figsize=(12, 8))
+    for cluster in sorted(set(clusters.tolist())):
+        indices = clusters == cluster
+        plt.scatter(points[indices, 0], points[indices, 1], label=f'Cluster {cluster}', alpha=0.6)
+    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=120, bbox_inches='tight')
+    plt.show()
+    plt.close("all")
+
+
+def render_report(user_stats, tree, points, clusters, tmp, workers):
+    """Les quatre sorties graphiques d'une exécution du pipeline"""
+    renderer = ReportRenderer(headless=True, workers=workers)
+    start = time.perf_counter()
+    renderer.submit(plot_user_stats, user_stats, os.path.join(tmp, "log_report.png"), show=False)
+    renderer.submit(render_summary, tree, os.path.join(tmp, "odoo_logs_hierarchy.png"))
+    renderer.submit(render_html, tree, os.path.join(tmp, "odoo_logs_hierarchy.html"))
+    renderer.submit(plot_projection, points, clusters, "Analyse", "Composante", show=False)
+    timings = renderer.close()
+    return timings, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de rendu de l'ensemble des graphiques sur un log synthétique")
+    parser.add_argument("--lines", type=int, default=1000000, help="Nombre de lignes du log synthétique")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processus de rendu")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        analyzer_kmeans.OUTPUT_DIR = tmp
+        log_file = write_synthetic_log(os.path.join(tmp, "synthetic.log"), args.lines)
+        records = [record for record in iter_file_records(log_file) if not record.is_orphan]
+
+        # Préparation (non mesurée) : données de chaque graphique
+        user_stats = compute_line_table(records).user_stats()
+        tree = summary_tree(build_summary(records))
+        X = make_hashing_vectorizer().transform([record.first_message for record in records])
+        points = TruncatedSVD(n_components=2, random_state=42).fit_transform(X)
+        clusters = MiniBatchKMeans(n_clusters=5, random_state=42, n_init=3).fit_predict(X)
+        del X
+
+        start = time.perf_counter()
+        pyplot_projection(points, clusters, os.path.join(tmp, "pyplot.png"))
+        pyplot_time = time.perf_counter() - start
+        start = time.perf_counter()
+        plot_projection(points, clusters, "Analyse", "Composante", show=False)
+        scatter_time = time.perf_counter() - start
+
+        sequential, sequential_time = render_report(user_stats, tree, points, clusters, tmp, 1)
+        _, parallel_time = render_report(user_stats, tree, points, clusters, tmp, args.workers)
+
+    print(f"\n[BENCH] {args.lines} lignes, {len(records)} enregistrements, {len(points)} points, "
+          f"{os.cpu_count()} CPU")
+    print(f"  nuage, pyplot + un scatter par cluster   : {pyplot_time:8.2f} s")
+    print(f"  nuage, Figure Agg + groupes en un tri    : {scatter_time:8.2f} s")
+    for name, elapsed in sequential:
+        print(f"    {name:<38} : {elapsed:8.2f} s")
+    print(f"  rapport complet, séquentiel              : {sequential_time:8.2f} s")
+    print(f"  rapport complet, {args.workers} processus de rendu    : {parallel_time:8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
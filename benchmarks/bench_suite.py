@@ -0,0 +1,305 @@
+# bench_suite.py - Suite de benchmarks par étape (parse → rendu) : JSON machine et comparaison à une référence
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BASE_DIR)
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from sklearn.decomposition import TruncatedSVD
+
+import analyzer_kmeans
+from analyzer_clust import build_summary, render_html, render_summary, summary_tree
+from analyzer_pattern import iter_record_anomalies, load_pattern_sets
+from analyzer_tokens import compute_line_table, plot_user_stats
+from odoo_log_parser import iter_file_records
+from report_render import use_headless
+from synthetic_log import add_generator_arguments, generator_options, write_synthetic_log
+
+BASELINE_FILE = os.path.join(BASE_DIR, "baseline.json")
+TOLERANCE = 0.25                                                                # Écart toléré avant de signaler une régression
+MEMORY_MAX = 5000000                                                            # Étapes sur les enregistrements en mémoire
+CLUSTER_MAX = 1000000                                                           # TF-IDF + KMeans (matrice complète)
+MIN_TOTAL = 3.0                                                                 # Secondes cumulées minimales par étape
+MAX_RUNS = 50
+MIN_FLAG_SECONDS = 0.1                                                          # Temps CPU médian en deçà duquel une étape n'est pas jugée
+MIN_FLAG_MB = 1.0                                                               # Pic d'allocation en deçà duquel la mémoire n'est pas jugée
+PLOT_SAMPLE = 5000                                                              # Points du nuage de l'étape render
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024        # Octets sous macOS, Ko sous Linux
+
+
+# ----------------Étapes : préparation (non mesurée) puis exécution mesurée----------------
+def load_records(log_file):
+    return list(iter_file_records(log_file))
+
+
+def load_logs(log_file):
+    return [record for record in load_records(log_file) if not record.is_orphan]
+
+
+def run_parse(log_file):
+    return {'items': sum(1 for _ in iter_file_records(log_file))}
+
+
+def run_categorize(records):
+    table = compute_line_table(records)
+    return {'items': len(table), 'users': len(table.user_stats())}
+
+
+def prepare_pattern(log_file):
+    os.chdir(ROOT_DIR)                                                          # known_anomalies.json / false_positives.json
+    records = load_records(log_file)
+    lines = sum(1 + len(record.continuation or ()) for record in records)
+    return records, load_pattern_sets(), lines
+
+
+def run_pattern(data):
+    records, (false_positive_set, known_pattern_set), lines = data
+    hits = sum(1 for _ in iter_record_anomalies(records, false_positive_set, known_pattern_set))
+    return {'items': lines, 'hits': hits}
+
+
+def run_vectorize(logs):
+    X, vectorizer = analyzer_kmeans.vectorize_logs(logs)
+    return {'items': X.shape[0], 'features': X.shape[1]}
+
+
+def prepare_cluster(log_file):
+    return analyzer_kmeans.vectorize_logs(load_logs(log_file))[0]
+
+
+def run_cluster(X):
+    kmeans = analyzer_kmeans.fit_kmeans(X)
+    return {'items': X.shape[0], 'iterations': int(kmeans.n_iter_)}
+
+
+def prepare_render(log_file):
+    logs = load_logs(log_file)
+    sample = logs[::max(1, len(logs) // PLOT_SAMPLE)]
+    X = analyzer_kmeans.make_hashing_vectorizer().transform([log.message for log in sample])
+    points = TruncatedSVD(n_components=2, random_state=42).fit_transform(X)
+    clusters = analyzer_kmeans.fit_kmeans(X).labels_
+    return len(logs), compute_line_table(logs).user_stats(), summary_tree(build_summary(logs)), points, clusters
+
+
+def run_render(data):
+    items, user_stats, tree, points, clusters = data
+    use_headless()
+    with tempfile.TemporaryDirectory() as tmp:
+        analyzer_kmeans.OUTPUT_DIR = tmp
+        plot_user_stats(user_stats, os.path.join(tmp, "log_report.png"), show=False)
+        render_summary(tree, os.path.join(tmp, "odoo_logs_hierarchy.png"))
+        render_html(tree, os.path.join(tmp, "odoo_logs_hierarchy.html"))
+        analyzer_kmeans.plot_projection(points, clusters, "benchmark", "Composante SVD", show=False)
+    return {'items': items}
+
+
+STAGES = {                                                                      # Nom → (préparation, exécution)
+    'parse': (lambda log_file: log_file, run_parse),
+    'categorize': (load_records, run_categorize),
+    'pattern': (prepare_pattern, run_pattern),
+    'vectorize': (load_logs, run_vectorize),
+    'cluster': (prepare_cluster, run_cluster),
+    'render': (prepare_render, run_render),
+}
+
+
+def run_stage(name, log_file, repeat=1):
+    """Exécuté dans un processus neuf, pour que la mémoire mesurée soit celle de cette seule étape.
+
+    L'étape est répétée au moins `repeat` fois sur les mêmes données, et
+    jusqu'à MIN_TOTAL secondes cumulées pour les étapes courtes ; on garde
+    les temps médians, moins sensibles qu'un meilleur temps aux à-coups de
+    la machine. Une exécution supplémentaire, hors chronométrage, relève
+    sous tracemalloc le pic d'allocation propre à l'étape : ni les imports
+    (sklearn, matplotlib) ni les données de la préparation n'y figurent.
+    """
+    prepare, run = STAGES[name]
+    data = prepare(log_file)
+    rss_before = peak_rss_mb()
+    timings = []
+    while len(timings) < repeat or (sum(t for t, _ in timings) < MIN_TOTAL and len(timings) < MAX_RUNS):
+        wall, cpu = time.perf_counter(), time.process_time()
+        metrics = run(data)
+        timings.append((time.perf_counter() - wall, time.process_time() - cpu))
+    rss_after = peak_rss_mb()
+    tracemalloc.start()
+    run(data)
+    alloc_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    wall = statistics.median(t for t, _ in timings)
+    cpu = statistics.median(c for _, c in timings)
+    items = metrics.pop('items')
+    return {
+        'seconds': wall,
+        'cpu_seconds': cpu,
+        'best_seconds': min(t for t, _ in timings),
+        'best_cpu_seconds': min(c for _, c in timings),
+        'runs': len(timings),
+        'items': items,
+        'items_per_second': items / wall if wall else None,
+        'cpu_items_per_second': items / cpu if cpu else None,                   # Débit comparé à la référence
+        'us_per_item': wall / items * 1e6 if items else None,
+        'stage_peak_mb': alloc_peak / (1 << 20),                                # Pic d'allocation de l'étape (comparé)
+        'stage_rss_mb': rss_after - rss_before,                                 # Croissance du pic RSS pendant l'étape
+        'peak_rss_mb': rss_after,                                               # Pic du processus, imports compris
+        'prepared_rss_mb': rss_before,
+        **metrics,
+    }
+
+
+def measure(name, log_file, repeat=1):
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(run_stage, name, log_file, repeat).result()
+
+
+# ----------------Rapport et comparaison----------------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Lignes (taille, étape, rapport de débit, rapport de mémoire, statut) par rapport à la référence.
+
+    Le débit est calculé sur le temps CPU médian (insensible aux autres
+    processus de la machine) et la mémoire sur le pic d'allocation propre à
+    l'étape. Une régression de débit n'est signalée que si le meilleur
+    temps CPU la confirme aussi ; une étape dont le temps CPU médian reste
+    sous MIN_FLAG_SECONDS (ou dont le pic reste sous MIN_FLAG_MB pour la
+    mémoire) n'est pas jugée.
+    """
+    rows = []
+    for size, stages in results.items():
+        for name, current in stages.items():
+            reference = baseline.get('results', {}).get(size, {}).get(name)
+            if not reference or not reference.get('cpu_items_per_second') or not current.get('cpu_items_per_second'):
+                continue                                                        # Référence d'un format antérieur : à réenregistrer
+            speed = current['cpu_items_per_second'] / reference['cpu_items_per_second']
+            best = reference['best_cpu_seconds'] / current['best_cpu_seconds'] if current['best_cpu_seconds'] else speed
+            memory = current['stage_peak_mb'] / reference['stage_peak_mb'] if reference['stage_peak_mb'] else None
+            timed = min(current['cpu_seconds'], reference['cpu_seconds']) >= MIN_FLAG_SECONDS
+            sized = memory is not None and max(current['stage_peak_mb'], reference['stage_peak_mb']) >= MIN_FLAG_MB
+            if (timed and max(speed, best) < 1 - tolerance) or (sized and memory > 1 + tolerance):
+                status = "RÉGRESSION"
+            elif timed and min(speed, best) > 1 + tolerance:
+                status = "amélioration"
+            elif not timed:
+                status = "ok (trop court pour juger le débit)"
+            else:
+                status = "ok"
+            rows.append((size, name, speed, memory, status))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit, latence et pic mémoire de chaque étape sur des logs synthétiques")
+    parser.add_argument("--lines", type=int, nargs="+", default=[10000, 100000],
+                        help="Tailles de logs à générer (lignes, de 1k à 100M)")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES), help="Étapes mesurées")
+    parser.add_argument("--repeat", type=int, default=3, help="Exécutions par étape (temps médian conservé)")
+    add_generator_arguments(parser)
+    parser.add_argument("--output", help="Rapport JSON (défaut : results/bench_suite_<date>.json)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Référence à comparer")
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistrer ce run comme nouvelle référence")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Écart relatif toléré (0.25 : ±25 %%)")
+    parser.add_argument("--memory-max", type=int, default=MEMORY_MAX,
+                        help="Taille maximale des étapes qui chargent tous les enregistrements")
+    parser.add_argument("--cluster-max", type=int, default=CLUSTER_MAX, help="Taille maximale de vectorize / cluster")
+    parser.add_argument("--log-dir", help="Conserver les logs générés dans ce dossier (réutilisés s'ils existent)")
+    args = parser.parse_args()
+
+    options = generator_options(args)
+    limits = {'categorize': args.memory_max, 'pattern': args.memory_max, 'render': args.memory_max,
+              'vectorize': args.cluster_max, 'cluster': args.cluster_max}
+    report = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec="seconds"),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': args.repeat,
+            'generator': {'seed': args.seed, **options},
+        },
+        'results': {},
+    }
+
+    print(f"{'lignes':>10} {'étape':>10} {'temps (s)':>10} {'CPU (s)':>8} {'éléments/s':>12} {'µs/élém.':>9} "
+          f"{'pic étape (Mo)':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = args.log_dir or tmp
+        os.makedirs(log_dir, exist_ok=True)
+        for size in sorted(args.lines):
+            log_file = os.path.join(log_dir, f"synthetic_{size}_{args.seed}.log")
+            if not (args.log_dir and os.path.exists(log_file)):
+                start = time.perf_counter()
+                write_synthetic_log(log_file, size, args.seed, **options)
+                print(f"[SYNTH] {size} lignes générées en {time.perf_counter() - start:.1f} s", flush=True)
+            stages = report['results'][str(size)] = {}
+            for name in args.stages:
+                if limits.get(name) is not None and size > limits[name]:
+                    continue
+                m = stages[name] = measure(name, log_file, args.repeat)
+                print(f"{size:>10} {name:>10} {m['seconds']:>10.3f} {m['cpu_seconds']:>8.2f} "
+                      f"{m['items_per_second'] or 0:>12,.0f} {m['us_per_item'] or 0:>9.2f} {m['stage_peak_mb']:>15.1f}",
+                      flush=True)
+            if not args.log_dir:
+                os.remove(log_file)
+
+    output = args.output or os.path.join("results", f"bench_suite_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n[EXPORT] Rapport écrit dans {output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"[BASELINE] Référence enregistrée dans {args.baseline}")
+        return
+    try:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"[BASELINE] Aucune référence ({args.baseline}) : relancer avec --save-baseline")
+        return
+    if baseline['meta'].get('generator') != report['meta']['generator']:
+        print("[BASELINE] Attention : options du générateur différentes de la référence")
+
+    rows = compare(report['results'], baseline, args.tolerance)
+    print(f"\n[BASELINE] Comparaison à {args.baseline} (commit {baseline['meta'].get('commit')}, "
+          f"tolérance ±{args.tolerance:.0%})")
+    print(f"{'lignes':>10} {'étape':>10} {'débit CPU':>10} {'mémoire':>8}  statut")
+    for size, name, speed, memory, status in rows:
+        memory = f"{memory:>7.2f}x" if memory is not None else f"{'-':>8}"
+        print(f"{size:>10} {name:>10} {speed:>9.2f}x {memory}  {status}")
+    if not rows:
+        print("[BASELINE] Aucune étape comparable : relancer avec --save-baseline pour enregistrer une référence")
+    if any(status == "RÉGRESSION" for *_, status in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
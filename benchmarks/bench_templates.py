@@ -0,0 +1,73 @@
+# bench_templates.py - Gabarits (TemplateMiner) contre TF-IDF + KMeans : débit et qualité des clusters
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from sklearn.metrics import adjusted_rand_score, homogeneity_completeness_v_measure
+
+from analyzer_kmeans import cluster_logs
+from odoo_log_parser import iter_file_records
+from synthetic_log import iter_synthetic_entries
+from template_miner import TemplateMiner
+
+
+def build_dataset(path, n_lines, seed):
+    """Log synthétique et gabarit d'origine de chaque enregistrement (vérité terrain)"""
+    truth = []
+    with open(path, "w", encoding="utf-8") as f:
+        for lines, template in iter_synthetic_entries(n_lines, seed):
+            f.writelines(lines)
+            truth.append(template)
+    records = list(iter_file_records(path))
+    assert len(records) == len(truth)
+    return records, truth
+
+
+def run_templates(records):
+    miner = TemplateMiner()
+    start = time.perf_counter()
+    labels = [miner.add(record.first_message).id for record in records]
+    return labels, time.perf_counter() - start
+
+
+def run_kmeans(records, n_clusters):
+    start = time.perf_counter()
+    for record in records:
+        record.message = record.first_message                                   # Même entrée que les gabarits
+    logs, _, _ = cluster_logs(records, n_clusters)
+    return [log.cluster for log in logs], time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare TemplateMiner et TF-IDF + KMeans sur un log synthétique")
+    parser.add_argument("--lines", type=int, default=50000, help="Nombre de lignes du log synthétique")
+    parser.add_argument("--seed", type=int, default=42, help="Graine du générateur")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        records, truth = build_dataset(os.path.join(tmp, "synthetic.log"), args.lines, args.seed)
+    n_true = len(set(truth))
+
+    runs = [("gabarits", lambda: run_templates(records)),
+            ("kmeans k=5", lambda: run_kmeans(records, 5)),
+            (f"kmeans k={n_true}", lambda: run_kmeans(records, n_true))]
+
+    print(f"[BENCH] {len(records)} enregistrements, {n_true} gabarits d'origine")
+    print(f"{'méthode':>12} {'clusters':>9} {'temps (s)':>10} {'enreg./s':>10} {'ARI':>6} "
+          f"{'homog.':>7} {'complét.':>9} {'V':>6}")
+    for name, run in runs:
+        labels, elapsed = run()
+        homogeneity, completeness, v_measure = homogeneity_completeness_v_measure(truth, labels)
+        print(f"{name:>12} {len(set(labels)):>9} {elapsed:>10.2f} {len(records) / elapsed:>10,.0f} "
+              f"{adjusted_rand_score(truth, labels):>6.3f} {homogeneity:>7.3f} {completeness:>9.3f} {v_measure:>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
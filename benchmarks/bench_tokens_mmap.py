@@ -0,0 +1,76 @@
+# bench_tokens_mmap.py - Chemin texte contre chemin mmap pour les stats de analyzer_tokens.py
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from analyzer_tokens import categorize_log, compute_user_stats, extract_user
+from mmap_scan import scan_user_stats
+from odoo_log_parser import iter_file_records
+
+
+def build_log(path, repeat):
+    with open(os.path.join(BASE_DIR, "odoo.log.txt"), "r", encoding="utf-8") as f:
+        sample = f.read().rstrip("\n") + "\n"
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(repeat):
+            f.write(sample)
+
+
+def text_path(path):
+    return compute_user_stats(iter_file_records(path))
+
+
+def mmap_path(path):
+    return scan_user_stats(path, categorize_log, extract_user)
+
+
+def measure(func, path):
+    """Débit sans traçage, puis pic d'allocations Python sous tracemalloc.
+
+    Les pages du fichier projeté ne sont pas des allocations Python : elles
+    appartiennent au cache de pages du noyau et ne figurent pas dans le pic.
+    """
+    start = time.perf_counter()
+    result = func(path)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit et pic mémoire du comptage par utilisateur")
+    parser.add_argument("--repeat", type=int, default=5000, help="Nombre de répétitions du log d'exemple")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "odoo.log.txt")
+        build_log(log_file, args.repeat)
+        lines = args.repeat * 60
+
+        text_stats, text_time, text_peak = measure(text_path, log_file)
+        mmap_stats, mmap_time, mmap_peak = measure(mmap_path, log_file)
+
+    if json.dumps(text_stats) != json.dumps(mmap_stats):
+        print("[ERREUR] Les deux chemins donnent des statistiques différentes")
+        sys.exit(1)
+
+    print(f"[BENCH] {lines} lignes")
+    print(f"{'chemin':>8} {'lignes/s':>12} {'pic alloc (Ko)':>15}")
+    print(f"{'texte':>8} {lines / text_time:>12.0f} {text_peak / 1024:>15.1f}")
+    print(f"{'mmap':>8} {lines / mmap_time:>12.0f} {mmap_peak / 1024:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# synthetic_log.py - Génération reproductible de logs Odoo synthétiques pour les benchmarks
+
+import argparse
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+USERS = ["admin", "omar", "haytam", "reda", "lina", "walid", "ilyass", "haydara", "sara", "youssef",
+         "odoo", "cron", "portal", "api_user", "error_user"]
+MODULES = ["odoo.models", "odoo.http", "odoo.sql_db", "odoo.addons.base.ir.ir_model",
+           "odoo.addons.mail.mail_thread", "odoo.addons.payment.models", "odoo.addons.stock.models.stock_move",
+           "odoo.addons.account.models.account_invoice", "odoo.service.server", "odoo.modules.registry"]
+MESSAGES = {
+    "INFO": [
+        "User {n} logged in successfully",
+        "Sale order SO{n} confirmed",
+        "Invoice INV/2025/{n} validated without error",
+        "Cron job {n} executed in {n} ms",
+        "Stock picking WH/OUT/{n} done",
+        "Registry loaded in {n} s",
+        "Email sent to partner {n}",
+    ],
+    "WARNING": [
+        "User tried to delete product.product({n}) without access rights",
+        "Slow query detected: {n} ms on stock_move",
+        "Deprecated field used in view {n}",
+        "Mail server response delayed by {n} s",
+    ],
+    "ERROR": [
+        "Access denied to model sale.order",
+        "Deadlock detected during transaction {n}",
+        "Could not serialize access due to concurrent update",
+        "Payment authorization failed for transaction {n}",
+        "Query timeout - operation aborted after {n} s",
+        "Failed to validate invoice INV/2025/{n} - Missing partner",
+        "Internal Server Error during POST /web/dataset/call_kw",
+    ],
+}
+LEVELS = ["INFO"] * 7 + ["WARNING"] * 2 + ["ERROR"]
+ANOMALIES = [                                                                   # Messages reconnus par known_anomalies.json (--anomaly-rate)
+    "Connection refused by mail server smtp{n}",
+    "Database not found while loading registry db{n}",
+    "Unable to reach payment provider after {n} retries",
+    "Permission denied on attachment {n}",
+    "Worker {n} not responding, killed",
+    "IntegrityError on insert into res_partner row {n}",
+]
+TRACEBACK = [
+    "Traceback (most recent call last):",
+    '  File "/opt/odoo/odoo/sql_db.py", line {n}, in execute',
+    "psycopg2.errors.SerializationFailure: could not serialize access due to concurrent update",
+]
+
+
+def weighted_picker(rng, values, weights=None):
+    """Tirage d'une valeur : uniforme (même suite aléatoire que rng.choice) ou selon `weights`"""
+    if weights is None:
+        below, count = rng._randbelow, len(values)
+        return lambda: values[below(count)]
+    cum_weights, choices = list(accumulate(weights)), rng.choices
+    return lambda: choices(values, cum_weights=cum_weights)[0]
+
+
+def zipf_weights(count, skew):
+    """Poids de Zipf (rang ** -skew) ; None pour une répartition uniforme"""
+    return None if not skew else [rank ** -skew for rank in range(1, count + 1)]
+
+
+def user_names(count):
+    """`count` utilisateurs : les noms habituels puis user_16, user_17…"""
+    return (USERS + [f"user_{i}" for i in range(len(USERS) + 1, count + 1)])[:count]
+
+
+def iter_synthetic_entries(n_lines, seed=42, traceback_rate=0.02, start=datetime(2025, 4, 6, 8, 0, 0),
+                           levels=None, users=None, user_skew=0.0, module_skew=0.0, anomaly_rate=0.0):
+    """Enregistrements (lignes, gabarit d'origine) : le gabarit sert de vérité terrain aux benchmarks de clustering
+
+    `levels` : poids par niveau ({"INFO": 70, ...}) ; `users` : nombre
+    d'utilisateurs distincts ; `user_skew` / `module_skew` : exposant de Zipf
+    (0 : uniforme) ; `traceback_rate` : un ERROR sur 10 × traceback_rate porte
+    un traceback ; `anomaly_rate` : part des messages remplacés par un
+    message de ANOMALIES. Avec les valeurs par défaut, la sortie d'une graine
+    ne change pas d'une version à l'autre.
+    """
+    rng = random.Random(seed)
+    below = rng._randbelow                                                      # randrange / choice sans vérification, même suite
+    pick_level = weighted_picker(rng, list(levels), list(levels.values())) if levels else weighted_picker(rng, LEVELS)
+    user_list = user_names(users) if users else USERS
+    pick_user = weighted_picker(rng, user_list, zipf_weights(len(user_list), user_skew))
+    pick_module = weighted_picker(rng, MODULES, zipf_weights(len(MODULES), module_skew))
+    pick_template = {level: weighted_picker(rng, templates) for level, templates in MESSAGES.items()}
+    pick_anomaly = weighted_picker(rng, ANOMALIES)
+    offset = 0                                                                  # Millisecondes depuis `start`
+    second, prefix = None, None
+    produced = 0
+    while produced < n_lines:
+        offset += 1 + below(499)
+        if offset // 1000 != second:                                            # Date formatée une fois par seconde
+            second = offset // 1000
+            prefix = f"{start + timedelta(seconds=second):%Y-%m-%d %H:%M:%S}"
+        level = pick_level()
+        template = pick_template[level]()
+        message = template.replace("{n}", str(1 + below(9999)))
+        if anomaly_rate and rng.random() < anomaly_rate:
+            template = pick_anomaly()
+            message = template.replace("{n}", str(1 + below(9999)))
+        lines = [f"{prefix},{offset % 1000:03d} {1000 + below(8999)} {level} {pick_user()} {pick_module()}: {message}\n"]
+        produced += 1
+        if level == "ERROR" and rng.random() < traceback_rate * 10:
+            for line in TRACEBACK[:n_lines - produced]:
+                lines.append(line.replace("{n}", str(1 + below(1999))) + "\n")
+                produced += 1
+        yield lines, template
+
+
+def iter_synthetic_lines(n_lines, seed=42, **options):
+    """Génère exactement `n_lines` lignes (tracebacks multilignes compris), identiques pour une même graine"""
+    for lines, _ in iter_synthetic_entries(n_lines, seed, **options):
+        yield from lines
+
+
+def write_synthetic_log(path, n_lines, seed=42, **options):
+    with open(path, "w", encoding="utf-8", buffering=1 << 20) as f:
+        f.writelines(iter_synthetic_lines(n_lines, seed, **options))
+    return path
+
+
+def parse_levels(text):
+    """"INFO=70,WARNING=20,ERROR=10" → {"INFO": 70.0, ...}"""
+    levels = {}
+    for item in text.split(","):
+        level, _, weight = item.partition("=")
+        level = level.strip().upper()
+        if level not in MESSAGES:
+            raise argparse.ArgumentTypeError(f"niveau inconnu : {level} (attendus : {', '.join(MESSAGES)})")
+        try:
+            levels[level] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"poids invalide pour {level} : {weight!r}")
+    return levels
+
+
+def add_generator_arguments(parser):
+    """Options du générateur, partagées avec les benchmarks"""
+    parser.add_argument("--seed", type=int, default=42, help="Graine aléatoire")
+    parser.add_argument("--levels", type=parse_levels, help="Poids des niveaux, ex. INFO=70,WARNING=20,ERROR=10")
+    parser.add_argument("--users", type=int, help=f"Nombre d'utilisateurs distincts (défaut : {len(USERS)})")
+    parser.add_argument("--user-skew", type=float, default=0.0, help="Exposant de Zipf des utilisateurs (0 : uniforme)")
+    parser.add_argument("--module-skew", type=float, default=0.0, help="Exposant de Zipf des modules (0 : uniforme)")
+    parser.add_argument("--traceback-rate", type=float, default=0.02,
+                        help="Tracebacks multilignes (un ERROR sur 10 × taux)")
+    parser.add_argument("--anomaly-rate", type=float, default=0.0,
+                        help="Part des messages remplacés par une anomalie connue")
+
+
+def generator_options(args):
+    """Arguments de iter_synthetic_entries depuis les options de add_generator_arguments"""
+    return {'levels': args.levels, 'users': args.users, 'user_skew': args.user_skew,
+            'module_skew': args.module_skew, 'traceback_rate': args.traceback_rate, 'anomaly_rate': args.anomaly_rate}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère un log Odoo synthétique reproductible")
+    parser.add_argument("output", help="Fichier à écrire")
+    parser.add_argument("--lines", type=int, default=100000, help="Nombre de lignes")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+    write_synthetic_log(args.output, args.lines, args.seed, **generator_options(args))
+    print(f"[SYNTH] {args.lines} lignes écrites dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# checkpoint.py - Reprise incrémentale : seuls les octets ajoutés au log sont analysés
+
+import hashlib
+import json
+import os
+
+from log_source import STDIN
+
+CHECKPOINT_DIR = "checkpoints"                                                  # Un fichier JSON par (log, analyseur)
+CHECKPOINT_VERSION = 1
+HEAD_SIZE = 4096                                                                # Empreinte du début du fichier (copytruncate puis réécriture)
+READ_SIZE = 1 << 20                                                             # Taille des lectures binaires
+
+
+def checkpoint_path(log_file, analyzer, directory=CHECKPOINT_DIR):
+    """Chemin du checkpoint d'un analyseur pour un log (clé : chemin absolu)"""
+    digest = hashlib.sha1(os.path.abspath(log_file).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(directory, f"{os.path.basename(log_file)}.{digest}.{analyzer}.json")
+
+
+def is_resumable(path):
+    """Une reprise par octet n'a de sens que sur un fichier ordinaire non compressé"""
+    return path != STDIN and not path.endswith((".gz", ".bz2"))
+
+
+def _head_digest(f, size):
+    f.seek(0)
+    return hashlib.sha1(f.read(size)).hexdigest()
+
+
+def _split_lines(data):
+    """Découpe comme le mode texte (newline universel) : \\r\\n, \\r et \\n terminent une ligne"""
+    text = data.decode("utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = text.split("\n")
+    return [line + "\n" for line in lines[:-1]]                                 # data se termine toujours par \n ou \r
+
+
+class Checkpoint:
+    """Position (inode, octet, ligne) et état agrégé d'un analyseur sur un log.
+
+    ``resume()`` compare le fichier au checkpoint enregistré : un inode
+    différent (rotation), une taille inférieure à la position (troncature) ou
+    un début de fichier modifié (copytruncate puis réécriture) remettent la
+    position et ``state`` à zéro, la raison étant disponible dans
+    ``restarted``. ``iter_new_lines()`` ne lit ensuite que les lignes
+    complètes ajoutées depuis le dernier passage : une dernière ligne sans
+    retour à la ligne (en cours d'écriture) est laissée au passage suivant.
+    """
+
+    def __init__(self, log_file, analyzer, checkpoint_file=None, signature=None):
+        self.log_file = log_file
+        self.checkpoint_file = checkpoint_file or checkpoint_path(log_file, analyzer)
+        self.signature = signature                                              # Configuration de l'analyseur (motifs…) : la changer invalide l'état
+        self.device = self.inode = None
+        self.offset = 0                                                         # Octet qui suit la dernière ligne analysée
+        self.line_count = 0                                                     # Numéro de la dernière ligne analysée
+        self.state = None                                                       # État agrégé propre à l'analyseur (sérialisable JSON)
+        self.restarted = None                                                   # Raison d'un redémarrage depuis l'octet 0, sinon None
+
+    def _load(self):
+        try:
+            with open(self.checkpoint_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            return {}
+
+    def resume(self):
+        """Charge le checkpoint et le valide contre l'état actuel du fichier"""
+        with open(self.log_file, "rb") as f:
+            st = os.fstat(f.fileno())
+            self.device, self.inode = st.st_dev, st.st_ino
+            saved = self._load()
+
+            if saved is None:
+                reason = "aucun checkpoint"
+            elif saved.get("version") != CHECKPOINT_VERSION or "offset" not in saved:
+                reason = "checkpoint illisible"
+            elif saved.get("signature") != self.signature:
+                reason = "configuration modifiée"
+            elif (saved["device"], saved["inode"]) != (st.st_dev, st.st_ino):
+                reason = "rotation (inode différent)"
+            elif st.st_size < saved["offset"]:
+                reason = "troncature"
+            elif _head_digest(f, min(saved["offset"], HEAD_SIZE)) != saved["head"]:
+                reason = "contenu réécrit"
+            else:
+                reason = None
+
+        if reason is None:
+            self.offset, self.line_count, self.state = saved["offset"], saved["lines"], saved["state"]
+            self.restarted = None
+        else:
+            self.restart(reason)
+        return self
+
+    def restart(self, reason):
+        """Repart de l'octet 0 sans état (l'analyseur peut l'exiger, par exemple si son rapport a disparu)"""
+        self.offset, self.line_count, self.state = 0, 0, None
+        self.restarted = reason
+
+    def iter_new_lines(self):
+        """Lignes complètes ajoutées depuis le checkpoint (texte, fin de ligne incluse).
+
+        La taille est figée à l'ouverture : ce qui est écrit pendant l'analyse
+        sera lu au passage suivant, comme une dernière ligne non terminée ou
+        terminée par un \r seul (moitié possible d'un \r\n). ``offset`` et
+        ``line_count`` avancent bloc par bloc : le générateur doit être
+        consommé jusqu'au bout.
+        """
+        with open(self.log_file, "rb") as f:
+            end = os.fstat(f.fileno()).st_size
+            f.seek(self.offset)
+            pending = b""
+            while self.offset + len(pending) < end:
+                data = pending + f.read(min(READ_SIZE, end - self.offset - len(pending)))
+                # Fin de ligne : \n, ou \r suivi d'un autre octet (un \r final peut précéder le \n d'un \r\n)
+                cut = max(data.rfind(b"\n"), data.rfind(b"\r", 0, len(data) - 1)) + 1
+                if not cut:
+                    pending = data                                              # Ligne plus longue qu'une lecture
+                    continue
+                pending = data[cut:]
+                lines = _split_lines(data[:cut])
+                yield from lines
+                self.offset += cut
+                self.line_count += len(lines)
+
+    def save(self, state):
+        """Enregistre la position atteinte et l'état agrégé (écriture atomique)"""
+        with open(self.log_file, "rb") as f:
+            head = _head_digest(f, min(self.offset, HEAD_SIZE))
+        checkpoint = {
+            "version": CHECKPOINT_VERSION,
+            "log_file": os.path.abspath(self.log_file),
+            "device": self.device,
+            "inode": self.inode,
+            "offset": self.offset,
+            "lines": self.line_count,
+            "head": head,
+            "signature": self.signature,
+            "state": state,
+        }
+        directory = os.path.dirname(self.checkpoint_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_file = self.checkpoint_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_file, self.checkpoint_file)
+        self.state = state
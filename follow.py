@@ -0,0 +1,431 @@
+# follow.py - Suivi continu des logs Odoo et alertes d'anomalies en temps réel
+
+import argparse
+import asyncio
+import calendar
+import json
+import os
+import re
+import sys
+import time
+import urllib.request
+from collections import Counter, OrderedDict, defaultdict, deque
+from datetime import datetime
+
+from analyzer_pattern import load_pattern_sets, match_line
+
+POLL_INTERVAL = 0.1                                                             # Attente entre deux lectures sans nouvelles données
+READ_SIZE = 1 << 16
+HEAD_SIZE = 64
+DEDUP_WINDOW = 60.0                                                             # Même motif + même message normalisé : une alerte par fenêtre
+RATE_LIMIT = 10                                                                 # Alertes maximum par motif…
+RATE_WINDOW = 60.0                                                              # … sur cette fenêtre glissante
+WEBHOOK_TIMEOUT = 2.0
+DRAIN_TIMEOUT = 5.0                                                             # Arrêt : attente maximale de la livraison des alertes en file
+ALERT_QUEUE_SIZE = 1000                                                         # Alertes en attente des sinks ; au-delà : abandonnées et comptées
+NUMBER_PATTERN = re.compile(r"\b\d+\b")
+TIMESTAMP_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),(\d+)")
+
+
+def log_time(line):
+    """Horodatage Odoo d'une ligne (secondes epoch ; Odoo écrit en UTC) ou None"""
+    match = TIMESTAMP_PATTERN.match(line)
+    if not match:
+        return None
+    stamp = datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S")
+    return calendar.timegm(stamp.timetuple()) + int(match.group(2)) / 1000
+
+
+def count_lines(fd, end):
+    """Lignes terminées avant l'octet `end` (\n, \r\n ou \r seul, comme read_lines), lues par blocs"""
+    count, position, previous = 0, 0, b""
+    while position < end:
+        block = os.pread(fd, min(READ_SIZE, end - position), position)
+        if not block:
+            break
+        count += block.count(b"\n") + block.count(b"\r") - block.count(b"\r\n")
+        if previous == b"\r" and block[:1] == b"\n":                            # \r\n à cheval sur deux blocs
+            count -= 1
+        position += len(block)
+        previous = block[-1:]
+    return count
+
+
+class Counters:
+    """Compteurs du démon : totaux et valeurs de l'intervalle courant"""
+
+    def __init__(self):
+        self.totals = Counter()
+        self.interval = Counter()
+        self.since = time.monotonic()
+        self.lag = 0.0                                                          # Retard max (horloge - horodatage du log) sur l'intervalle
+        self.pending = {}                                                       # Fichier → octets écrits mais pas encore lus
+
+    def add(self, name, value=1):
+        self.totals[name] += value
+        self.interval[name] += value
+
+    def observe_lag(self, lag):
+        self.lag = max(self.lag, lag)
+
+    def snapshot(self):
+        """Débits par seconde depuis le dernier appel, puis remise à zéro de l'intervalle"""
+        now = time.monotonic()
+        elapsed = max(now - self.since, 1e-9)
+        stats = {f"{name}_per_s": round(self.interval[name] / elapsed, 1)
+                 for name in ("lines", "anomalies", "alerts", "suppressed", "dropped")}
+        stats.update({
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "lag_seconds": round(self.lag, 3),
+            "pending_bytes": sum(self.pending.values()),
+        })
+        self.interval.clear()
+        self.since, self.lag = now, 0.0
+        return stats
+
+
+class AlertThrottle:
+    """Déduplication et limite de débit par motif.
+
+    Une alerte identique (même motif, message aux nombres normalisés) n'est
+    émise qu'une fois par ``dedup_window`` secondes, et un motif n'émet pas
+    plus de ``rate_limit`` alertes par ``rate_window`` secondes. Les alertes
+    retenues sont comptées et signalées avec la prochaine alerte du motif.
+    """
+
+    def __init__(self, dedup_window=DEDUP_WINDOW, rate_limit=RATE_LIMIT, rate_window=RATE_WINDOW):
+        self.dedup_window = dedup_window
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.last_seen = OrderedDict()                                          # (motif, message normalisé) → dernière émission, la plus ancienne en tête
+        self.sent = defaultdict(deque)                                          # Motif → instants d'émission dans la fenêtre
+        self.suppressed = Counter()                                             # Motif → alertes retenues depuis la dernière émission
+
+    def allow(self, pattern, message, now):
+        """Retourne le nombre d'alertes retenues à signaler, ou None si l'alerte est retenue"""
+        key = (pattern, NUMBER_PATTERN.sub("#", message))
+        while self.last_seen and now - next(iter(self.last_seen.values())) >= self.dedup_window:
+            self.last_seen.popitem(last=False)                                  # Borne mémoire : clés expirées retirées par la tête
+        last = self.last_seen.get(key)
+        if last is not None and now - last < self.dedup_window:
+            self.suppressed[pattern] += 1
+            return None
+
+        sent = self.sent[pattern]
+        while sent and now - sent[0] >= self.rate_window:
+            sent.popleft()
+        if self.rate_limit and len(sent) >= self.rate_limit:
+            self.suppressed[pattern] += 1
+            return None
+
+        sent.append(now)
+        self.last_seen[key] = now
+        self.last_seen.move_to_end(key)                                         # Ordre des émissions conservé
+        return self.suppressed.pop(pattern, 0)
+
+
+class StdoutSink:
+    async def emit(self, alert):
+        suppressed = f" (+{alert['suppressed']} similaires retenues)" if alert["suppressed"] else ""
+        print(f"[ALERTE] {alert['file']}:{alert['line_number']} | Pattern: {alert['pattern']} | "
+              f"Log: {alert['log']}{suppressed}", flush=True)
+
+    def close(self):
+        pass
+
+
+class JsonlSink:
+    def __init__(self, path):
+        self.file = open(path, "a", encoding="utf-8", buffering=1)             # Une alerte par ligne, visible immédiatement
+
+    async def emit(self, alert):
+        self.file.write(json.dumps(alert, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class WebhookSink:
+    """POST JSON vers un webhook local, dans un thread pour ne pas bloquer la lecture"""
+
+    def __init__(self, url, counters):
+        self.url = url
+        self.counters = counters
+
+    def _post(self, alert):
+        request = urllib.request.Request(self.url, data=json.dumps(alert).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=WEBHOOK_TIMEOUT) as response:
+            response.read()
+
+    async def emit(self, alert):
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._post, alert)
+        except Exception as e:
+            self.counters.add("webhook_errors")
+            print(f"[WEBHOOK] Échec d'envoi : {e}", file=sys.stderr)
+
+    def close(self):
+        pass
+
+
+class LogFollower:
+    """Lit les lignes ajoutées à un fichier (équivalent de ``tail -F``).
+
+    Une rotation (inode différent) est suivie après lecture de la fin de
+    l'ancien fichier ; une troncature (taille ou premiers octets modifiés)
+    reprend au début. Une dernière ligne
+    sans retour à la ligne attend la suite de son écriture. Sans
+    ``from_start``, la lecture commence à la fin du fichier ; les lignes déjà
+    présentes sont comptées par ``start`` dans un thread.
+    """
+
+    def __init__(self, path, from_start=False):
+        self.path = path
+        self.from_start = from_start
+        self.file = None
+        self.position = 0
+        self.line_number = 0
+        self.pending = b""
+        self.head = None                                                        # Premiers octets : détecte une réécriture du fichier
+
+    def _open(self, from_start):
+        try:
+            self.file = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        self.position = self.line_number = 0
+        self.pending = b""
+        self.head = None
+        if not from_start:
+            self.position = self._last_line_end()                               # Ligne en cours d'écriture : relue en entier
+            self.file.seek(self.position)
+        return True
+
+    def _last_line_end(self):
+        """Position qui suit le dernier \n, trouvée en remontant depuis la fin du fichier"""
+        fd = self.file.fileno()
+        end = self.file.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(end - READ_SIZE, 0)
+            last = os.pread(fd, end - start, start).rfind(b"\n")
+            if last != -1:
+                return start + last + 1
+            end = start
+        return 0
+
+    async def start(self):
+        """Ouverture initiale : positionnement en fin de fichier sans bloquer la boucle"""
+        if self.from_start:
+            return
+        if not self._open(from_start=False):
+            self.from_start = True                                              # Fichier créé plus tard : tout son contenu est nouveau
+            return
+        self.line_number = await asyncio.get_running_loop().run_in_executor(
+            None, count_lines, self.file.fileno(), self.position)               # Numéros de ligne cohérents avec le fichier
+
+    def _reopen_if_rotated(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != os.fstat(self.file.fileno()).st_ino:
+            self.file.close()
+            self._open(from_start=True)                                         # Nouveau fichier : tout est nouveau
+
+    def _check_truncated(self):
+        """Troncature (copytruncate), même si le fichier a déjà regrossi : taille ou début modifiés"""
+        fd = self.file.fileno()
+        if self.head is None or len(self.head) < HEAD_SIZE:
+            head = os.pread(fd, HEAD_SIZE, 0)
+            truncated = self.head is not None and not head.startswith(self.head)
+        else:
+            head = self.head
+            truncated = os.pread(fd, HEAD_SIZE, 0) != head
+        if truncated or os.fstat(fd).st_size < self.position:
+            self.file.seek(0)
+            self.position = self.line_number = 0
+            self.pending = b""
+            head = os.pread(fd, HEAD_SIZE, 0)
+        self.head = head
+
+    def pending_bytes(self):
+        try:
+            return max(os.stat(self.path).st_size - self.position, 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def read_lines(self):
+        """Nouvelles lignes complètes : liste de (numéro, ligne nettoyée)"""
+        if self.file is None and not self._open(self.from_start):
+            self.from_start = True                                              # Fichier créé plus tard : tout son contenu est nouveau
+            return []
+        self._check_truncated()
+        data = self.file.read(READ_SIZE)
+        if not data:
+            self._reopen_if_rotated()
+            return []
+        self.position += len(data)
+        data = self.pending + data
+        cut = data.rfind(b"\n") + 1
+        self.pending = data[cut:]
+        text = data[:cut].decode("utf-8", "replace")
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        lines = []
+        for line in text.split("\n")[:-1]:
+            self.line_number += 1
+            line = line.strip()
+            if line:
+                lines.append((self.line_number, line))
+        return lines
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+async def follow_file(follower, false_positive_set, known_pattern_set, throttle, alerts, counters,
+                      poll_interval=POLL_INTERVAL):
+    """Tâche par fichier : lecture, détection (mêmes règles que analyzer_pattern.py) et mise en file des alertes"""
+    await follower.start()
+    while True:
+        lines = follower.read_lines()
+        counters.pending[follower.path] = follower.pending_bytes()
+        if not lines:
+            await asyncio.sleep(poll_interval)
+            continue
+
+        received = time.time()
+        counters.add("lines", len(lines))
+        stamp = log_time(lines[-1][1])                                          # Retard mesuré sur la dernière ligne du bloc
+        if stamp is not None:
+            counters.observe_lag(received - stamp)
+
+        for number, line in lines:
+            pattern = match_line(line, false_positive_set, known_pattern_set)
+            if pattern is None:
+                continue
+            counters.add("anomalies")
+            suppressed = throttle.allow(pattern, line.rsplit(":", 1)[-1].strip(), time.monotonic())
+            if suppressed is None:
+                counters.add("suppressed")
+                continue
+            alert = {
+                "time": datetime.now().isoformat(timespec="milliseconds"),
+                "file": follower.path,
+                "line_number": number,
+                "pattern": pattern,
+                "log": line,
+                "suppressed": suppressed,
+                "received": received,
+            }
+            try:
+                alerts.put_nowait(alert)
+            except asyncio.QueueFull:                                           # Sinks saturés (webhook lent) : la lecture ne ralentit pas
+                counters.add("dropped")
+        await asyncio.sleep(0)                                                  # Laisser la main aux autres fichiers et aux sinks
+
+
+async def dispatch_alerts(alerts, sinks, counters):
+    """Envoie chaque alerte à tous les sinks ; la latence de détection est ajoutée à l'alerte"""
+    while True:
+        alert = await alerts.get()
+        alert["latency_ms"] = round((time.time() - alert.pop("received")) * 1000, 1)
+        counters.add("alerts")
+        try:
+            await asyncio.gather(*(sink.emit(alert) for sink in sinks))         # Sinks en parallèle : le plus lent fixe la cadence
+        finally:
+            alerts.task_done()
+
+
+async def report_stats(counters, interval, stats_file=None):
+    """Débit (lignes, anomalies, alertes par seconde) et retard, toutes les ``interval`` secondes"""
+    while True:
+        await asyncio.sleep(interval)
+        stats = counters.snapshot()
+        if stats_file is not None:
+            stats_file.write(json.dumps(stats) + "\n")
+        print(f"[STATS] {stats['lines_per_s']} lignes/s · {stats['alerts_per_s']} alertes/s · "
+              f"{stats['suppressed_per_s']} retenues/s · {stats['dropped_per_s']} abandonnées/s · retard {stats['lag_seconds']} s · "
+              f"{stats['pending_bytes']} octets en attente", file=sys.stderr)
+
+
+async def follow(paths, sinks, throttle, counters, from_start=False, stats_interval=1.0,
+                 stats_file=None, duration=None, queue_size=ALERT_QUEUE_SIZE):
+    """Suit tous les fichiers jusqu'à interruption (ou pendant ``duration`` secondes)"""
+    false_positive_set, known_pattern_set = load_pattern_sets()
+    alerts = asyncio.Queue(maxsize=queue_size)
+    followers = [LogFollower(path, from_start) for path in paths]
+    readers = [asyncio.create_task(follow_file(f, false_positive_set, known_pattern_set, throttle, alerts, counters))
+               for f in followers]
+    tasks = readers + [asyncio.create_task(dispatch_alerts(alerts, sinks, counters))]
+    if stats_interval:
+        tasks.append(asyncio.create_task(report_stats(counters, stats_interval, stats_file)))
+
+    try:
+        if duration is None:
+            await asyncio.gather(*tasks)
+        else:
+            await asyncio.sleep(duration)
+            for task in readers:                                                # Plus de nouvelles alertes…
+                task.cancel()
+            try:
+                await asyncio.wait_for(alerts.join(), DRAIN_TIMEOUT)            # … et celles déjà prises par un sink sont livrées
+            except asyncio.TimeoutError:
+                counters.add("dropped", alerts.qsize())
+                print(f"[FOLLOW] Arrêt : {alerts.qsize()} alertes non livrées après {DRAIN_TIMEOUT} s", file=sys.stderr)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for follower in followers:
+            follower.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suivi continu des logs Odoo avec alertes d'anomalies")
+    parser.add_argument("log_files", nargs="+", help="Fichiers de log à suivre (rotation et troncature gérées)")
+    parser.add_argument("--from-start", action="store_true", help="Analyser aussi le contenu déjà présent")
+    parser.add_argument("--jsonl", help="Ajouter les alertes à ce fichier JSON Lines")
+    parser.add_argument("--webhook", help="URL d'un webhook local (POST JSON par alerte)")
+    parser.add_argument("--quiet", action="store_true", help="Pas d'alertes sur la sortie standard")
+    parser.add_argument("--dedup-window", type=float, default=DEDUP_WINDOW,
+                        help="Secondes pendant lesquelles une alerte identique est retenue")
+    parser.add_argument("--rate-limit", type=int, default=RATE_LIMIT,
+                        help="Alertes maximum par motif sur --rate-window (0 : illimité)")
+    parser.add_argument("--rate-window", type=float, default=RATE_WINDOW, help="Fenêtre de la limite de débit (s)")
+    parser.add_argument("--stats-interval", type=float, default=1.0, help="Période des compteurs sur stderr (0 : désactivé)")
+    parser.add_argument("--stats-file", help="Ajouter les compteurs périodiques à ce fichier JSON Lines")
+    parser.add_argument("--queue-size", type=int, default=ALERT_QUEUE_SIZE,
+                        help="Alertes en attente maximum ; au-delà, abandonnées et comptées")
+    parser.add_argument("--duration", type=float, help="Arrêt après ce nombre de secondes")
+    args = parser.parse_args()
+
+    counters = Counters()
+    sinks = [] if args.quiet else [StdoutSink()]
+    if args.jsonl:
+        sinks.append(JsonlSink(args.jsonl))
+    if args.webhook:
+        sinks.append(WebhookSink(args.webhook, counters))
+    throttle = AlertThrottle(args.dedup_window, args.rate_limit, args.rate_window)
+    stats_file = open(args.stats_file, "a", encoding="utf-8", buffering=1) if args.stats_file else None
+
+    try:
+        asyncio.run(follow(args.log_files, sinks, throttle, counters, args.from_start,
+                           args.stats_interval, stats_file, args.duration, args.queue_size))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for sink in sinks:
+            sink.close()
+        if stats_file is not None:
+            stats_file.close()
+
+    totals = counters.totals
+    print(f"\n[FOLLOW] {totals['lines']} lignes lues · {totals['anomalies']} anomalies · "
+          f"{totals['alerts']} alertes émises · {totals['suppressed']} retenues · {totals['dropped']} abandonnées", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
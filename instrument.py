@@ -0,0 +1,248 @@
+# instrument.py - Instrumentation par étape : temps mur et CPU, débit, allocations, pic mémoire
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+TRACE_DIR = "results"
+PROFILE_TOP = 25                                                                # Fonctions gardées du profil cProfile
+ALLOCATION_TOP = 15                                                             # Sites d'allocation gardés (tracemalloc)
+
+_trace = None                                                                   # Trace active (None : instrumentation inactive)
+
+
+def _rss_mb():
+    """RSS courant (Mo), lu dans /proc ; None hors Linux"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+    except (OSError, ValueError):
+        return None
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024        # Octets sous macOS, Ko sous Linux
+
+
+class Trace:
+    """Étapes mesurées d'une exécution, écrites en JSON dans results/.
+
+    Chaque étape relève temps mur, temps CPU, éléments traités (débit),
+    blocs alloués nets, RSS et pic RSS ; les étapes peuvent s'imbriquer
+    (``depth``). `profile` active cProfile sur toute l'exécution ;
+    `trace_malloc` active tracemalloc (octets alloués et pic par étape,
+    principaux sites d'allocation), au prix d'un ralentissement notable.
+    """
+
+    def __init__(self, name, profile=False, trace_malloc=False):
+        self.name = name
+        self.started = datetime.now()
+        self.start_wall = time.perf_counter()
+        self.stages = []
+        self.open = []                                                          # Étapes en cours (imbrication)
+        self.hot_paths = {}                                                     # Fonction → {'calls', 'seconds'}
+        self.extra = {}                                                         # Tables propres à l'analyseur
+        self.trace_malloc = trace_malloc
+        if trace_malloc:
+            tracemalloc.start()
+        self.profiler = cProfile.Profile() if profile else None
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def _update_malloc_peaks(self):
+        """Reporte le pic tracemalloc sur les étapes ouvertes avant sa remise à zéro"""
+        peak = tracemalloc.get_traced_memory()[1]
+        for span in self.open:
+            span['_malloc_peak'] = max(span['_malloc_peak'], peak)
+
+    @contextmanager
+    def stage(self, name, items=None):
+        span = {'stage': name, 'depth': len(self.open), 'items': items}
+        rss, blocks = _rss_mb(), sys.getallocatedblocks()
+        if self.trace_malloc:
+            self._update_malloc_peaks()
+            tracemalloc.reset_peak()
+            span['_malloc_start'] = span['_malloc_peak'] = tracemalloc.get_traced_memory()[0]
+        self.open.append(span)
+        self.stages.append(span)                                                # Ordre d'entrée, complété à la sortie
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield span
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self.open.pop()
+            items, rss_after = span['items'], _rss_mb()
+            span.update({
+                'wall_seconds': wall,
+                'cpu_seconds': cpu,
+                'items_per_second': items / wall if items and wall else None,
+                'allocated_blocks': sys.getallocatedblocks() - blocks,          # Blocs Python alloués nets (non libérés)
+                'rss_mb': rss_after,
+                'rss_delta_mb': rss_after - rss if rss is not None else None,
+                'peak_rss_mb': _peak_rss_mb(),                                  # Pic du processus à la fin de l'étape
+            })
+            if self.trace_malloc:
+                current, peak = tracemalloc.get_traced_memory()
+                self._update_malloc_peaks()
+                start = span.pop('_malloc_start')
+                span['alloc_net_bytes'] = current - start
+                span['alloc_peak_bytes'] = max(span.pop('_malloc_peak'), peak) - start
+
+    def hot_path(self, func, name=None):
+        """Enveloppe comptant appels et temps cumulé d'une fonction appelée par ligne"""
+        stats = self.hot_paths.setdefault(name or func.__name__, {'calls': 0, 'seconds': 0.0})
+        clock = time.perf_counter
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats['seconds'] += clock() - start
+                stats['calls'] += 1
+        return wrapper
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'started': self.started.isoformat(timespec="seconds"),
+            'argv': sys.argv,
+            'wall_seconds': time.perf_counter() - self.start_wall,
+            'peak_rss_mb': _peak_rss_mb(),
+            'stages': self.stages,
+            'hot_paths': {name: dict(stats, us_per_call=stats['seconds'] / stats['calls'] * 1e6 if stats['calls'] else None)
+                          for name, stats in self.hot_paths.items()},
+            **self.extra,
+        }
+
+    def write(self, directory=TRACE_DIR):
+        """Arrête les mesures et écrit results/trace_<nom>_<date>.json (et .prof avec cProfile)"""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"trace_{self.name}_{self.started:%Y%m%d_%H%M%S}")
+        data = self.to_dict()
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(base + ".prof")
+            out = io.StringIO()
+            stats = pstats.Stats(self.profiler, stream=out).sort_stats("cumulative")
+            stats.print_stats(PROFILE_TOP)
+            data['profile'] = {'file': base + ".prof", 'top_cumulative': out.getvalue().splitlines()}
+        if self.trace_malloc:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            data['allocations'] = [{'site': str(stat.traceback), 'bytes': stat.size, 'blocks': stat.count}
+                                   for stat in snapshot.statistics("lineno")[:ALLOCATION_TOP]]
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+        return base + ".json", data
+
+
+# ----------------API du module : sans effet tant qu'aucune trace n'est active----------------
+def start(name, profile=False, trace_malloc=False):
+    global _trace
+    _trace = Trace(name, profile, trace_malloc)
+    return _trace
+
+
+def active():
+    return _trace
+
+
+@contextmanager
+def stage(name, items=None):
+    """Étape mesurée ; le dict produit accepte ``items`` et d'autres compteurs"""
+    if _trace is None:
+        yield {}
+        return
+    with _trace.stage(name, items) as span:
+        yield span
+
+
+def traced(name=None, items=None):
+    """Décorateur : la fonction devient une étape ; `items(result, *args, **kwargs)` donne le nombre d'éléments"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _trace is None:
+                return func(*args, **kwargs)
+            with stage(name or func.__name__) as span:
+                result = func(*args, **kwargs)
+                if items is not None:
+                    span['items'] = items(result, *args, **kwargs)
+                return result
+        return wrapper
+    return decorator
+
+
+def counted(iterable, span, key='items'):
+    """Itère sur `iterable` en comptant les éléments dans span[key] (pour les étapes en flux)"""
+    if _trace is None:
+        return iterable
+
+    def counter():
+        span[key] = 0
+        for item in iterable:
+            span[key] += 1
+            yield item
+    return counter()
+
+
+def hot_paths(namespace, *names):
+    """Remplace les fonctions `names` de `namespace` (dict de globals) par des enveloppes de comptage"""
+    if _trace is not None:
+        for name in names:
+            namespace[name] = _trace.hot_path(namespace[name], name)
+
+
+def summary(data):
+    """Tableau texte des étapes d'une trace"""
+    lines = [f"{'étape':<32} {'mur (s)':>9} {'CPU (s)':>9} {'élém./s':>12} {'Δ RSS (Mo)':>11} {'pic RSS (Mo)':>13}"]
+    for span in data['stages']:
+        label = "  " * span['depth'] + span['stage']
+        rate = f"{span['items_per_second']:,.0f}" if span.get('items_per_second') else "-"
+        delta = f"{span['rss_delta_mb']:+.1f}" if span.get('rss_delta_mb') is not None else "-"
+        lines.append(f"{label:<32} {span['wall_seconds']:>9.3f} {span['cpu_seconds']:>9.3f} {rate:>12} "
+                     f"{delta:>11} {span['peak_rss_mb']:>13.0f}")
+    for name, stats in data['hot_paths'].items():
+        lines.append(f"{'[chemin chaud] ' + name:<32} {stats['seconds']:>9.3f} {'':>9} {stats['calls']:>12,} appels")
+    return "\n".join(lines)
+
+
+def finish(directory=TRACE_DIR, **extra):
+    """Écrit la trace active (avec les tables `extra`), affiche le résumé et désactive l'instrumentation"""
+    global _trace
+    if _trace is None:
+        return None
+    _trace.extra.update(extra)
+    path, data = _trace.write(directory)
+    _trace = None
+    print(f"\n[TRACE] {summary(data)}")
+    print(f"[TRACE] Trace écrite dans {path}" + (f" (profil : {data['profile']['file']})" if 'profile' in data else ""))
+    return path
+
+
+def add_arguments(parser):
+    """Options --trace / --profile / --trace-malloc communes aux analyseurs"""
+    parser.add_argument("--trace", action="store_true",
+                        help="Mesurer chaque étape → results/trace_<analyseur>_<date>.json")
+    parser.add_argument("--profile", action="store_true", help="--trace + profil cProfile (fichier .prof)")
+    parser.add_argument("--trace-malloc", action="store_true",
+                        help="--trace + allocations par étape et principaux sites (tracemalloc, plus lent)")
+
+
+def start_from_args(name, args):
+    """Démarre une trace si l'une des options de add_arguments est présente"""
+    if args.trace or args.profile or args.trace_malloc:
+        return start(name, args.profile, args.trace_malloc)
+    return None
@@ -0,0 +1,458 @@
+# log_index.py - Index sur disque des logs Odoo : horodatage → octet (creux) et listes par niveau / utilisateur / module
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import instrument
+from log_source import STDIN
+from odoo_log_parser import RECORD_PATTERN, iter_file_records, iter_records
+from parallel_parse import chunk_count, find_boundaries, is_splittable
+from parse_cache import NO_TIMESTAMP, source_key, timestamp_ms
+
+INDEX_DIR = "index"
+INDEX_VERSION = 1
+BLOCK_RECORDS = 1024                                                            # Enregistrements par bloc de l'index horodatage (creux)
+NO_MAX = np.iinfo(np.int64).max
+FIELDS = ('level', 'user', 'module')                                            # Champs des listes de blocs (groupes de RECORD_PATTERN)
+MERGE_GAP = 1024                                                                # Enregistrements séparés de moins d'octets lus d'un seul tenant
+TIME_PATTERN = re.compile(
+    r'^(?:(\d{4}-\d{2}-\d{2})[ T]?)?(?:(\d{2})(?::(\d{2})(?::(\d{2})(?:[,.](\d{1,3}))?)?)?)?$'
+)
+
+
+def index_path(log_file, directory=INDEX_DIR):
+    digest = hashlib.sha1(os.path.abspath(log_file).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(directory, f"{os.path.basename(log_file)}.{digest}")
+
+
+# ----------------Construction----------------
+def index_range(task):
+    """Indexe une plage d'octets commençant sur un en-tête (exécuté dans un worker avec --workers).
+
+    Par enregistrement : octet et ligne de l'en-tête (numéros locaux à la
+    plage), et son numéro dans la liste de chaque valeur de niveau,
+    utilisateur et module. Par bloc de `block_records` enregistrements :
+    horodatages min / max (index creux, robuste au léger désordre des
+    processus Odoo). Les lignes orphelines en tête de fichier ne sont pas
+    indexées. Fins de ligne \\n ou \\r\\n (découpage binaire).
+    """
+    path, start, end, block_records = task
+    match_header = RECORD_PATTERN.match
+    seconds = {}
+    offsets, lines = array('q'), array('q')
+    min_ts, max_ts = array('q'), array('q')
+    postings = {name: {} for name in FIELDS}                                    # Valeur → numéros d'enregistrements (croissants)
+    levels, users, modules = (postings[name] for name in FIELDS)
+    block_min, block_max = NO_MAX, NO_TIMESTAMP
+    records = line_num = 0
+    offset = start
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        for raw in f:
+            if offset >= end:
+                break
+            line_num += 1
+            if raw[:1].isdigit() or raw[:1].isspace():                          # Un en-tête commence par la date (après blancs)
+                match = match_header(raw.decode("utf-8", "replace").strip())
+                if match:
+                    timestamp, _, level, user, module, _ = match.groups()
+                    if records and records % block_records == 0:
+                        min_ts.append(block_min)
+                        max_ts.append(block_max)
+                        block_min, block_max = NO_MAX, NO_TIMESTAMP
+                    ms = timestamp_ms(timestamp, seconds)
+                    if ms < block_min:
+                        block_min = ms
+                    if ms > block_max:
+                        block_max = ms
+                    offsets.append(offset)
+                    lines.append(line_num)
+                    for field, value in ((levels, level), (users, user), (modules, module)):
+                        ids = field.get(value)
+                        if ids is None:
+                            ids = field[value] = array('q')
+                        ids.append(records)
+                    records += 1
+            offset += len(raw)
+    if records:                                                                 # Dernier bloc (fermé au plus tard ici)
+        min_ts.append(block_min)
+        max_ts.append(block_max)
+    return {'offsets': offsets, 'lines': lines, 'min_ts': min_ts, 'max_ts': max_ts,
+            'postings': postings, 'records': records, 'line_count': line_num}
+
+
+def _int_dtype(maximum):
+    return np.int32 if maximum < np.iinfo(np.int32).max else np.int64
+
+
+def merge_ranges(parts, size, block_records):
+    """Assemble les plages dans l'ordre du fichier : numéros recalés, codes de dictionnaire globaux.
+
+    Chaque plage commence un nouveau bloc ; le dernier bloc d'une plage peut
+    donc être incomplet, d'où la colonne ``block_start`` (premier
+    enregistrement de chaque bloc).
+    """
+    records = sum(part['records'] for part in parts)
+    line_count = sum(part['line_count'] for part in parts)
+    id_dtype, line_dtype = _int_dtype(records), _int_dtype(line_count)
+    offsets, lines, block_start, min_ts, max_ts = [], [], [], [], []
+    postings = {name: {} for name in FIELDS}
+    record_offset = line_offset = 0
+    for part in parts:
+        offsets.append(np.frombuffer(part['offsets'], dtype=np.int64))
+        lines.append((np.frombuffer(part['lines'], dtype=np.int64) + line_offset).astype(line_dtype))
+        block_start.append(np.arange(0, part['records'], block_records, dtype=np.int64) + record_offset)
+        min_ts.append(np.frombuffer(part['min_ts'], dtype=np.int64))
+        max_ts.append(np.frombuffer(part['max_ts'], dtype=np.int64))
+        for name in FIELDS:
+            field = postings[name]
+            for value, ids in part['postings'][name].items():
+                field.setdefault(value, []).append((np.frombuffer(ids, dtype=np.int64) + record_offset).astype(id_dtype))
+        record_offset += part['records']
+        line_offset += part['line_count']
+
+    columns = {
+        'offset': np.concatenate(offsets + [np.array([size], dtype=np.int64)]),  # n + 1 bornes : fin du dernier enregistrement = taille du fichier
+        'line': np.concatenate(lines) if lines else np.empty(0, dtype=line_dtype),
+        'block_start': np.concatenate(block_start + [np.array([records], dtype=np.int64)]),
+        'min_ts': np.concatenate(min_ts) if min_ts else np.empty(0, dtype=np.int64),
+        'max_ts': np.concatenate(max_ts) if max_ts else np.empty(0, dtype=np.int64),
+    }
+    dictionaries = {}
+    for name in FIELDS:
+        values = list(postings[name])
+        lists = [np.concatenate(postings[name][value]) for value in values]
+        columns[f'{name}_postings'] = np.concatenate(lists) if lists else np.empty(0, dtype=id_dtype)
+        columns[f'{name}_offsets'] = np.cumsum([0] + [len(ids) for ids in lists], dtype=np.int64)
+        dictionaries[name] = values
+    return columns, dictionaries, records, line_count
+
+
+def build_index(log_file, directory, workers=1, block_records=BLOCK_RECORDS):
+    """Parcourt `log_file` une fois (plages parallèles avec `workers`) et écrit l'index dans `directory`"""
+    key = source_key(log_file)                                                  # Relevée avant la lecture
+    size = key['size']
+    if workers > 1:
+        tasks = [(log_file, start, end, block_records)
+                 for start, end in find_boundaries(log_file, chunk_count(log_file, workers))]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(index_range, tasks))
+    else:
+        parts = [index_range((log_file, 0, size, block_records))]
+    columns, dictionaries, records, line_count = merge_ranges(parts, size, block_records)
+
+    tmp_dir = directory + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, column in columns.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), column)
+    meta = {
+        'version': INDEX_VERSION,
+        'source': key,
+        'records': records,
+        'lines': line_count,
+        'blocks': len(columns['min_ts']),
+        'block_records': block_records,
+        'dictionaries': dictionaries,
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return meta
+
+
+# ----------------Requêtes----------------
+def parse_time(text, end=False, default_date=None):
+    """"AAAA-MM-JJ[ HH[:MM[:SS[,mmm]]]]", "HH:MM…" (jour de `default_date`), "today" / "yesterday" → epoch ms (UTC).
+
+    Avec `end`, la borne couvre toute l'unité donnée : "15:05" va jusqu'à
+    15:05:59,999 et une date seule jusqu'à la fin de la journée.
+    """
+    text = text.strip()
+    if text.lower() in ("today", "yesterday"):
+        day = datetime.now(timezone.utc).date() - timedelta(days=text.lower() == "yesterday")
+        text = day.isoformat()
+    match = TIME_PATTERN.match(text)
+    if not match or not text:
+        raise ValueError(f"Horodatage invalide : {text!r} (attendu AAAA-MM-JJ HH:MM:SS,mmm)")
+    date, hour, minute, second, millis = match.groups()
+    date = date or default_date or datetime.now(timezone.utc).date().isoformat()
+    known = sum(part is not None for part in (hour, minute, second))
+    moment = datetime.strptime(f"{date} {hour or '00'}:{minute or '00'}:{second or '00'}", "%Y-%m-%d %H:%M:%S")
+    ms = int(moment.replace(tzinfo=timezone.utc).timestamp()) * 1000 + int((millis or "0").ljust(3, "0"))
+    if end and millis is None:
+        ms += (86400000, 3600000, 60000, 1000)[known] - 1
+    return ms
+
+
+def format_time(ms):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime("%Y-%m-%d %H:%M:%S,") + f"{ms % 1000:03d}"
+
+
+class LogQuery:
+    """Sélection d'enregistrements : intervalle [start, end] (epoch ms, bornes incluses) et valeurs acceptées.
+
+    Niveaux et utilisateurs sont comparés exactement (niveau en majuscules) ;
+    un module sélectionne aussi ses sous-modules ("odoo.addons" couvre
+    "odoo.addons.base.ir.ir_model"). Les lignes orphelines (sans en-tête)
+    ne sont retenues que par une requête sans aucun critère.
+    """
+
+    def __init__(self, start=None, end=None, levels=(), users=(), modules=()):
+        self.start = start
+        self.end = end
+        self.levels = {level.upper() for level in levels}
+        self.users = set(users)
+        self.modules = tuple(modules)
+
+    def __bool__(self):
+        return any((self.start is not None, self.end is not None, self.levels, self.users, self.modules))
+
+    def __str__(self):
+        criteria = []
+        if self.start is not None or self.end is not None:
+            criteria.append(f"{format_time(self.start) if self.start is not None else '…'} → "
+                            f"{format_time(self.end) if self.end is not None else '…'}")
+        for name, values in (("niveau", self.levels), ("utilisateur", self.users), ("module", self.modules)):
+            if values:
+                criteria.append(f"{name} {'|'.join(sorted(values))}")
+        return ", ".join(criteria) or "tout le fichier"
+
+    def accepts_module(self, module):
+        return any(module == prefix or module.startswith(prefix + ".") for prefix in self.modules)
+
+    def accepted_values(self, name, values):
+        """Valeurs d'un dictionnaire de l'index retenues pour le champ `name`"""
+        if name == 'module':
+            return [value for value in values if self.accepts_module(value)]
+        wanted = self.levels if name == 'level' else self.users
+        return [value for value in values if value in wanted]
+
+    def matches(self, record, seconds):
+        if not self:
+            return True
+        if record.is_orphan:
+            return False
+        if self.levels and record.level not in self.levels:
+            return False
+        if self.users and record.user not in self.users:
+            return False
+        if self.modules and not self.accepts_module(record.module):
+            return False
+        if self.start is not None or self.end is not None:
+            ms = timestamp_ms(record.timestamp, seconds)
+            if self.start is not None and ms < self.start:
+                return False
+            if self.end is not None and ms > self.end:
+                return False
+        return True
+
+
+class LogIndex:
+    """Index chargé par projection mémoire.
+
+    ``offset`` / ``line`` : octet et ligne de chaque enregistrement ;
+    ``min_ts`` / ``max_ts`` : horodatages extrêmes de chaque bloc (premier
+    enregistrement dans ``block_start``) ; ``<champ>_postings`` /
+    ``<champ>_offsets`` : numéros d'enregistrements de chaque valeur
+    (format CSR, dans l'ordre des dictionnaires de ``meta``).
+    """
+
+    def __init__(self, log_file, directory, meta):
+        self.log_file = log_file
+        self.directory = directory
+        self.meta = meta
+        for name in ('offset', 'line', 'block_start', 'min_ts', 'max_ts',
+                     *(f'{field}_{kind}' for field in FIELDS for kind in ('postings', 'offsets'))):
+            setattr(self, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r'))
+        self.codes = {name: {value: code for code, value in enumerate(values)}
+                      for name, values in meta['dictionaries'].items()}
+
+    def __len__(self):
+        return self.meta['records']
+
+    def intervals(self, query):
+        """Intervalles [début, fin) de numéros d'enregistrements dont le bloc recoupe l'intervalle de temps"""
+        if query.start is None and query.end is None:
+            return [(0, len(self))]
+        mask = np.ones(len(self.min_ts), dtype=bool)
+        if query.start is not None:
+            mask &= self.max_ts >= query.start
+        if query.end is not None:
+            mask &= self.min_ts <= query.end
+        blocks = np.flatnonzero(mask)
+        if not len(blocks):
+            return []
+        cut = np.flatnonzero(np.diff(blocks) > 1) + 1                           # Blocs consécutifs regroupés
+        first, last = blocks[np.concatenate(([0], cut))], blocks[np.concatenate((cut, [len(blocks)])) - 1]
+        return list(zip(self.block_start[first].tolist(), self.block_start[last + 1].tolist()))
+
+    def field_ids(self, name, values, intervals):
+        """Enregistrements des `values` du champ `name` dans les `intervals` (triés)"""
+        postings, offsets, codes = getattr(self, f'{name}_postings'), getattr(self, f'{name}_offsets'), self.codes[name]
+        parts = []
+        for value in values:
+            ids = postings[offsets[codes[value]]:offsets[codes[value] + 1]]
+            for start, end in intervals:                                        # Tranches par dichotomie : coût lié à l'intervalle
+                parts.append(ids[np.searchsorted(ids, start):np.searchsorted(ids, end)])
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts)) if len(values) > 1 else np.concatenate(parts)
+
+    def candidates(self, query):
+        """Enregistrements susceptibles de correspondre à `query` (champs exacts, temps au bloc près)"""
+        intervals = self.intervals(query)
+        ids = None
+        for name in FIELDS:
+            if getattr(query, f'{name}s'):
+                values = query.accepted_values(name, self.meta['dictionaries'][name])
+                field = self.field_ids(name, values, intervals)
+                ids = field if ids is None else np.intersect1d(ids, field, assume_unique=True)
+        if ids is None:
+            ids = np.concatenate([np.arange(start, end) for start, end in intervals] or [np.empty(0, dtype=np.int64)])
+        return ids
+
+    def ranges(self, ids, gap=MERGE_GAP):
+        """Plages d'octets (début, fin, première ligne) à lire ; enregistrements voisins lus d'un seul tenant"""
+        if not len(ids):
+            return []
+        starts, ends = self.offset[ids], self.offset[ids + 1]
+        cut = np.flatnonzero(starts[1:] - ends[:-1] > gap) + 1                  # Nouvelle plage quand l'écart dépasse `gap`
+        first, last = np.concatenate(([0], cut)), np.concatenate((cut, [len(ids)])) - 1
+        return list(zip(starts[first].tolist(), ends[last].tolist(), self.line[ids[first]].tolist()))
+
+    def select(self, query, ids=None):
+        """Enregistrements de `query`, dans l'ordre du fichier : seules les plages retenues sont lues et parsées"""
+        if not query:
+            yield from iter_file_records(self.log_file)
+            return
+        seconds = {}
+        with open(self.log_file, "rb") as f:
+            for start, end, line in self.ranges(self.candidates(query) if ids is None else ids):
+                f.seek(start)
+                data = f.read(end - start)
+                for record in iter_records(io.StringIO(data.decode("utf-8"), newline=None), line):  # Fins de ligne comme en mode texte
+                    if query.matches(record, seconds):                          # Filtre exact (voisins lus, bornes de temps)
+                        yield record
+
+
+def load_index(log_file, directory=INDEX_DIR):
+    """Index valide de `log_file`, ou None (absent, obsolète ou d'une autre version)"""
+    path = index_path(log_file, directory)
+    try:
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if meta.get('version') != INDEX_VERSION or meta.get('source') != source_key(log_file):
+        return None
+    return LogIndex(log_file, path, meta)
+
+
+@instrument.traced()
+def load_or_build(log_file, workers=1, directory=INDEX_DIR, block_records=BLOCK_RECORDS, rebuild=False):
+    """Charge l'index de `log_file`, en le (re)construisant s'il est absent, obsolète ou si `rebuild`"""
+    if log_file != STDIN and not os.path.exists(log_file):
+        raise FileNotFoundError(f"Fichier '{log_file}' introuvable")
+    if not is_splittable(log_file):
+        raise ValueError("L'index exige un fichier non compressé (accès direct par octet)")
+    index = None if rebuild else load_index(log_file, directory)
+    if index is not None:
+        return index
+    print(f"[INDEX] Construction de l'index de {log_file}", file=sys.stderr)
+    start = time.perf_counter()
+    path = index_path(log_file, directory)
+    meta = build_index(log_file, path, workers, block_records)
+    print(f"[INDEX] {meta['records']} enregistrements, {meta['blocks']} blocs en "
+          f"{time.perf_counter() - start:.1f} s → {path}", file=sys.stderr)
+    return LogIndex(log_file, path, meta)
+
+
+def select_records(log_file, query=None, workers=1):
+    """Enregistrements du fichier entier, ou de la seule sélection `query` (via l'index)"""
+    if not query:
+        return iter_file_records(log_file)
+    return load_or_build(log_file, workers).select(query)
+
+
+# ----------------Options communes aux analyseurs----------------
+def split_values(text):
+    """"admin,lina" → ["admin", "lina"]"""
+    return [value.strip() for value in text.split(",") if value.strip()]
+
+
+def add_query_arguments(parser):
+    """Options de sélection : l'analyseur ne lit que les enregistrements retenus (index/)"""
+    group = parser.add_argument_group("sélection indexée", "Analyser seulement une partie du log (index construit au besoin)")
+    group.add_argument("--from", dest="since", metavar="HORODATAGE",
+                       help="Début inclus : 'AAAA-MM-JJ HH:MM[:SS]', 'HH:MM' ou 'yesterday'")
+    group.add_argument("--to", dest="until", metavar="HORODATAGE", help="Fin incluse (toute la minute pour 'HH:MM', toute la journée pour une date)")
+    group.add_argument("--level", type=split_values, default=[], help="Niveaux retenus, ex. ERROR,WARNING")
+    group.add_argument("--user", type=split_values, default=[], help="Utilisateurs retenus, ex. admin,lina")
+    group.add_argument("--module", type=split_values, default=[], help="Modules retenus, sous-modules compris (odoo.addons)")
+
+
+def query_from_args(parser, args):
+    """LogQuery des options de add_query_arguments, ou None sans aucun critère"""
+    try:
+        start = parse_time(args.since) if args.since else None
+        default_date = format_time(start)[:10] if start is not None else None  # "--to 15:05" : même jour que --from
+        end = parse_time(args.until, end=True, default_date=default_date) if args.until else None
+    except ValueError as e:
+        parser.error(str(e))
+    query = LogQuery(start, end, args.level, args.user, args.module)
+    return query if query else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index des logs Odoo et requêtes par intervalle de temps / champ")
+    parser.add_argument("log_file", help="Fichier de log non compressé")
+    add_query_arguments(parser)
+    parser.add_argument("--count", action="store_true", help="Afficher seulement le nombre d'enregistrements")
+    parser.add_argument("--workers", type=int, default=1, help="Processus de construction de l'index")
+    parser.add_argument("--block-records", type=int, default=BLOCK_RECORDS,
+                        help="Enregistrements par bloc de l'index horodatage (plus petit : bornes de temps plus fines)")
+    parser.add_argument("--rebuild", action="store_true", help="Reconstruire l'index même s'il est à jour")
+    args = parser.parse_args()
+
+    query = query_from_args(parser, args)
+    try:
+        index = load_or_build(args.log_file, args.workers, block_records=args.block_records, rebuild=args.rebuild)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERREUR] {e}", file=sys.stderr)
+        sys.exit(1)
+    if query is None:
+        print(f"[INDEX] {len(index)} enregistrements, {index.meta['blocks']} blocs ({index.directory})")
+        return
+
+    start = time.perf_counter()
+    ids = index.candidates(query)
+    count = 0
+    out = sys.stdout
+    for record in index.select(query, ids):
+        count += 1
+        if not args.count:
+            out.write("\n".join(text for _, text in record.physical_lines()) + "\n")
+    elapsed = time.perf_counter() - start
+    read = sum(end - begin for begin, end, _ in index.ranges(ids))
+    if args.count:
+        print(count)
+    print(f"[INDEX] {count} enregistrements ({query}) : {len(ids)} candidats sur {len(index)}, "
+          f"{read / (1 << 20):.2f} Mo lus en {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+# log_source.py - Ouverture des sources de logs (fichier, rotation compressée, stdin)
+
+import bz2
+import gzip
+import io
+import sys
+
+STDIN = "-"
+
+
+def open_log(path, encoding="utf-8"):
+    """Ouvre une source de log en mode texte, lue paresseusement ligne par ligne.
+
+    - ``-`` : entrée standard (utilisable derrière ``tail -F``)
+    - ``*.gz`` / ``*.bz2`` : fichiers de rotation compressés (``odoo.log.1.gz``)
+    - sinon : fichier texte ordinaire
+    """
+    if path == STDIN:
+        return io.TextIOWrapper(sys.stdin.buffer, encoding=encoding, line_buffering=True)
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding=encoding)
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding=encoding)
+    return open(path, "r", encoding=encoding)
+
+
+def iter_lines(path, encoding="utf-8"):
+    """Générateur de lignes : la mémoire reste constante quelle que soit la taille du log"""
+    with open_log(path, encoding) as f:
+        yield from f
@@ -0,0 +1,171 @@
+# mmap_scan.py - Comptage par utilisateur sur octets, fichier projeté en mémoire
+
+import mmap
+import os
+import re
+from collections import Counter
+
+WINDOW_SIZE = 1024 * 1024                                                       # Fenêtre traitée d'un bloc (alignée sur un retour à la ligne)
+
+WS = rb"[ \t\r\x0b\x0c]"                                                        # \s d'une ligne ASCII déjà découpée
+HEADER = (rb"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d+" + WS + rb"+\d+" + WS +
+          rb"+(?:INFO|ERROR|WARNING)" + WS + rb"+(\w+)")                        # USER_PATTERN de analyzer_tokens.py, sur octets
+USER_BYTES = re.compile(HEADER)
+# Le préfixe littéral "\n" permet au moteur de sauter directement de ligne en ligne
+HEADER_LINES = re.compile(rb"\n" + WS + rb"*" + HEADER)
+OTHER_LINES = re.compile(rb"\n(?!" + WS + rb"*" + HEADER + rb")(?=" + WS + rb"*[^ \t\r\x0b\x0c\n])")
+# Octets pour lesquels bytes et str divergent (casse Unicode, \s étendu, \r isolé)
+SPECIAL_BYTES = re.compile(rb"[\x80-\xff\x1c-\x1f]|\r(?!\n)")
+CONTROL_BYTES = bytes(range(0x1c, 0x20))
+# Mots-clés de categorize_log, par priorité croissante : info (faux positif) > error > warning
+KEYWORDS = [(re.compile(keyword), category) for keyword, category in (
+    (rb"warning", "warning"),
+    (rb"error", "error"), (rb"exception", "error"), (rb"failed", "error"),
+    (rb"no error", "info"), (rb"without error", "info"),
+)]
+PRIORITY = {"warning": 0, "error": 1, "info": 2}
+
+
+def is_plain(buf):
+    """Vrai si le bloc peut être traité sur octets avec un résultat identique au mode texte"""
+    if not buf.isascii():
+        return False
+    if b"\r" in buf and buf.count(b"\r") != buf.count(b"\r\n"):
+        return False
+    return len(buf.translate(None, CONTROL_BYTES)) == len(buf)
+
+
+class UserScan:
+    """Compteurs bruts par utilisateur, dans l'ordre de première apparition"""
+
+    def __init__(self, categorize, extract_user):
+        self.categorize = categorize                                            # Repli texte exact (analyzer_tokens.categorize_log)
+        self.extract_user = extract_user                                        # Repli texte exact (analyzer_tokens.extract_user)
+        self.seen = {}                                                          # Utilisateur brut → rien (ordre d'insertion)
+        self.totals = Counter()
+        self.errors = Counter()
+        self.warnings = Counter()
+
+    def scan_plain(self, buf, low, start, end):
+        """Lignes ASCII de buf[start:end] (start pointe sur un \\n) sans objet par ligne"""
+        headers = HEADER_LINES.findall(buf, start, end)
+        self.totals.update(headers)
+
+        others = []                                                             # Continuations, orphelins : peu nombreux
+        for m in OTHER_LINES.finditer(buf, start, end):
+            line_end = buf.find(b"\n", m.end(), end)
+            match = USER_BYTES.search(buf, m.end(), end if line_end == -1 else line_end)
+            user = match.group(1) if match else b"unknown"
+            self.totals[user] += 1
+            others.append((m.start(), user))
+
+        self._record_order(buf, start, end, headers, others)
+
+        # Seules les lignes contenant un mot-clé sont revisitées en Python
+        categories = {}
+        for regex, category in KEYWORDS:
+            for m in regex.finditer(low, start, end):
+                line_start = low.rfind(b"\n", start, m.start())
+                current = categories.get(line_start)
+                if current is None or PRIORITY[category] > PRIORITY[current]:
+                    categories[line_start] = category
+
+        for line_start, category in categories.items():
+            if category == "info":
+                continue
+            line_end = buf.find(b"\n", line_start + 1, end)
+            match = USER_BYTES.search(buf, line_start + 1, end if line_end == -1 else line_end)
+            user = match.group(1) if match else b"unknown"
+            (self.errors if category == "error" else self.warnings)[user] += 1
+
+    def _record_order(self, buf, start, end, headers, others):
+        new_others = [(pos, user) for pos, user in others if user not in self.seen]
+        if not new_others:
+            for user in headers:
+                if user not in self.seen:
+                    self.seen[user] = None
+            return
+
+        # Nouveaux utilisateurs hors en-tête : on retrouve les positions pour intercaler
+        firsts = {}
+        for m in HEADER_LINES.finditer(buf, start, end):
+            user = m.group(1)
+            if user not in self.seen and user not in firsts:
+                firsts[user] = m.start()
+        for pos, user in new_others:
+            if user not in firsts or pos < firsts[user]:
+                firsts[user] = pos
+        for user in sorted(firsts, key=firsts.get):
+            self.seen[user] = None
+
+    def scan_text(self, raw):
+        """Repli exact pour une ligne non ASCII : décodage et chemin texte d'origine"""
+        text = raw.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+        for line in text.split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            user = self.extract_user(line)
+            self.seen.setdefault(user, None)
+            self.totals[user] += 1
+            category = self.categorize(line)
+            if category == "error":
+                self.errors[user] += 1
+            elif category == "warning":
+                self.warnings[user] += 1
+
+    def scan_window(self, window):
+        buf = b"\n" + window                                                    # Chaque ligne est précédée d'un \n
+        end = len(buf) - 1 if buf.endswith(b"\n") else len(buf)
+        low = buf.lower()                                                       # Minuscules ASCII, un seul passage C
+        if is_plain(buf):
+            self.scan_plain(buf, low, 0, end)
+            return
+
+        pos = 0
+        while pos < end:
+            m = SPECIAL_BYTES.search(buf, pos, end)
+            if m is None:
+                self.scan_plain(buf, low, pos, end)
+                break
+            line_start = buf.rfind(b"\n", pos, m.start())
+            line_end = buf.find(b"\n", m.end(), end)
+            line_end = end if line_end == -1 else line_end
+            if line_start > pos:
+                self.scan_plain(buf, low, pos, line_start)
+            self.scan_text(buf[line_start + 1:line_end])
+            pos = line_end
+
+    def user_stats(self):
+        """Résultat au format de compute_user_stats (utilisateurs en minuscules)"""
+        stats = {}
+        for user in self.seen:
+            key = user.decode("ascii").lower() if isinstance(user, bytes) else user
+            counts = stats.setdefault(key, {"error": 0, "warning": 0, "info": 0})
+            errors, warnings = self.errors[user], self.warnings[user]
+            counts["error"] += errors
+            counts["warning"] += warnings
+            counts["info"] += self.totals[user] - errors - warnings
+        return stats
+
+
+def scan_user_stats(path, categorize, extract_user):
+    """Parcourt le fichier projeté par fenêtres et retourne les stats par utilisateur.
+
+    Aucune chaîne n'est créée par ligne : les en-têtes, lignes de continuation
+    et mots-clés sont repérés par des recherches C sur les octets, et seules
+    les lignes contenant un mot-clé repassent par Python. Les lignes non
+    ASCII sont traitées par le chemin texte d'origine, le résultat est donc
+    identique à celui de compute_user_stats.
+    """
+    scan = UserScan(categorize, extract_user)
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return scan.user_stats()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size, start = len(mm), 0
+            while start < size:
+                stop = mm.find(b"\n", min(start + WINDOW_SIZE, size) - 1) + 1 or size
+                scan.scan_window(mm[start:stop])
+                start = stop
+    return scan.user_stats()
@@ -0,0 +1,302 @@
+# model_store.py - Modèle TF-IDF + KMeans persistant : versions, inférence seule, réentraînement planifié ou sur dérive
+
+import argparse
+import json
+import os
+import re
+import shutil
+from datetime import datetime, timedelta
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+import sklearn
+from scipy.optimize import linear_sum_assignment
+
+MODEL_DIR = "models"
+STORE_VERSION = 1                                                               # Format du dossier d'une version
+MAX_AGE_DAYS = 7                                                                # Réentraînement planifié : âge maximal du modèle
+DRIFT_THRESHOLD = 1.5                                                           # Distance moyenne au centroïde / celle de l'entraînement
+KEEP_VERSIONS = 5                                                               # Versions conservées (les plus récentes)
+CACHE_LIMIT = 200000                                                            # Messages normalisés gardés par le cache de vecteurs
+DIGITS = re.compile(r"\d+")
+
+
+def normalize_message(message):
+    """Chiffres → 0 : « Invoice INV/2025/0042 » et « INV/2025/0043 » ont le même vecteur (et la même entrée du cache)"""
+    return DIGITS.sub("0", message)
+
+
+class VectorCache:
+    """Vecteurs TF-IDF déjà calculés, par message normalisé, propres à une version du modèle.
+
+    Le vectoriseur d'une version est figé : un message déjà vu redonne le
+    même vecteur, qui est relu au lieu d'être recalculé, d'un lot ou d'une
+    exécution à l'autre (vectors.npz + messages.json dans la version). Une
+    nouvelle version part d'un cache vide, ce qui suffit à l'invalider.
+    """
+
+    def __init__(self, directory, limit=CACHE_LIMIT):
+        self.directory = directory
+        self.limit = limit
+        self.rows = {}                                                          # Message normalisé → ligne de `matrix`
+        self.matrix = None
+        self.pending = []                                                       # Nouveaux (messages, matrice) à écrire
+        self.hits = self.misses = 0
+        try:
+            with open(os.path.join(directory, "messages.json"), "r", encoding="utf-8") as f:
+                messages = json.load(f)
+            self.matrix = sp.load_npz(os.path.join(directory, "vectors.npz")).tocsr()
+        except (FileNotFoundError, ValueError):
+            return
+        if len(messages) == self.matrix.shape[0]:
+            self.rows = {message: i for i, message in enumerate(messages)}
+        else:
+            self.matrix = None
+
+    def __len__(self):
+        return len(self.rows) + sum(len(messages) for messages, _ in self.pending)
+
+    def transform(self, vectorizer, messages):
+        """Matrice des messages (normalisés) : chaque message distinct n'est vectorisé qu'une fois, et jamais s'il est en cache"""
+        unique, inverse = {}, np.empty(len(messages), dtype=np.int64)
+        for i, message in enumerate(messages):
+            inverse[i] = unique.setdefault(message, len(unique))
+        unique = list(unique)
+        cached = [self.rows.get(message) for message in unique]
+        missing = [message for message, row in zip(unique, cached) if row is None]
+        self.hits += len(unique) - len(missing)
+        self.misses += len(missing)
+        parts, order = [], np.empty(len(unique), dtype=np.int64)
+        known = [i for i, row in enumerate(cached) if row is not None]
+        if known:
+            parts.append(self.matrix[[cached[i] for i in known]])
+        if missing:
+            computed = vectorizer.transform(missing)
+            parts.append(computed)
+            self.add(missing, computed)
+        order[known + [i for i, row in enumerate(cached) if row is None]] = np.arange(len(unique))
+        X = sp.vstack(parts, format="csr") if len(parts) > 1 else parts[0].tocsr()
+        return X[order[inverse]]                                                # Une ligne par message, dans l'ordre d'entrée
+
+    def add(self, messages, matrix):
+        room = self.limit - len(self)
+        if room > 0:
+            self.pending.append((messages[:room], matrix[:room]))
+
+    def save(self):
+        if not self.pending:
+            return
+        messages = [message for message, row in sorted(self.rows.items(), key=lambda item: item[1])]
+        parts = [self.matrix] if self.matrix is not None else []
+        for new, matrix in self.pending:
+            start = len(messages)
+            messages.extend(new)
+            parts.append(matrix)
+            self.rows.update((message, start + i) for i, message in enumerate(new))
+        self.matrix = sp.vstack(parts, format="csr")
+        self.pending = []
+        sp.save_npz(os.path.join(self.directory, "vectors.npz"), self.matrix)
+        with open(os.path.join(self.directory, "messages.json"), "w", encoding="utf-8") as f:
+            json.dump(messages, f, ensure_ascii=False)
+
+
+class Model:
+    """Version chargée : vectoriseur et KMeans ajustés, métadonnées, cache de vecteurs"""
+
+    def __init__(self, path, vectorizer, kmeans, meta):
+        self.path = path
+        self.vectorizer = vectorizer
+        self.kmeans = kmeans
+        self.meta = meta
+        self.cache = VectorCache(path)
+
+    @property
+    def version(self):
+        return self.meta['version']
+
+    def age(self, now=None):
+        return (now or datetime.now()) - datetime.fromisoformat(self.meta['trained_at'])
+
+    def transform(self, messages):
+        return self.cache.transform(self.vectorizer, messages)
+
+    def assign(self, X):
+        """(clusters, distance de chaque message à son centroïde) : predict sans réajustement"""
+        distances = self.kmeans.transform(X)
+        labels = distances.argmin(axis=1)
+        return labels, distances[np.arange(len(labels)), labels]
+
+    def drift(self, distances):
+        """Distance moyenne au centroïde rapportée à celle de l'entraînement (1 : même dispersion)"""
+        baseline = self.meta['mean_distance']
+        return float(np.mean(distances)) / baseline if baseline else float("inf")
+
+
+def seed_centers(X, previous_labels, n_clusters):
+    """Centroïdes initiaux du réentraînement : moyenne, dans le nouvel espace TF-IDF, des messages de chaque ancien cluster.
+
+    KMeans part ainsi de l'ancien partitionnement au lieu d'un tirage
+    k-means++ : les clusters qui n'ont pas changé sont retrouvés à
+    l'identique, avec le même identifiant. Un ancien cluster sans message
+    reçoit le message le plus éloigné des autres centroïdes.
+    """
+    counts = np.bincount(previous_labels, minlength=n_clusters)
+    indicator = sp.csr_matrix((np.ones(len(previous_labels)), (previous_labels, np.arange(len(previous_labels)))),
+                              shape=(n_clusters, X.shape[0]))
+    centers = np.asarray((indicator @ X).todense()) / np.maximum(counts, 1)[:, None]
+    for cluster in np.flatnonzero(counts == 0):
+        filled = centers[counts > 0]
+        distances = np.asarray(X.multiply(X).sum(axis=1)).ravel()[:, None] - 2 * (X @ filled.T) + (filled ** 2).sum(axis=1)
+        centers[cluster] = X[int(distances.min(axis=1).argmax())].toarray()
+        counts[cluster] = 1
+    return centers
+
+
+def align_clusters(previous_labels, labels, n_clusters):
+    """Permutation nouvel → ancien identifiant maximisant les messages restés dans « le même » cluster.
+
+    Les deux modèles étiquettent les mêmes messages d'entraînement ; la
+    table de contingence est résolue par affectation hongroise. Sans elle,
+    KMeans numérote ses clusters arbitrairement à chaque ajustement.
+    """
+    contingency = np.zeros((n_clusters, n_clusters), dtype=np.int64)
+    np.add.at(contingency, (labels, previous_labels), 1)
+    rows, columns = linear_sum_assignment(-contingency)
+    mapping = np.empty(n_clusters, dtype=np.int64)
+    mapping[rows] = columns
+    return mapping
+
+
+def relabel(kmeans, mapping):
+    """Renumérote un KMeans ajusté : le cluster i devient mapping[i] (centroïdes et labels_)"""
+    order = np.argsort(mapping)                                                 # Nouvel identifiant → ancienne ligne
+    kmeans.cluster_centers_ = kmeans.cluster_centers_[order]
+    kmeans.labels_ = mapping[kmeans.labels_]
+    return kmeans
+
+
+def retrain_reason(model, max_age_days=MAX_AGE_DAYS, n_clusters=None):
+    """Raison d'un réentraînement avant toute inférence (None : le modèle courant convient)"""
+    if model is None:
+        return "aucun modèle enregistré"
+    if n_clusters is not None and model.meta['n_clusters'] != n_clusters:
+        return f"{model.meta['n_clusters']} clusters enregistrés, {n_clusters} demandés"
+    if max_age_days is not None and model.age() > timedelta(days=max_age_days):
+        return f"modèle de plus de {max_age_days:g} jours"
+    return None
+
+
+class ModelStore:
+    """Versions successives d'un modèle dans models/<nom>/v0001, v0002… (la plus récente est la courante).
+
+    Chaque version contient vectorizer.joblib, kmeans.joblib et meta.json
+    (version, date d'entraînement, version de scikit-learn, paramètres,
+    distance moyenne de référence pour la dérive, version alignée). Une
+    version d'un autre format ou d'une autre version de scikit-learn est
+    ignorée : le modèle est alors réentraîné plutôt que mal relu.
+    """
+
+    def __init__(self, name="kmeans", directory=MODEL_DIR, keep=KEEP_VERSIONS):
+        self.path = os.path.join(directory, name)
+        self.keep = keep
+
+    def versions(self):
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return []
+        return sorted(int(name[1:]) for name in names if re.fullmatch(r"v\d{4,}", name))
+
+    def version_path(self, version):
+        return os.path.join(self.path, f"v{version:04d}")
+
+    def load(self, version=None):
+        """Version demandée (la courante par défaut), ou None si absente ou illisible"""
+        versions = self.versions()
+        if version is None:
+            if not versions:
+                return None
+            version = versions[-1]
+        path = self.version_path(version)
+        try:
+            with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if meta.get('store_version') != STORE_VERSION or meta.get('sklearn') != sklearn.__version__:
+            return None
+        return Model(path, joblib.load(os.path.join(path, "vectorizer.joblib")),
+                     joblib.load(os.path.join(path, "kmeans.joblib")), meta)
+
+    def save(self, vectorizer, kmeans, mean_distance, **meta):
+        """Enregistre une nouvelle version (écrite à côté puis renommée) et retourne le Model chargé"""
+        versions = self.versions()
+        version = versions[-1] + 1 if versions else 1
+        path = self.version_path(version)
+        tmp_dir = path + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        joblib.dump(vectorizer, os.path.join(tmp_dir, "vectorizer.joblib"))
+        joblib.dump(kmeans, os.path.join(tmp_dir, "kmeans.joblib"))
+        meta = {
+            'store_version': STORE_VERSION,
+            'version': version,
+            'trained_at': datetime.now().isoformat(timespec="seconds"),
+            'sklearn': sklearn.__version__,
+            'n_clusters': int(kmeans.n_clusters),
+            'vocabulary': len(vectorizer.vocabulary_),
+            'mean_distance': mean_distance,
+            **meta,
+        }
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_dir, path)
+        for old in versions[:max(len(versions) + 1 - self.keep, 0)]:
+            shutil.rmtree(self.version_path(old), ignore_errors=True)
+        return Model(path, vectorizer, kmeans, meta)
+
+
+# ----------------Options communes (analyzer_kmeans.py, pipeline.py)----------------
+def add_model_arguments(parser):
+    parser.add_argument("--model", action="store_true",
+                        help="Modèle persistant (models/) : inférence seule, réentraînement planifié ou sur dérive")
+    parser.add_argument("--retrain", action="store_true", help="Forcer un réentraînement (implique --model)")
+    parser.add_argument("--max-age", type=float, default=MAX_AGE_DAYS,
+                        help="Réentraîner un modèle plus vieux que ce nombre de jours")
+    parser.add_argument("--drift-threshold", type=float, default=DRIFT_THRESHOLD,
+                        help="Réentraîner si distance moyenne au centroïde / référence dépasse ce seuil")
+    parser.add_argument("--model-dir", default=MODEL_DIR, help="Dossier des modèles")
+
+
+def model_options_from_args(args):
+    """Options du modèle persistant, ou None sans --model / --retrain"""
+    if not (args.model or args.retrain):
+        return None
+    return {'store': ModelStore(directory=args.model_dir), 'max_age_days': args.max_age,
+            'drift_threshold': args.drift_threshold, 'retrain': args.retrain}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Versions enregistrées du modèle TF-IDF + KMeans")
+    parser.add_argument("--model-dir", default=MODEL_DIR, help="Dossier des modèles")
+    parser.add_argument("--name", default="kmeans", help="Nom du modèle")
+    args = parser.parse_args()
+    store = ModelStore(args.name, args.model_dir)
+    versions = store.versions()
+    if not versions:
+        print(f"[MODÈLE] Aucune version dans {store.path}")
+        return
+    print(f"{'version':>7} {'entraîné le':<20} {'clusters':>8} {'vocab.':>7} {'logs':>9} {'cache':>8}  raison")
+    for version in versions:
+        model = store.load(version)
+        if model is None:
+            print(f"{version:>7} (format ou version de scikit-learn différents)")
+            continue
+        meta = model.meta
+        print(f"{version:>7} {meta['trained_at']:<20} {meta['n_clusters']:>8} {meta['vocabulary']:>7} "
+              f"{meta.get('records', 0):>9} {len(model.cache):>8}  {meta.get('reason', '')}")
+
+
+if __name__ == "__main__":
+    main()
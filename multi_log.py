@@ -0,0 +1,336 @@
+# multi_log.py - Plusieurs logs (workers, machines) : résultats partiels sérialisés, fusion, tri par horodatage
+
+import argparse
+import glob
+import heapq
+import json
+import os
+import re
+import socket
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from analyzer_clust import NUMBER_PATTERN
+from analyzer_pattern import iter_record_anomalies, load_pattern_sets
+from analyzer_tokens import compute_user_stats, merge_user_stats
+from odoo_log_parser import iter_file_records
+from sketches import HyperLogLog, TopK
+from template_miner import TemplateMiner
+
+PARTIAL_VERSION = 1
+PARTIAL_SUFFIX = ".partial.json"
+BATCH_SIZE = 50000                                                              # Enregistrements traités par lot (mémoire bornée)
+ANOMALY_SAMPLES = 20                                                            # Exemples gardés par motif d'anomalie
+REPORT_TOP = 20                                                                 # Lignes des classements du rapport
+OUTPUT_DIR = "results"
+IP_PATTERN = re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b")                         # Adresses IPv4 (lignes werkzeug)
+
+
+def expand_inputs(patterns):
+    """Fichiers désignés par des chemins ou des motifs glob ('logs/*.log'), sans doublon, dans l'ordre"""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            raise FileNotFoundError(f"Aucun fichier ne correspond à '{pattern}'")
+        for path in matches:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Fichier '{path}' introuvable")
+            if path not in files:
+                files.append(path)
+    return files
+
+
+def iter_batches(records, batch_size=BATCH_SIZE):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def template_counts(miner):
+    """{texte du gabarit: effectif} ; deux gabarits devenus identiques par généralisation sont sommés"""
+    counts = {}
+    for template in miner.templates:
+        counts[template.template] = counts.get(template.template, 0) + template.count
+    return counts
+
+
+# ----------------Résultat partiel d'un fichier----------------
+def build_partial(log_file, batch_size=BATCH_SIZE):
+    """Résultat partiel d'un log, en un passage par lots (exécuté dans un worker).
+
+    Compteurs exacts (niveaux, modules, catégories par utilisateur comme
+    analyzer_tokens, anomalies par motif comme analyzer_pattern), effectifs
+    des gabarits (TemplateMiner) et résumés fusionnables : HyperLogLog des
+    utilisateurs et IP distincts, top-K des messages normalisés.
+    """
+    false_positive_set, known_pattern_set = load_pattern_sets()
+    miner = TemplateMiner()
+    levels, modules, anomaly_counts = Counter(), Counter(), Counter()
+    samples = {}
+    user_stats = {}
+    distinct_users, distinct_ips = HyperLogLog(), HyperLogLog()
+    top_messages = TopK()
+    records = lines = 0
+    first = last = None
+
+    for batch in iter_batches(iter_file_records(log_file), batch_size):
+        user_stats = merge_user_stats([user_stats, compute_user_stats(batch)])
+        for anomaly in iter_record_anomalies(batch, false_positive_set, known_pattern_set):
+            pattern = anomaly['pattern']
+            anomaly_counts[pattern] += 1
+            hits = samples.setdefault(pattern, [])
+            if len(hits) < ANOMALY_SAMPLES:
+                hits.append([log_file, anomaly['line_number'], anomaly['log']])
+        messages, users, ips = Counter(), set(), set()                          # Valeurs du lot : mémoire bornée par BATCH_SIZE
+        for record in batch:
+            lines += 1 + len(record.continuation or ())
+            if record.is_orphan:
+                continue
+            records += 1
+            levels[record.level] += 1
+            modules[record.module] += 1
+            users.add(record.user)
+            message = record.first_message
+            ips.update(IP_PATTERN.findall(message))
+            messages[NUMBER_PATTERN.sub("#", message)] += 1
+            miner.add(message)
+            if first is None or record.timestamp < first:
+                first = record.timestamp
+            if last is None or record.timestamp > last:
+                last = record.timestamp
+        top_messages.update(messages)
+        distinct_users.update(users)                                            # Dédoublonnées dans le lot : un hachage chacune
+        distinct_ips.update(ips)
+
+    return {
+        'version': PARTIAL_VERSION,
+        'sources': [{'file': os.path.abspath(log_file), 'host': socket.gethostname(),
+                     'size': os.path.getsize(log_file), 'records': records, 'lines': lines,
+                     'first_timestamp': first, 'last_timestamp': last}],
+        'records': records,
+        'lines': lines,
+        'first_timestamp': first,
+        'last_timestamp': last,
+        'levels': dict(levels),
+        'modules': dict(modules),
+        'user_stats': {user: dict(counts) for user, counts in user_stats.items()},
+        'anomalies': {'counts': dict(anomaly_counts), 'samples': samples},
+        'templates': template_counts(miner),
+        'distinct_users': distinct_users.to_dict(),
+        'distinct_ips': distinct_ips.to_dict(),
+        'top_messages': top_messages.to_dict(),
+    }
+
+
+def build_partials(files, workers=1):
+    """Un résultat partiel par fichier, chaque fichier dans son propre processus avec `workers` > 1"""
+    if workers <= 1 or len(files) <= 1:
+        return [build_partial(path) for path in files]
+    with ProcessPoolExecutor(max_workers=min(workers, len(files))) as pool:
+        return list(pool.map(build_partial, files))
+
+
+def partial_file(log_file, directory):
+    """<dossier>/<log>.<machine>.partial.json : deux machines peuvent avoir un log de même nom"""
+    return os.path.join(directory, f"{os.path.basename(log_file)}.{socket.gethostname()}{PARTIAL_SUFFIX}")
+
+
+def save_partial(partial, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(partial, f, ensure_ascii=False)
+
+
+def load_partial(path):
+    with open(path, "r", encoding="utf-8") as f:
+        partial = json.load(f)
+    if partial.get('version') != PARTIAL_VERSION:
+        raise ValueError(f"{path} : version de résultat partiel non prise en charge")
+    return partial
+
+
+# ----------------Fusion----------------
+def add_counters(target, counts):
+    for key, n in counts.items():
+        target[key] = target.get(key, 0) + n
+
+
+def merge_templates(partial_templates):
+    """Gabarits de plusieurs miners : chaque texte repasse dans un TemplateMiner avec son effectif.
+
+    Un fichier peut avoir gardé un message tel quel (« Login as admin »)
+    là où un autre l'a généralisé (« Login as <*> ») : le second passage
+    les regroupe avec la même règle de similarité.
+    """
+    miner = TemplateMiner()
+    for counts in partial_templates:
+        for text, n in counts.items():
+            miner.add(text).count += n - 1
+    return template_counts(miner)
+
+
+def merge_partials(partials):
+    """Fusion associative : le résultat est lui-même un partiel (fusion hiérarchique possible)"""
+    partials = list(partials)
+    if not partials:
+        raise ValueError("Aucun résultat partiel à fusionner")
+    levels, modules, anomaly_counts, samples = {}, {}, {}, {}
+    user_stats = {}
+    distinct_users = HyperLogLog.from_dict(partials[0]['distinct_users'])
+    distinct_ips = HyperLogLog.from_dict(partials[0]['distinct_ips'])
+    top_messages = TopK.from_dict(partials[0]['top_messages'])
+    for partial in partials:
+        add_counters(levels, partial['levels'])
+        add_counters(modules, partial['modules'])
+        add_counters(anomaly_counts, partial['anomalies']['counts'])
+        for pattern, hits in partial['anomalies']['samples'].items():
+            kept = samples.setdefault(pattern, [])
+            kept.extend(hits[:ANOMALY_SAMPLES - len(kept)])
+        user_stats = merge_user_stats([user_stats, partial['user_stats']])
+    for partial in partials[1:]:
+        distinct_users.merge(HyperLogLog.from_dict(partial['distinct_users']))
+        distinct_ips.merge(HyperLogLog.from_dict(partial['distinct_ips']))
+        top_messages.merge(TopK.from_dict(partial['top_messages']))
+    firsts = [p['first_timestamp'] for p in partials if p['first_timestamp'] is not None]
+    lasts = [p['last_timestamp'] for p in partials if p['last_timestamp'] is not None]
+    return {
+        'version': PARTIAL_VERSION,
+        'sources': [source for partial in partials for source in partial['sources']],
+        'records': sum(p['records'] for p in partials),
+        'lines': sum(p['lines'] for p in partials),
+        'first_timestamp': min(firsts) if firsts else None,
+        'last_timestamp': max(lasts) if lasts else None,
+        'levels': levels,
+        'modules': modules,
+        'user_stats': {user: dict(counts) for user, counts in user_stats.items()},
+        'anomalies': {'counts': anomaly_counts, 'samples': samples},
+        'templates': merge_templates(p['templates'] for p in partials),
+        'distinct_users': distinct_users.to_dict(),
+        'distinct_ips': distinct_ips.to_dict(),
+        'top_messages': top_messages.to_dict(),
+    }
+
+
+def summarize(partial, top=REPORT_TOP):
+    """Vue lisible d'un partiel : estimations des résumés et classements"""
+    top_messages = TopK.from_dict(partial['top_messages'])
+    return {
+        'files': len(partial['sources']),
+        'records': partial['records'],
+        'lines': partial['lines'],
+        'period': [partial['first_timestamp'], partial['last_timestamp']],
+        'levels': partial['levels'],
+        'distinct_users': HyperLogLog.from_dict(partial['distinct_users']).estimate(),
+        'distinct_ips': HyperLogLog.from_dict(partial['distinct_ips']).estimate(),
+        'top_error_users': sorted(((user, counts['error']) for user, counts in partial['user_stats'].items()
+                                   if counts['error'] > 0), key=lambda item: -item[1])[:top],
+        'top_messages': top_messages.top(top),
+        'top_messages_max_undercount': top_messages.error,
+        'top_templates': Counter(partial['templates']).most_common(top),
+        'anomalies': Counter(partial['anomalies']['counts']).most_common(),
+    }
+
+
+def write_report(partial, output=None):
+    """Rapport fusionné (partiel + résumé) → results/aggregate_<date>.json ; refusionnable tel quel"""
+    output = output or os.path.join(OUTPUT_DIR, f"aggregate_{datetime.now():%Y%m%d_%H%M%S}.json")
+    summary = summarize(partial)
+    save_partial(dict(partial, summary=summary), output)
+    print(f"[AGGREGATE] {summary['files']} fichiers, {summary['records']} enregistrements "
+          f"({summary['period'][0]} → {summary['period'][1]})")
+    print(f"[AGGREGATE] Niveaux : {summary['levels']}")
+    print(f"[AGGREGATE] ≈ {summary['distinct_users']} utilisateurs et ≈ {summary['distinct_ips']} IP distincts")
+    print(f"[AGGREGATE] {sum(partial['anomalies']['counts'].values())} anomalies, "
+          f"{len(partial['templates'])} gabarits")
+    for message, count in summary['top_messages'][:5]:
+        print(f"  {count:>9}  {message[:100]}")
+    print(f"[EXPORT] Rapport fusionné écrit dans {output}")
+    return output
+
+
+# ----------------Fusion k-voies par horodatage----------------
+def _timestamped(log_file):
+    for record in iter_file_records(log_file):
+        yield record.timestamp or "", log_file, record                          # Orphelins (sans horodatage) en tête
+
+
+def iter_merged_records(files):
+    """(fichier, enregistrement) de tous les logs, dans l'ordre chronologique.
+
+    Fusion k-voies en flux (heapq.merge) : mémoire proportionnelle au
+    nombre de fichiers. Les horodatages Odoo (« AAAA-MM-JJ HH:MM:SS,mmm »)
+    se comparent comme des chaînes ; à égalité, l'ordre des fichiers en
+    argument est conservé. L'ordre interne de chaque fichier est respecté
+    même s'il n'est pas parfaitement chronologique.
+    """
+    for _, log_file, record in heapq.merge(*(_timestamped(path) for path in files), key=lambda item: item[0]):
+        yield log_file, record
+
+
+def write_merged(files, output=None, label=False):
+    """Écrit les lignes physiques de tous les logs fusionnés (stdout par défaut) ; `label` préfixe le fichier"""
+    out = open(output, "w", encoding="utf-8", buffering=1 << 20) if output else sys.stdout
+    count = 0
+    try:
+        for log_file, record in iter_merged_records(files):
+            prefix = f"{os.path.basename(log_file)}: " if label else ""
+            out.write("".join(f"{prefix}{text}\n" for _, text in record.physical_lines()))
+            count += 1
+    finally:
+        if output:
+            out.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse de plusieurs logs Odoo par résultats partiels fusionnables")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    partial = commands.add_parser("partial", help="Un résultat partiel JSON par log (sur chaque machine)")
+    partial.add_argument("logs", nargs="+", help="Fichiers ou motifs glob ('logs/odoo-*.log')")
+    partial.add_argument("-o", "--output-dir", default="partials", help="Dossier des *.partial.json")
+    partial.add_argument("--workers", type=int, default=os.cpu_count(), help="Logs traités en parallèle")
+
+    merge = commands.add_parser("merge", help="Fusionner des résultats partiels en un rapport")
+    merge.add_argument("partials", nargs="+", help="Fichiers *.partial.json (ou rapports fusionnés) / motifs glob")
+    merge.add_argument("-o", "--output", help="Rapport JSON (défaut : results/aggregate_<date>.json)")
+
+    report = commands.add_parser("report", help="partial + merge en une commande (une seule machine)")
+    report.add_argument("logs", nargs="+", help="Fichiers ou motifs glob")
+    report.add_argument("-o", "--output", help="Rapport JSON (défaut : results/aggregate_<date>.json)")
+    report.add_argument("--workers", type=int, default=os.cpu_count(), help="Logs traités en parallèle")
+
+    ordered = commands.add_parser("merge-records", help="Tous les enregistrements triés par horodatage")
+    ordered.add_argument("logs", nargs="+", help="Fichiers ou motifs glob")
+    ordered.add_argument("-o", "--output", help="Fichier de sortie (défaut : stdout)")
+    ordered.add_argument("--label", action="store_true", help="Préfixer chaque ligne par le nom de son fichier")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "partial":
+            files = expand_inputs(args.logs)
+            for path, result in zip(files, build_partials(files, args.workers)):
+                save_partial(result, partial_file(path, args.output_dir))
+                print(f"[PARTIEL] {path} : {result['records']} enregistrements → {partial_file(path, args.output_dir)}")
+        elif args.command == "merge":
+            write_report(merge_partials(load_partial(path) for path in expand_inputs(args.partials)), args.output)
+        elif args.command == "report":
+            write_report(merge_partials(build_partials(expand_inputs(args.logs), args.workers)), args.output)
+        else:
+            count = write_merged(expand_inputs(args.logs), args.output, args.label)
+            print(f"[FUSION] {count} enregistrements fusionnés par horodatage", file=sys.stderr)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERREUR] {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
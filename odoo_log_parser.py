@@ -0,0 +1,120 @@
+# odoo_log_parser.py - Parseur unique des logs Odoo partagé par les analyseurs
+
+import re
+
+from log_source import open_log
+
+RECORD_PATTERN = re.compile(
+    r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d+)\s+(\d+)\s+(\w+)\s+(\w+)\s+([\w\.]+):\s+(.*)'
+)
+
+
+class LogRecord:
+    """Enregistrement de log compact (``__slots__`` : pas de dict par instance).
+
+    ``message`` contient le message de l'en-tête suivi des lignes de
+    continuation (tracebacks) jointes par ``\\n``. ``continuation`` garde les
+    numéros de ces lignes, ce qui permet de retrouver chaque ligne physique.
+    Une ligne orpheline (avant tout en-tête) donne un enregistrement dont
+    ``level`` vaut None.
+    """
+
+    __slots__ = ('line', 'timestamp', 'pid', 'level', 'user', 'module',
+                 'message', 'raw', 'continuation', 'cluster')
+
+    def __init__(self, line, timestamp, pid, level, user, module, message, raw):
+        self.line = line
+        self.timestamp = timestamp
+        self.pid = pid
+        self.level = level
+        self.user = user
+        self.module = module
+        self.message = message
+        self.raw = raw
+        self.continuation = None
+        self.cluster = None
+
+    @property
+    def is_orphan(self):
+        return self.level is None
+
+    @property
+    def first_message(self):
+        """Message de l'en-tête seul, sans les lignes de continuation"""
+        return self.message.split('\n', 1)[0] if self.continuation else self.message
+
+    def physical_lines(self):
+        """Lignes physiques (numéro, texte nettoyé) dans l'ordre du fichier"""
+        yield self.line, self.raw
+        if self.continuation:
+            yield from zip(self.continuation, self.message.split('\n')[1:])
+
+    def __reduce__(self):
+        # Sérialisation compacte (envoi entre processus) : un tuple plutôt qu'un dict par slot
+        return (_restore_record, tuple(getattr(self, slot) for slot in self.__slots__))
+
+    def to_dict(self):
+        return {
+            'line': self.line,
+            'timestamp': self.timestamp,
+            'level': self.level,
+            'user': self.user,
+            'module': self.module,
+            'message': self.message
+        }
+
+    def __repr__(self):
+        return f"LogRecord(line={self.line}, level={self.level!r}, user={self.user!r}, message={self.message[:40]!r})"
+
+
+def _restore_record(line, timestamp, pid, level, user, module, message, raw, continuation, cluster):
+    record = LogRecord(line, timestamp, pid, level, user, module, message, raw)
+    record.continuation = continuation
+    record.cluster = cluster
+    return record
+
+
+def iter_records(lines, start=1):
+    """Générateur d'enregistrements à partir d'un itérable de lignes.
+
+    Les lignes vides sont ignorées et les lignes qui ne commencent pas par un
+    en-tête sont rattachées au dernier enregistrement (traceback multiligne).
+    """
+    match_header = RECORD_PATTERN.match
+    current = None
+
+    for line_num, line in enumerate(lines, start):
+        line = line.strip()
+        if not line:
+            continue
+
+        match = match_header(line)
+        if match:
+            if current is not None:
+                yield current
+            timestamp, pid, level, user, module, message = match.groups()
+            current = LogRecord(line_num, timestamp, pid, level, user, module, message, line)
+        elif current is not None and not current.is_orphan:
+            current.message += '\n' + line
+            if current.continuation is None:
+                current.continuation = [line_num]
+            else:
+                current.continuation.append(line_num)
+        else:
+            if current is not None:
+                yield current
+            current = LogRecord(line_num, None, None, None, None, None, line, line)
+
+    if current is not None:
+        yield current
+
+
+def iter_file_records(file_path):
+    """Lecture paresseuse des enregistrements d'un fichier (.gz/.bz2/stdin acceptés)"""
+    with open_log(file_path) as f:
+        yield from iter_records(f)
+
+
+def parse_file(file_path):
+    """Parse un fichier complet en liste d'enregistrements"""
+    return list(iter_file_records(file_path))
@@ -0,0 +1,128 @@
+# parallel_parse.py - Parsing multi-cœur des gros logs par plages d'octets
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from log_source import STDIN, open_log
+from odoo_log_parser import RECORD_PATTERN, iter_records
+
+MAX_CHUNK_SIZE = 64 * 1024 * 1024                                               # Plage maximale lue d'un coup par un worker
+CHUNKS_PER_WORKER = 4                                                           # Plusieurs plages par worker pour équilibrer la charge
+
+
+def is_splittable(path):
+    """Seuls les fichiers ordinaires non compressés peuvent être découpés par octets"""
+    return path != STDIN and not path.endswith((".gz", ".bz2")) and os.path.isfile(path)
+
+
+def _next_record_start(f, offset, size):
+    """Premier début d'enregistrement (en-tête Odoo) à partir de `offset`, ou None"""
+    f.seek(offset - 1)
+    if f.read(1) != b"\n":
+        f.readline()                                                            # Terminer la ligne entamée
+    pos = f.tell()
+    while pos < size:
+        line = f.readline()
+        if RECORD_PATTERN.match(line.decode("utf-8", "replace").strip()):
+            return pos
+        pos = f.tell()
+    return None
+
+
+def find_boundaries(path, n_chunks):
+    """Découpe le fichier en plages (début, fin) alignées sur des débuts d'enregistrement.
+
+    Une plage ne commence jamais au milieu d'un traceback multiligne : les
+    lignes de continuation restent avec leur en-tête, comme en série.
+    """
+    size = os.path.getsize(path)
+    if n_chunks <= 1 or size == 0:
+        return [(0, size)]
+
+    starts = [0]
+    with open(path, "rb") as f:
+        for k in range(1, n_chunks):
+            target = max(size * k // n_chunks, starts[-1] + 1)
+            if target >= size:
+                break
+            offset = _next_record_start(f, target, size)
+            if offset is None:
+                break
+            if offset > starts[-1]:
+                starts.append(offset)
+
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def chunk_count(path, workers):
+    size = os.path.getsize(path)
+    return max(workers * CHUNKS_PER_WORKER, -(-size // MAX_CHUNK_SIZE))
+
+
+def _run_chunk(task):
+    """Exécuté dans un worker : applique `func` aux lignes d'une plage d'octets.
+
+    Retourne (résultat, nombre de lignes) ; les numéros de ligne du résultat
+    sont locaux à la plage (à partir de 1) et recalés par le processus parent.
+    """
+    func, path, start, end = task
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    count = 0
+
+    def lines():
+        nonlocal count
+        for line in io.TextIOWrapper(io.BytesIO(data), encoding="utf-8"):
+            count += 1
+            yield line
+
+    it = lines()
+    result = func(it)
+    for _ in it:                                                                # Compter les lignes non consommées
+        pass
+    return result, count
+
+
+def map_chunks(path, func, workers):
+    """Applique `func(lignes)` à chaque plage du fichier dans un pool de processus.
+
+    Génère (décalage de ligne, résultat) dans l'ordre du fichier ; `func` doit
+    être une fonction de module (sérialisable) qui consomme un itérable de lignes.
+    """
+    if workers <= 1 or not is_splittable(path):
+        # Série (ou source non découpable : .gz, .bz2, stdin) : lecture en flux
+        with open_log(path) as f:
+            yield 0, func(f)
+        return
+
+    tasks = [(func, path, start, end) for start, end in find_boundaries(path, chunk_count(path, workers))]
+    line_offset = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result, count in pool.map(_run_chunk, tasks):
+            yield line_offset, result
+            line_offset += count
+
+
+def shift_records(records, offset):
+    """Recale les numéros de ligne d'enregistrements parsés dans une plage"""
+    if offset:
+        for record in records:
+            record.line += offset
+            if record.continuation:
+                record.continuation = [n + offset for n in record.continuation]
+    return records
+
+
+def parse_chunk(lines):
+    return list(iter_records(lines))
+
+
+def parse_file_parallel(path, workers):
+    """Équivalent parallèle de odoo_log_parser.parse_file (résultat identique)"""
+    records = []
+    for offset, chunk in map_chunks(path, parse_chunk, workers):
+        records.extend(shift_records(chunk, offset))
+    return records
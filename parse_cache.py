@@ -0,0 +1,277 @@
+# parse_cache.py - Cache colonnaire (NumPy, projeté en mémoire) des enregistrements parsés
+
+import calendar
+import hashlib
+import json
+import mmap
+import os
+import re
+import shutil
+from array import array
+
+import numpy as np
+
+from log_source import STDIN
+from odoo_log_parser import LogRecord, iter_file_records
+from parallel_parse import parse_file_parallel
+
+CACHE_DIR = "cache"
+CACHE_VERSION = 1
+NO_TIMESTAMP = np.iinfo(np.int64).min                                           # Ligne orpheline : pas d'horodatage
+SAMPLE_BLOCKS = 16                                                              # Blocs lus pour l'empreinte du contenu
+SAMPLE_SIZE = 64 * 1024
+FLUSH_RECORDS = 1 << 20                                                         # Colonnes vidées sur disque par tranches
+HEADER_PREFIX = re.compile(r"(\S+ \S+)\s+(\S+)")                                # Horodatage et pid en tête de l'en-tête brut
+
+INT_COLUMNS = {                                                                 # Colonne → type NumPy
+    'line': np.int64,
+    'timestamp': np.int64,                                                      # Epoch en millisecondes (UTC, heure des logs Odoo)
+    'pid': np.int32,
+    'level': np.int32,                                                          # Codes de dictionnaire (-1 : orphelin)
+    'user': np.int32,
+    'module': np.int32,
+    'message_start': np.int32,                                                  # Début du message dans l'en-tête brut (octets)
+    'raw_offsets': np.int64,                                                    # n + 1 bornes dans raw.blob
+    'continuation_offsets': np.int64,                                           # n + 1 bornes dans continuation_lines
+    'continuation_lines': np.int64,                                             # Numéros des lignes de continuation
+    'continuation_text_offsets': np.int64,                                      # n + 1 bornes dans continuation.blob
+}
+DICTIONARIES = ('level', 'user', 'module')
+
+
+def source_key(path):
+    """Clé du fichier source : taille, mtime et empreinte d'un échantillon du contenu.
+
+    L'empreinte porte sur le début, la fin et des blocs répartis dans le
+    fichier : elle reste instantanée sur plusieurs Go tout en détectant une
+    réécriture qui conserverait taille et date.
+    """
+    st = os.stat(path)
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        if st.st_size <= SAMPLE_BLOCKS * SAMPLE_SIZE:
+            digest.update(f.read())
+        else:
+            step = (st.st_size - SAMPLE_SIZE) // (SAMPLE_BLOCKS - 1)
+            for k in range(SAMPLE_BLOCKS):
+                f.seek(k * step)
+                digest.update(f.read(SAMPLE_SIZE))
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'hash': digest.hexdigest()}
+
+
+def timestamp_ms(timestamp, seconds):
+    """Horodatage Odoo → epoch en millisecondes (UTC) ; `seconds` mémorise les secondes déjà converties"""
+    if timestamp is None:
+        return NO_TIMESTAMP
+    key = timestamp[:19]
+    epoch = seconds.get(key)
+    if epoch is None:
+        epoch = seconds[key] = calendar.timegm((
+            int(key[0:4]), int(key[5:7]), int(key[8:10]), int(key[11:13]), int(key[14:16]), int(key[17:19])))
+    return epoch * 1000 + int(timestamp[20:23].ljust(3, "0"))
+
+
+def cache_path(log_file, directory=CACHE_DIR):
+    digest = hashlib.sha1(os.path.abspath(log_file).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(directory, f"{os.path.basename(log_file)}.{digest}")
+
+
+def _column_file(directory, name):
+    return os.path.join(directory, f"{name}.bin")
+
+
+def _typecode(dtype):
+    return 'q' if dtype == np.int64 else 'i'
+
+
+class CacheWriter:
+    """Écrit les enregistrements colonne par colonne, vidées sur disque par tranches"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.columns = {name: array(_typecode(dtype)) for name, dtype in INT_COLUMNS.items()}
+        self.column_files = {name: open(_column_file(directory, name), "wb") for name in INT_COLUMNS}
+        self.records = 0
+        self.continuation_count = 0
+        for name in ('raw_offsets', 'continuation_offsets', 'continuation_text_offsets'):
+            self.columns[name].append(0)
+        self.codes = {name: {} for name in DICTIONARIES}                        # Valeur → code (ordre d'apparition)
+        self.seconds = {}                                                       # "AAAA-MM-JJ HH:MM:SS" → epoch (s)
+        self.raw_file = open(os.path.join(directory, "raw.blob"), "wb")
+        self.continuation_file = open(os.path.join(directory, "continuation.blob"), "wb")
+        self.raw_size = self.continuation_size = 0
+
+    def _code(self, name, value):
+        if value is None:
+            return -1
+        codes = self.codes[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+        return code
+
+    def add(self, record):
+        columns = self.columns
+        raw = record.raw.encode("utf-8")
+        first_message = record.first_message.encode("utf-8")
+        columns['line'].append(record.line)
+        columns['timestamp'].append(timestamp_ms(record.timestamp, self.seconds))
+        columns['pid'].append(int(record.pid) if record.pid is not None else -1)
+        columns['level'].append(self._code('level', record.level))
+        columns['user'].append(self._code('user', record.user))
+        columns['module'].append(self._code('module', record.module))
+        columns['message_start'].append(len(raw) - len(first_message))         # Le message de l'en-tête termine la ligne brute
+
+        self.raw_file.write(raw)
+        self.raw_size += len(raw)
+        columns['raw_offsets'].append(self.raw_size)
+
+        if record.continuation:
+            columns['continuation_lines'].extend(record.continuation)
+            self.continuation_count += len(record.continuation)
+            text = record.message.split('\n', 1)[1].encode("utf-8")
+            self.continuation_file.write(text)
+            self.continuation_size += len(text)
+        columns['continuation_offsets'].append(self.continuation_count)
+        columns['continuation_text_offsets'].append(self.continuation_size)
+
+        self.records += 1
+        if len(columns['line']) >= FLUSH_RECORDS:
+            self.flush()
+
+    def flush(self):
+        for name, column in self.columns.items():
+            column.tofile(self.column_files[name])
+            del column[:]
+
+    def close(self, key):
+        self.flush()
+        for f in (self.raw_file, self.continuation_file, *self.column_files.values()):
+            f.close()
+        meta = {
+            'version': CACHE_VERSION,
+            'source': key,
+            'records': self.records,
+            'dictionaries': {name: list(codes) for name, codes in self.codes.items()},
+        }
+        with open(os.path.join(self.directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        return meta
+
+
+def build_cache(log_file, directory, records=None):
+    """Parse `log_file` (ou consomme `records`) et écrit le cache dans `directory`"""
+    tmp_dir = directory + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    key = source_key(log_file)                                                  # Relevée avant le parsing
+    writer = CacheWriter(tmp_dir)
+    for record in records if records is not None else iter_file_records(log_file):
+        writer.add(record)
+    meta = writer.close(key)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return meta
+
+
+def _load_column(directory, name, dtype):
+    """Colonne projetée en mémoire (lecture seule)"""
+    path = _column_file(directory, name)
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+
+def _blob(path):
+    """Projection mémoire d'un fichier d'octets (b"" si vide : mmap refuse les fichiers vides)"""
+    if os.path.getsize(path) == 0:
+        return b""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ParsedLog:
+    """Enregistrements parsés en colonnes, chargés par projection mémoire.
+
+    Les colonnes numériques (``line``, ``timestamp``, codes ``level`` /
+    ``user`` / ``module``…) sont des tableaux NumPy en lecture seule ; les
+    dictionnaires ``levels``, ``users`` et ``modules`` donnent la valeur de
+    chaque code. Rien n'est lu du disque avant d'être utilisé.
+    """
+
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.meta = meta
+        for name, dtype in INT_COLUMNS.items():
+            setattr(self, name, _load_column(directory, name, dtype))
+        self.levels = meta['dictionaries']['level']
+        self.users = meta['dictionaries']['user']
+        self.modules = meta['dictionaries']['module']
+        self.raw_blob = _blob(os.path.join(directory, "raw.blob"))
+        self.continuation_blob = _blob(os.path.join(directory, "continuation.blob"))
+
+    def __len__(self):
+        return self.meta['records']
+
+    def raw_lines(self):
+        """En-têtes bruts (lignes nettoyées), dans l'ordre du fichier"""
+        offsets, blob = self.raw_offsets.tolist(), self.raw_blob
+        for i in range(len(self)):
+            yield blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+
+    def messages(self):
+        """Messages complets (continuations comprises) sans construire d'enregistrement"""
+        raw_offsets, starts = self.raw_offsets.tolist(), self.message_start.tolist()
+        text_offsets = self.continuation_text_offsets.tolist()
+        raw_blob, continuation_blob = self.raw_blob, self.continuation_blob
+        for i in range(len(self)):
+            message = raw_blob[raw_offsets[i] + starts[i]:raw_offsets[i + 1]].decode("utf-8")
+            if text_offsets[i + 1] > text_offsets[i]:
+                message += '\n' + continuation_blob[text_offsets[i]:text_offsets[i + 1]].decode("utf-8")
+            yield message
+
+    def records(self):
+        """LogRecord reconstruits à la demande (mêmes champs que odoo_log_parser)"""
+        lines, levels, users, modules = (self.line.tolist(), self.level.tolist(),
+                                         self.user.tolist(), self.module.tolist())
+        continuation_offsets = self.continuation_offsets.tolist()
+        continuation_lines = self.continuation_lines
+        for i, (raw, message) in enumerate(zip(self.raw_lines(), self.messages())):
+            if levels[i] < 0:
+                yield LogRecord(lines[i], None, None, None, None, None, message, raw)
+                continue
+            timestamp, pid = HEADER_PREFIX.match(raw).groups()
+            record = LogRecord(lines[i], timestamp, pid, self.levels[levels[i]],
+                               self.users[users[i]], self.modules[modules[i]], message, raw)
+            start, end = continuation_offsets[i], continuation_offsets[i + 1]
+            if end > start:
+                record.continuation = continuation_lines[start:end].tolist()
+            yield record
+
+
+def load_cache(log_file, directory=CACHE_DIR):
+    """Cache valide de `log_file`, ou None (absent, obsolète ou d'une autre version)"""
+    path = cache_path(log_file, directory)
+    try:
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if meta.get('version') != CACHE_VERSION or meta.get('source') != source_key(log_file):
+        return None
+    return ParsedLog(path, meta)
+
+
+def load_or_parse(log_file, workers=1, directory=CACHE_DIR):
+    """Charge le cache de `log_file`, en le (re)construisant s'il est absent ou obsolète"""
+    if log_file == STDIN:
+        raise ValueError("Le cache exige un fichier (pas l'entrée standard)")
+    parsed = load_cache(log_file, directory)
+    if parsed is not None:
+        print(f"[CACHE] {len(parsed)} enregistrements chargés depuis {parsed.directory}")
+        return parsed
+
+    print(f"[CACHE] Construction du cache de {log_file}")
+    records = parse_file_parallel(log_file, workers) if workers > 1 else None
+    path = cache_path(log_file, directory)
+    return ParsedLog(path, build_cache(log_file, path, records))
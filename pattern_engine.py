@@ -0,0 +1,257 @@
+# pattern_engine.py - Moteur de motifs compilés pour la détection d'anomalies
+
+import json
+import re
+import time
+
+try:
+    import re._parser as sre_parse                                              # Python 3.11+
+except ImportError:                                                             # Python 3.8 - 3.10
+    import sre_parse
+
+
+def required_literal(pattern, flags=0):
+    """Extrait la plus longue suite littérale obligatoire d'un motif (en minuscules).
+
+    Seule la séquence de premier niveau est examinée : un littéral qui y figure
+    doit apparaître dans toute ligne qui correspond. Retourne None si aucun
+    littéral ASCII exploitable n'existe (alternance, classe de caractères...).
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except re.error:
+        return None
+
+    best, run = "", []
+    for op, arg in list(parsed) + [(None, None)]:
+        if op is sre_parse.LITERAL and arg < 128:
+            run.append(chr(arg))
+            continue
+        if len(run) > len(best):
+            best = "".join(run)
+        run = []
+    return best.lower() if len(best) >= 2 else None
+
+
+def has_backreference(pattern, flags=0):
+    """Vrai si le motif contient une référence arrière (\\1, (?P=nom), (?(1)...)).
+
+    Placé dans l'alternance à groupes nommés, un tel motif verrait ses numéros
+    de groupes décalés : ``\\1`` désignerait le groupe d'un autre motif.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except re.error:
+        return False
+
+    stack = [parsed]
+    while stack:
+        for op, arg in stack.pop():
+            if op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+                return True
+            for value in arg if isinstance(arg, (tuple, list)) else (arg,):
+                if isinstance(value, sre_parse.SubPattern):
+                    stack.append(value)
+                elif isinstance(value, list):                                   # BRANCH : liste d'alternatives
+                    stack.extend(v for v in value if isinstance(v, sre_parse.SubPattern))
+    return False
+
+
+class LiteralAutomaton:
+    """Automate d'Aho-Corasick sur des littéraux : un seul passage par ligne"""
+
+    def __init__(self, literals):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+
+        for literal_id, literal in enumerate(literals):
+            node = 0
+            for char in literal:
+                nxt = self.goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][char] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                node = nxt
+            self.output[node] += (literal_id,)
+
+        # Liens d'échec en largeur d'abord
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, nxt in self.goto[node].items():
+                queue.append(nxt)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                target = self.goto[state].get(char, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.output[nxt] += self.output[self.fail[nxt]]
+
+    def find(self, text):
+        """Retourne l'ensemble des identifiants de littéraux présents dans le texte"""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+
+class PatternSet:
+    """Liste de motifs compilée une seule fois, avec préfiltre littéral.
+
+    Chaque motif est compilé une fois et, quand c'est possible, indexé par son
+    littéral obligatoire dans un automate d'Aho-Corasick. Une ligne n'est
+    donc confrontée qu'aux motifs dont le littéral y apparaît (plus ceux sans
+    littéral exploitable), au lieu de N appels ``re.search``. Les lignes non
+    ASCII, que le préfiltre ne couvre pas, passent par une alternance unique à
+    groupes nommés ``p<index>`` ; les motifs à références arrière en sont
+    exclus et recherchés un par un. Dans les deux cas la sémantique « premier
+    motif de la liste qui correspond » est conservée.
+    """
+
+    def __init__(self, patterns, flags=re.IGNORECASE):
+        self.patterns = list(patterns)
+        self.flags = flags
+        self.compiled = [re.compile(p, flags) for p in self.patterns]
+
+        # Références arrière : numéros de groupes décalés dans l'alternance, recherche individuelle
+        self.isolated = [i for i, p in enumerate(self.patterns) if has_backreference(p, flags)]
+        isolated = set(self.isolated)
+        try:
+            alternation = "|".join(f"(?P<p{i}>{p})" for i, p in enumerate(self.patterns) if i not in isolated)
+            self.combined = re.compile(alternation, flags) if alternation else None
+        except re.error:
+            # Motif incompatible avec l'alternance (flags inline, noms de groupes en double...)
+            self.combined = None
+            self.isolated = list(range(len(self.patterns)))
+
+        literals, owners, self.always = [], {}, []
+        self.owners = []                                                        # Pour chaque littéral : indices des motifs concernés
+        for i, pattern in enumerate(self.patterns):
+            literal = required_literal(pattern, flags)
+            if literal is None:
+                self.always.append(i)
+                continue
+            if literal not in owners:
+                owners[literal] = len(literals)
+                literals.append(literal)
+                self.owners.append([])
+            self.owners[owners[literal]].append(i)
+
+        self.automaton = LiteralAutomaton(literals)
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def candidates(self, message):
+        """Indices (triés) des motifs qui peuvent correspondre à un message ASCII"""
+        found = self.automaton.find(message.lower())
+        if not found:
+            return self.always
+        indices = set(self.always)
+        for literal_id in found:
+            indices.update(self.owners[literal_id])
+        return sorted(indices)
+
+    def search(self, message):
+        """Retourne l'indice du premier motif (ordre de la liste) présent dans le message, ou None"""
+        if not message.isascii():
+            # Le repli de casse Unicode (ı, ſ, K...) échappe au préfiltre ASCII
+            return self._search_combined(message)
+        compiled = self.compiled
+        for i in self.candidates(message):
+            if compiled[i].search(message):
+                return i
+        return None
+
+    def _search_combined(self, message):
+        """Recherche par l'alternance unique : le groupe nommé indique le motif déclenché"""
+        match = self.combined.search(message) if self.combined is not None else None
+        if match is None:
+            # Aucun motif de l'alternance : seuls les motifs isolés peuvent correspondre
+            return next((i for i in self.isolated if self.compiled[i].search(message)), None)
+
+        winner = int(match.lastgroup[1:])
+        # L'alternance retient la position la plus à gauche : un motif d'indice
+        # inférieur ne peut donc correspondre qu'après cette position (les
+        # motifs isolés, absents de l'alternance, sont cherchés partout)
+        for i in range(winner):
+            start = 0 if i in self.isolated else match.start() + 1
+            if self.compiled[i].search(message, start):
+                return i
+        return winner
+
+    def enable_stats(self):
+        """Compte essais, correspondances et temps de chaque motif (search remplacé par une version mesurée)"""
+        count = len(self.patterns)
+        self.tries, self.hits, self.seconds = [0] * count, [0] * count, [0.0] * count
+        self.prefilter_seconds = self.fallback_seconds = 0.0                    # Automate / alternance (lignes non ASCII)
+        self.searches = self.fallback_searches = 0
+        self.search = self._search_with_stats
+        return self
+
+    def _search_with_stats(self, message):
+        clock = time.perf_counter
+        self.searches += 1
+        index = None
+        if not message.isascii():
+            start = clock()
+            index = self._search_combined(message)
+            self.fallback_seconds += clock() - start
+            self.fallback_searches += 1
+        else:
+            start = clock()
+            candidates = self.candidates(message)
+            self.prefilter_seconds += clock() - start
+            for i in candidates:
+                start = clock()
+                found = self.compiled[i].search(message)
+                self.seconds[i] += clock() - start
+                self.tries[i] += 1
+                if found:
+                    index = i
+                    break
+        if index is not None:
+            self.hits[index] += 1
+        return index
+
+    def stats_table(self):
+        """Après enable_stats : une entrée par motif, du plus coûteux au moins coûteux"""
+        rows = [{'pattern': pattern, 'tries': tries, 'hits': hits, 'seconds': seconds,
+                 'us_per_try': seconds / tries * 1e6 if tries else None}
+                for pattern, tries, hits, seconds in zip(self.patterns, self.tries, self.hits, self.seconds)]
+        return {
+            'searches': self.searches,
+            'prefilter_seconds': self.prefilter_seconds,
+            'fallback_searches': self.fallback_searches,
+            'fallback_seconds': self.fallback_seconds,
+            'patterns': sorted(rows, key=lambda row: -row['seconds']),
+        }
+
+    def first_match(self, message):
+        """Retourne le texte du premier motif qui correspond, ou None"""
+        index = self.search(message)
+        return None if index is None else self.patterns[index]
+
+    def matches_any(self, message):
+        """Vrai si au moins un motif est présent (l'ordre n'importe pas)"""
+        return self.search(message) is not None
+
+
+def load_patterns(path, required=True):
+    """Charge une liste de motifs JSON ; liste vide si le fichier est absent et non requis"""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        if required:
+            raise
+        return []
@@ -0,0 +1,149 @@
+# pipeline.py - Exécution des quatre analyseurs sur un seul parsing du log
+
+import argparse
+import functools
+import os
+import sys
+
+import analyzer_clust
+import analyzer_kmeans
+import analyzer_pattern
+import analyzer_tokens
+import instrument
+from log_index import add_query_arguments, load_or_build, query_from_args
+from model_store import add_model_arguments, model_options_from_args
+from parallel_parse import parse_file_parallel
+from parse_cache import load_or_parse
+from report_render import ReportRenderer
+
+LOG_FILE = "odoo.log.txt"
+
+
+def run_pattern(records, renderer):
+    """Détection d'anomalies → anomalies_report.txt"""
+    false_positive_set, known_pattern_set = analyzer_pattern.load_pattern_sets()
+    trace = instrument.active()
+    if trace is not None:
+        false_positive_set.enable_stats()
+        known_pattern_set.enable_stats()
+    anomalies = analyzer_pattern.iter_record_anomalies(records, false_positive_set, known_pattern_set)
+    count = analyzer_pattern.write_report(anomalies)
+    analyzer_pattern.print_summary(count)
+    if trace is not None:
+        trace.extra['pattern_stats'] = analyzer_pattern.pattern_cost_tables(false_positive_set, known_pattern_set)
+
+
+def run_tokens(records, renderer):
+    """Statistiques par utilisateur → log_report.png · user_stats.json · user_timeseries.json"""
+    table = analyzer_tokens.compute_line_table(records)
+    user_stats = table.user_stats()
+    renderer.submit(analyzer_tokens.plot_user_stats, user_stats, show=renderer.show)
+    analyzer_tokens.export_user_stats(user_stats)
+    analyzer_tokens.export_timeseries(table)
+
+
+def run_clust(records, renderer):
+    """Vue hiérarchique agrégée → odoo_logs_hierarchy.png · odoo_logs_hierarchy.html"""
+    tree = analyzer_clust.summary_tree(analyzer_clust.build_summary(records))
+    renderer.submit(analyzer_clust.render_summary, tree)
+    analyzer_clust.render_html(tree)
+
+
+def run_kmeans(records, renderer, model=None):
+    """Clusterisation KMeans → results/clusters_*.png · results/analysis_*.json (`model` : options du modèle persistant)"""
+    logs = analyzer_kmeans.collect_logs(records)
+    if not logs:
+        raise ValueError("Aucun log valide à analyser")
+    model_info = None
+    if model:
+        logs, X, model_info = analyzer_kmeans.cluster_with_model(logs, **model)
+    else:
+        logs, X, vectorizer = analyzer_kmeans.cluster_logs(logs)
+    analysis = analyzer_kmeans.analyze_clusters(logs)
+    clusters = [log.cluster for log in logs]
+    renderer.submit(analyzer_kmeans.plot_projection, analyzer_kmeans.project_pca(X), clusters,
+                    "Analyse PCA", "Composante Principale", show=renderer.show)
+    analyzer_kmeans.export_results(logs, analysis, model=model_info)
+
+
+STAGES = {
+    'pattern': run_pattern,
+    'tokens': run_tokens,
+    'clust': run_clust,
+    'kmeans': run_kmeans,
+}
+
+
+def run_pipeline(log_file, stages=tuple(STAGES), workers=1, cache=False, headless=False, render_workers=1, query=None,
+                 model=None):
+    """Parse le log une seule fois puis alimente chaque analyseur avec les mêmes enregistrements
+
+    Avec `query` (LogQuery), seuls les enregistrements sélectionnés via
+    l'index sont lus et parsés.
+
+    Les graphiques passent par un ReportRenderer : en mode `headless`, aucun
+    plt.show() et, avec `render_workers` > 1, rendu dans des processus Agg
+    pendant que les analyseurs suivants s'exécutent.
+
+    Avec `model` (model_options_from_args), l'étape kmeans utilise le modèle
+    enregistré dans models/ au lieu de réajuster TF-IDF et KMeans.
+    """
+    with instrument.stage("parse") as span:
+        if query:
+            records = list(load_or_build(log_file, workers).select(query))
+        elif cache:
+            records = list(load_or_parse(log_file, workers).records())
+        else:
+            records = parse_file_parallel(log_file, workers)
+        span['items'] = len(records)
+    print(f"[PIPELINE] {len(records)} enregistrements parsés depuis {log_file}")
+
+    renderer = ReportRenderer(headless, render_workers)
+    for name in stages:
+        print(f"\n[PIPELINE] --- {name} ---")
+        run = STAGES[name]
+        if name == 'kmeans' and model:
+            run = functools.partial(run, model=dict(model, source=os.path.abspath(log_file)))
+        with instrument.stage(name, len(records)):
+            run(records, renderer)
+    with instrument.stage("render_wait"):
+        renderer.close()
+
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline complet : un seul parsing pour les quatre analyseurs")
+    parser.add_argument("log_file", nargs="?", default=LOG_FILE, help="Fichier de log (.gz/.bz2, '-' pour stdin)")
+    parser.add_argument("--only", nargs="+", choices=list(STAGES), default=list(STAGES),
+                        help="Analyseurs à exécuter (tous par défaut)")
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de processus de parsing")
+    parser.add_argument("--cache", action="store_true", help="Réutiliser le cache colonnaire du parsing (cache/)")
+    parser.add_argument("--headless", action="store_true", help="Backend Agg : graphiques sauvegardés sans fenêtre (cron)")
+    parser.add_argument("--render-workers", type=int, default=1,
+                        help="Processus de rendu des graphiques en mode --headless")
+    add_query_arguments(parser)
+    add_model_arguments(parser)
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+    query = query_from_args(parser, args)
+    model = model_options_from_args(args)
+
+    try:
+        instrument.start_from_args("pipeline", args)
+        run_pipeline(args.log_file, args.only, args.workers, args.cache, args.headless, args.render_workers, query,
+                     model)
+    except FileNotFoundError:
+        print(f"[ERREUR] Fichier '{args.log_file}' introuvable")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n[ERREUR] {str(e)}")
+        sys.exit(1)
+    finally:
+        instrument.finish()
+
+    print("\n[TERMINÉ] Pipeline complété avec succès!")
+
+
+if __name__ == "__main__":
+    main()
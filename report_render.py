@@ -0,0 +1,75 @@
+# report_render.py - Rendu des graphiques sans affichage (backend Agg) et en processus parallèles
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+from matplotlib.figure import Figure
+
+import instrument
+
+
+def use_headless():
+    """Backend Agg : aucune fenêtre, rien ne bloque un cron"""
+    matplotlib.use("Agg", force=True)
+
+
+def new_figure(figsize, show=False):
+    """Figure orientée objet ; hors de pyplot (aucun état global) quand elle n'est pas affichée"""
+    if show:
+        import matplotlib.pyplot as plt
+        return plt.figure(figsize=figsize)
+    return Figure(figsize=figsize)
+
+
+@instrument.traced()
+def save_figure(fig, output_file, show=False, **savefig_kwargs):
+    """Sauvegarde `fig`, l'affiche seulement si `show`, puis libère la figure"""
+    fig.savefig(output_file, **savefig_kwargs)
+    if show:
+        import matplotlib.pyplot as plt
+        plt.show()
+        plt.close(fig)
+
+
+def _timed_call(func, args, kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+class ReportRenderer:
+    """Graphiques d'une exécution : dessinés sur place, ou dans un pool de processus Agg.
+
+    En mode headless avec plusieurs workers, chaque rendu part dans le pool
+    dès que ses données sont prêtes : les analyseurs suivants continuent
+    pendant que les figures sont dessinées et sauvegardées. Les fonctions
+    soumises doivent être définies au niveau d'un module (picklables).
+    """
+
+    def __init__(self, headless=False, workers=1):
+        self.headless = headless
+        self.show = not headless                                                # À transmettre aux fonctions de tracé
+        self.jobs = []                                                          # (nom, durée ou Future)
+        self.pool = None
+        if headless:
+            use_headless()
+            if workers > 1:
+                self.pool = ProcessPoolExecutor(workers, initializer=use_headless)
+
+    def submit(self, func, *args, **kwargs):
+        if self.pool is None:
+            self.jobs.append((func.__name__, _timed_call(func, args, kwargs)))
+        else:
+            self.jobs.append((func.__name__, self.pool.submit(_timed_call, func, args, kwargs)))
+
+    def close(self):
+        """Attend la fin des rendus et renvoie la durée de chacun"""
+        try:
+            timings = [(name, job if isinstance(job, float) else job.result()) for name, job in self.jobs]
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+        for name, elapsed in timings:
+            print(f"[RENDU] {name} : {elapsed:.2f} s")
+        return timings
@@ -0,0 +1,115 @@
+# sketches.py - Résumés fusionnables : HyperLogLog (valeurs distinctes) et top-K Misra-Gries (messages fréquents)
+
+import base64
+import hashlib
+import zlib
+
+import numpy as np
+
+HLL_PRECISION = 14                                                              # 2^14 registres : erreur type ~0,8 %
+TOPK_CAPACITY = 1000                                                            # Compteurs gardés par le top-K
+
+
+def stable_hash(values):
+    """Hachages 64 bits indépendants du processus et de la machine (hash() est salé par processus)"""
+    return np.fromiter((int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+                        for value in values), dtype=np.uint64)
+
+
+class HyperLogLog:
+    """Nombre approché de valeurs distinctes en 2^precision octets, quel que soit le volume.
+
+    Deux HLL de même précision se fusionnent par maximum registre à
+    registre : le résultat est celui qu'aurait donné un seul passage sur
+    l'union des valeurs, ce qui permet de compter les utilisateurs ou IP
+    distincts de plusieurs logs traités séparément.
+    """
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        if not 12 <= precision <= 18:
+            raise ValueError("Précision HyperLogLog attendue entre 12 et 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    def update(self, values):
+        """Ajoute des valeurs (chaînes) ; dédoublonner en amont évite de hacher deux fois la même"""
+        hashes = stable_hash(values)
+        if not len(hashes):
+            return
+        p = np.uint64(self.precision)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        rest = (hashes << p) | np.uint64(1 << (self.precision - 1))             # Bit sentinelle : rang borné à 64 - p + 1
+        top = (rest >> np.uint64(11)).astype(np.float64)                        # 53 bits : conversion exacte
+        rank = (53 - np.floor(np.log2(top))).astype(np.uint8)                   # Zéros de tête + 1
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Fusion de HyperLogLog de précisions différentes")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return round(m * np.log(m / zeros))                                 # Petites cardinalités : comptage linéaire
+        return round(raw)
+
+    def to_dict(self):
+        return {'precision': self.precision,
+                'registers': base64.b64encode(zlib.compress(self.registers.tobytes())).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, data):
+        registers = np.frombuffer(zlib.decompress(base64.b64decode(data['registers'])), dtype=np.uint8).copy()
+        return cls(data['precision'], registers)
+
+
+class TopK:
+    """Éléments les plus fréquents, résumé de Misra-Gries fusionnable.
+
+    Au plus 2 × `capacity` compteurs ; au-delà, le (capacity + 1)-ième
+    effectif est retranché de tous et les compteurs nuls sont supprimés.
+    Chaque effectif est un minorant, sous-estimé d'au plus ``error`` :
+    tout élément plus fréquent que N / (capacity + 1) est garanti présent.
+    """
+
+    def __init__(self, capacity=TOPK_CAPACITY, counts=None, error=0):
+        self.capacity = capacity
+        self.counts = counts if counts is not None else {}
+        self.error = error
+
+    def update(self, counts):
+        """Ajoute des effectifs {élément: n} (un Counter par lot)"""
+        mine = self.counts
+        for item, n in counts.items():
+            mine[item] = mine.get(item, 0) + n
+        if len(mine) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self):
+        if len(self.counts) <= self.capacity:
+            return
+        threshold = sorted(self.counts.values(), reverse=True)[self.capacity]
+        self.counts = {item: n - threshold for item, n in self.counts.items() if n > threshold}
+        self.error += threshold
+
+    def merge(self, other):
+        self.error += other.error
+        self.update(other.counts)
+        return self
+
+    def top(self, k):
+        """[(élément, effectif minorant)] des k plus fréquents"""
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+    def to_dict(self):
+        self._prune()
+        return {'capacity': self.capacity, 'error': self.error, 'counts': self.counts}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['capacity'], dict(data['counts']), data['error'])
@@ -0,0 +1,130 @@
+# template_miner.py - Extraction en ligne de gabarits de messages (arbre de parsing à profondeur fixe, type Drain)
+
+WILDCARD = "<*>"
+DEPTH = 4                   # Profondeur de l'arbre : racine → nombre de jetons → (DEPTH - 2) premiers jetons → feuille
+SIMILARITY = 0.5            # Part minimale de jetons identiques pour rattacher un message à un gabarit
+MAX_CHILDREN = 100          # Branches par nœud ; au-delà, les jetons suivants partagent la branche <*>
+MAX_CLUSTERS = 200          # Gabarits comparés au plus dans une feuille
+
+
+def has_digit(token):
+    return any(c.isdigit() for c in token)
+
+
+def tokenize(message):
+    """Jetons séparés par les blancs ; un jeton contenant un chiffre (id, montant, durée…) devient <*>"""
+    return [WILDCARD if has_digit(token) else token for token in message.split()]
+
+
+class LogTemplate:
+    """Gabarit de message : jetons constants et <*> aux positions variables"""
+
+    __slots__ = ('id', 'tokens', 'count')
+
+    def __init__(self, template_id, tokens):
+        self.id = template_id
+        self.tokens = tokens
+        self.count = 0
+
+    @property
+    def template(self):
+        return ' '.join(self.tokens)
+
+    def similarity(self, tokens):
+        """(part de jetons identiques, nombre de <*>) : le second départage les égalités"""
+        same = wildcards = 0
+        for mine, other in zip(self.tokens, tokens):
+            if mine == other:
+                same += 1                                                       # Constante identique, ou valeur masquée des deux côtés
+            elif mine == WILDCARD:
+                wildcards += 1
+        return same / len(tokens), wildcards
+
+    def merge(self, tokens):
+        """Remplace par <*> les positions où le message diffère"""
+        for i, (mine, other) in enumerate(zip(self.tokens, tokens)):
+            if mine != other and mine != WILDCARD:
+                self.tokens[i] = WILDCARD
+
+    def __repr__(self):
+        return f"LogTemplate(id={self.id}, count={self.count}, template={self.template!r})"
+
+
+class TemplateMiner:
+    """Regroupe les messages en gabarits, en un seul passage et sans nombre de clusters fixé.
+
+    L'arbre est indexé par le nombre de jetons puis par les premiers jetons
+    (un jeton contenant un chiffre est remplacé par ``<*>``) : chaque
+    message n'est comparé qu'aux gabarits d'une seule feuille, le coût d'un
+    ``add`` est donc proportionnel à la longueur du message. Un message est
+    rattaché au gabarit le plus proche si la part de jetons identiques
+    atteint ``similarity`` ; sinon il crée un nouveau gabarit.
+    """
+
+    def __init__(self, depth=DEPTH, similarity=SIMILARITY, max_children=MAX_CHILDREN, max_clusters=MAX_CLUSTERS):
+        self.depth = max(depth, 3)
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.root = {}                                                          # Nombre de jetons → sous-arbre
+        self.templates = []                                                     # Identifiant → LogTemplate
+
+    def _leaf(self, tokens):
+        node = self.root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth - 2]:
+            key = token
+            child = node.get(key)
+            if child is None:
+                if len(node) >= self.max_children:
+                    key = WILDCARD
+                    child = node.get(key)
+                if child is None:
+                    child = node[key] = {}
+            node = child
+        return node.setdefault(None, [])                                        # Clé None : liste des gabarits de la feuille
+
+    def add(self, message):
+        """Rattache le message à un gabarit (créé au besoin) et retourne ce gabarit"""
+        tokens = tokenize(message)
+        leaf = self._leaf(tokens)
+
+        best, best_score = None, (-1.0, -1)
+        if tokens:
+            for template in leaf:
+                score = template.similarity(tokens)
+                if score > best_score:
+                    best, best_score = template, score
+        elif leaf:
+            best, best_score = leaf[0], (1.0, 0)                               # Message vide : un seul gabarit
+
+        if best is not None and best_score[0] >= self.similarity:
+            best.merge(tokens)
+        else:
+            best = LogTemplate(len(self.templates), tokens)
+            self.templates.append(best)
+            if len(leaf) >= self.max_clusters:
+                leaf.pop(0)                                                     # Le plus ancien n'est plus candidat (il reste dans templates)
+            leaf.append(best)
+
+        best.count += 1
+        return best
+
+    def match(self, message):
+        """Gabarit existant le plus proche, sans apprentissage (None si aucun ne convient)"""
+        tokens = tokenize(message)
+        node = self.root.get(len(tokens))
+        for token in tokens[:self.depth - 2]:
+            if node is None:
+                return None
+            node = node.get(token, node.get(WILDCARD))
+        if node is None:
+            return None
+        best, best_score = None, (-1.0, -1)
+        for template in node.get(None, []):
+            score = template.similarity(tokens) if tokens else (1.0, 0)
+            if score > best_score:
+                best, best_score = template, score
+        return best if best is not None and best_score[0] >= self.similarity else None
+
+    def __len__(self):
+        return len(self.templates)